@@ -5,9 +5,17 @@ import tkinter as tk
 from tkinter import font as tkfont
 import os
 from collections import deque
-import wave
 import datetime
 
+from meterlib.latency import DEFAULT_BLOCK_SIZE, LATENCY_PROFILES, CallbackStats, profile_label
+from meterlib.levels import LevelMeter, SlidingRMS, latch_peaks
+from meterlib.loudness import LoudnessMeter
+from meterlib.recorder import AudioRecorder
+from meterlib.scheduler import AdaptiveRefresh, rate_alpha
+from meterlib.sinks import DEFAULT_FORMAT, available_formats
+from meterlib.snapshot import LevelSnapshot
+from meterlib.tk_render import TkRenderer
+
 class AudioLevelMeter:
     def __init__(self):
         self.root = tk.Tk()
@@ -32,41 +40,60 @@ class AudioLevelMeter:
         self.LEVEL_RANGE = 60
         self.PEAK_HOLD_TIME = 1 # Seconds
         self.DECAY_RATE = 25 # dB
+        self.SMOOTHING_TICK = 0.015 # Seconds: коэффициенты сглаживания подобраны под этот шаг
         
         # Размер окна RMS по умолчанию (в миллисекундах)
         self.rms_window_size = 50  # 300ms по умолчанию
         self.rms_window_size = 50  # 300ms по умолчанию
         
         # Состояние уровней
-        self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.peak_hold_counter = [0] * self.input_channels
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        # Профиль задержки: размер блока входного потока (все времена — в секундах)
+        self.block_size = DEFAULT_BLOCK_SIZE
+        # Нагрузка callback'а по каждому опробованному размеру блока
+        self.callback_stats = {}
+        self.stats = None
+
+        self.true_peak = False  # Пик с передискретизацией 4x (dBTP) вместо пика по отсчетам
+        self.level_meter = LevelMeter(self.input_channels, peak_ceiling=1.0, block_size=self.block_size)
+        self.levels = LevelSnapshot(self.input_channels, floor=-self.LEVEL_RANGE)
+        self.display_levels = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+
+        # Отрисовка только изменившихся элементов (шкала 220 px на LEVEL_RANGE)
+        self.renderer = TkRenderer(px_per_db=220 / self.LEVEL_RANGE)
         
         # Для режима PEAK - отдельные переменные для отображения
-        self.peak_display_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_display_level = [-self.LEVEL_RANGE] * self.input_channels  # Для плавного RMS
+        self.peak_display_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_display_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)  # Для плавного RMS
         
-        # Режим отображения (RMS или PEAK)
+        # Режим отображения (RMS, PEAK или LUFS)
         self.display_mode = "RMS"  # По умолчанию RMS
+        # Громкость BS.1770 — только в режиме LUFS (None — не считается)
+        self.loudness = None
         
         # Состояние записи
         self.recording = False
-        self.audio_file = None
+        self.recorder = None
+        self.record_format = DEFAULT_FORMAT
         self.recording_start_time = 0
         self.recorded_data = []
+        self.PREROLL_SECONDS = 3  # Сколько секунд до нажатия Record попадает в файл
+        self.ROLLOVER_MINUTES = 15  # Долгая запись делится на файлы встык
+        self.JOURNAL_RECORDING = True  # Журнал блоков: после падения запись восстанавливает recover.py
 
-        # Буфер для хранения данных (будет инициализирован после получения sample_rate)
-        self.rms_buffer_size = 0
-        self.audio_buffer = None
-        self.buffer_index = 0
+        # Скользящее окно RMS (будет инициализировано после получения sample_rate)
+        self.sliding_rms = None
 
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
 
-        self.update_interval = 15
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -257,6 +284,7 @@ class AudioLevelMeter:
         # Переменные для отслеживания выбранного режима
         self.rms_mode_var = tk.BooleanVar(value=True)  # По умолчанию RMS выбран
         self.peak_mode_var = tk.BooleanVar(value=False)
+        self.lufs_mode_var = tk.BooleanVar(value=False)
         
         # Добавляем команды с галочками для режимов отображения
         self.settings_menu.add_checkbutton(
@@ -269,6 +297,21 @@ class AudioLevelMeter:
             variable=self.peak_mode_var,
             command=lambda: self.set_display_mode("PEAK")
         )
+        self.settings_menu.add_checkbutton(
+            label="LUFS (EBU R128)",
+            variable=self.lufs_mode_var,
+            command=lambda: self.set_display_mode("LUFS")
+        )
+        self.settings_menu.add_command(
+            label="Reset Integrated Loudness",
+            command=self.reset_loudness
+        )
+        self.true_peak_var = tk.BooleanVar(value=self.true_peak)
+        self.settings_menu.add_checkbutton(
+            label="True Peak (4x)",
+            variable=self.true_peak_var,
+            command=lambda: self.set_true_peak(self.true_peak_var.get())
+        )
 
         # Добавляем разделитель
         self.settings_menu.add_separator()
@@ -309,6 +352,30 @@ class AudioLevelMeter:
         # Добавляем подменю в основное меню
         self.settings_menu.add_cascade(label="Integration Time", menu=self.rms_window_menu)
 
+        # Формат записи (кодирует поток рекордера, на callback не влияет)
+        self.record_format_menu = tk.Menu(self.settings_menu, tearoff=0)
+        self.record_format_var = tk.StringVar(value=self.record_format)
+        for fmt in available_formats():
+            self.record_format_menu.add_radiobutton(
+                label=fmt,
+                variable=self.record_format_var,
+                value=fmt,
+                command=lambda f=fmt: self.set_record_format(f)
+            )
+        self.settings_menu.add_cascade(label="Record Format", menu=self.record_format_menu)
+
+        # Профили задержки; подписи с нагрузкой callback'а обновляются при каждом показе меню
+        self.latency_menu = tk.Menu(self.settings_menu, tearoff=0)
+        self.latency_var = tk.IntVar(value=self.block_size)
+        for name, size in LATENCY_PROFILES:
+            self.latency_menu.add_radiobutton(
+                label=profile_label(size, self.sample_rate),
+                variable=self.latency_var,
+                value=size,
+                command=lambda s=size: self.set_latency_profile(s)
+            )
+        self.settings_menu.add_cascade(label="Latency", menu=self.latency_menu)
+
     def show_settings_menu(self):
         """Показывает контекстное меню настроек"""
         # Создаем меню, если оно еще не создано
@@ -316,16 +383,20 @@ class AudioLevelMeter:
             self.create_settings_menu()
             
         # Обновляем галочки перед показом меню
-        if self.display_mode == "RMS":
-            self.rms_mode_var.set(True)
-            self.peak_mode_var.set(False)
-        else:
-            self.rms_mode_var.set(False)
-            self.peak_mode_var.set(True)
+        self.update_mode_checks()
         
         # Обновляем галочки размера окна RMS
         for size, var in self.rms_window_vars.items():
             var.set(size == self.rms_window_size)
+
+        # Рядом с каждым опробованным профилем — нагрузка callback'а и переполнения
+        self.latency_var.set(self.block_size)
+        for index, (name, size) in enumerate(LATENCY_PROFILES):
+            label = profile_label(size, self.sample_rate)
+            stats = self.callback_stats.get(size)
+            if stats is not None and stats.blocks:
+                label += f" — {stats.summary()}"
+            self.latency_menu.entryconfigure(index, label=label)
         
         # Показываем меню рядом с кнопкой Settings
         x = self.root.winfo_rootx() + self.settings_button_canvas.winfo_x()
@@ -336,27 +407,76 @@ class AudioLevelMeter:
         finally:
             self.settings_menu.grab_release()
 
+    def set_record_format(self, fmt):
+        """Меняет формат записи; текущая запись дописывается в старом формате"""
+        self.record_format = fmt
+        if self.recording:
+            print(f"Record format {fmt} will be used for the next recording")
+
+    def update_mode_checks(self):
+        """Галочки режимов и доступность сброса integrated"""
+        self.rms_mode_var.set(self.display_mode == "RMS")
+        self.peak_mode_var.set(self.display_mode == "PEAK")
+        self.lufs_mode_var.set(self.display_mode == "LUFS")
+        self.settings_menu.entryconfigure(
+            "Reset Integrated Loudness", state='normal' if self.display_mode == "LUFS" else 'disabled'
+        )
+
     def set_display_mode(self, mode):
-        """Устанавливает режим отображения (RMS или PEAK)"""
+        """Устанавливает режим отображения (RMS, PEAK или LUFS)"""
+        previous = self.display_mode
         self.display_mode = mode
         
         # Обновляем галочки в меню
-        if mode == "RMS":
-            self.rms_mode_var.set(True)
-            self.peak_mode_var.set(False)
-        else:
-            self.rms_mode_var.set(False)
-            self.peak_mode_var.set(True)
+        self.update_mode_checks()
         
         print(f"Display mode changed to: {mode}")
+
+        # Громкость считается только в режиме LUFS; integrated — с момента включения
+        if mode == "LUFS" and previous != "LUFS":
+            self.reset_loudness()
+        elif mode != "LUFS":
+            self.loudness = None
+            self.update_title()
         
-        # Показываем или скрываем RMS черту в зависимости от режима
+        # Показываем или скрываем черту в зависимости от режима (в LUFS — short-term)
         for canvas in self.canvases:
-            if mode == "PEAK":
+            if mode != "RMS":
                 canvas.itemconfig(canvas.rms_bar, state='normal')  # Показываем
             else:
                 canvas.itemconfig(canvas.rms_bar, state='hidden')  # Скрываем
 
+        # Столбик теперь показывает другую величину — перерисовываем полностью
+        self.renderer.invalidate()
+        self.refresh.wake()
+
+    def set_true_peak(self, enabled):
+        """Пик по отсчетам (не выше 0 dB) или true peak 4x — выбросы выше 0 dBTP не обрезаются"""
+        self.true_peak = enabled
+        # Новый объект подменяется целиком, callback берет ссылку один раз за блок
+        self.level_meter = LevelMeter(
+            self.input_channels, peak_ceiling=None if enabled else 1.0, block_size=self.block_size, true_peak=enabled
+        )
+        print(f"Peak detection: {'true peak (4x)' if enabled else 'sample peak'}")
+
+    def reset_loudness(self):
+        """Начинает измерение громкости заново (integrated тоже)"""
+        if self.display_mode == "LUFS" and hasattr(self, 'sample_rate'):
+            # Новый объект подменяется целиком, как и скользящее окно RMS
+            self.loudness = LoudnessMeter(self.sample_rate, self.input_channels, floor=-self.LEVEL_RANGE)
+        self.update_title()
+
+    def update_title(self):
+        """В режиме LUFS заголовок показывает integrated"""
+        title = "VU" if self.input_channels == 1 else "VU Meter"
+        loudness = self.loudness
+        if self.display_mode == "LUFS":
+            title = "LUFS"
+            if loudness is not None and loudness.integrated > loudness.floor:
+                title = f"{loudness.integrated:.1f}" if self.input_channels == 1 else f"{loudness.integrated:.1f} LUFS"
+        if self.title_label.cget('text') != title:
+            self.title_label.config(text=title)
+
     def set_rms_window_size(self, window_size_ms):
         """Устанавливает размер окна для расчета RMS"""
         if window_size_ms != self.rms_window_size:
@@ -365,16 +485,14 @@ class AudioLevelMeter:
             print(f"RMS window size changed to: {window_size_ms}ms")
 
     def update_rms_buffer(self):
-        """Обновляет размер буфера RMS при изменении размера окна"""
+        """Пересоздает скользящее окно RMS при изменении размера окна"""
         if hasattr(self, 'sample_rate') and self.sample_rate > 0:
-            # Пересчитываем размер буфера
-            self.rms_buffer_size = int(self.rms_window_size * self.sample_rate / 1000)
+            window_frames = int(self.rms_window_size * self.sample_rate / 1000)
             
-            # Создаем новый буфер
-            self.audio_buffer = np.zeros((self.rms_buffer_size, self.input_channels))
-            self.buffer_index = 0
+            # Новый объект подменяется целиком — callback никогда не видит полусобранный буфер
+            self.sliding_rms = SlidingRMS(window_frames, self.input_channels, floor=10**(-60/20))
             
-            print(f"RMS buffer updated: {self.rms_buffer_size} samples ({self.rms_window_size}ms)")
+            print(f"RMS buffer updated: {window_frames} samples ({self.rms_window_size}ms)")
 
     def setup_record_button(self):
         """Настраивает кнопку записи c таймингом"""
@@ -501,12 +619,11 @@ class AudioLevelMeter:
                 records_path = os.path.join(base_records_path, date_str)
 
                 os.makedirs(records_path, exist_ok=True)
-                filename = os.path.join(records_path, f"Record {timestamp}.wav")
+                self.recorder.fmt = self.record_format
+                filename = os.path.join(records_path, f"Record {timestamp}{self.recorder.extension}")
                 
-                self.audio_file = wave.open(filename, 'wb')
-                self.audio_file.setnchannels(self.input_channels)
-                self.audio_file.setsampwidth(2)
-                self.audio_file.setframerate(self.sample_rate)
+                # Файл пишет фоновый поток рекордера
+                self.recorder.open(filename)
                 
                 self.recording = True
                 self.recording_start_time = now
@@ -515,7 +632,7 @@ class AudioLevelMeter:
                 self.update_recording_time()
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, fill='white')
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_bg, fill='#550000')
-                print(f"Recording started: {filename}")
+                print(f"Recording started: {filename} ({self.recorder.preroll_frames / self.sample_rate:.1f} s pre-roll)")
 
             except Exception as e:
                 print(f"Error starting recording: {e}")
@@ -524,10 +641,12 @@ class AudioLevelMeter:
             # Останавливаем запись
             try:
                 self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+                # Ждем, пока поток записи допишет хвост и закроет файл
+                if self.recorder.close():
                     print("Recording stopped and file saved")
+                else:
+                    print("Recording stop timed out, file may be incomplete")
+                self.recorder.report()
                 
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, text="Record")
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, fill='#555555')
@@ -540,16 +659,20 @@ class AudioLevelMeter:
             device_info = sd.query_devices(sd.default.device[0])
             self.sample_rate = int(device_info['default_samplerate'])
             print(f"Using device sample rate: {self.sample_rate} Hz")
+
+            # Пре-ролл во float32: формат (24 бит, float, FLAC) меняется в меню,
+            # а int16 квантовал бы и обрезал по 0 dBFS первые секунды файла
+            self.recorder = AudioRecorder(
+                self.sample_rate, self.input_channels, fmt=self.record_format, preroll_seconds=self.PREROLL_SECONDS,
+                preroll_dtype=np.float32, rollover_seconds=self.ROLLOVER_MINUTES * 60,
+                journal=self.JOURNAL_RECORDING
+            )
+            self.recorder.start()
             
             # Инициализация буфера для RMS данных
             self.update_rms_buffer()  # Использует текущий rms_window_size
             
-            self.audio_stream = sd.InputStream(
-                samplerate=self.sample_rate,
-                channels=self.input_channels,
-                blocksize=2048,
-                callback=self.audio_callback,
-            )
+            self.open_stream()
             self.audio_stream.start()
 
         except Exception as e:
@@ -557,78 +680,109 @@ class AudioLevelMeter:
             self.root.destroy()
             raise
 
+    def open_stream(self):
+        """Создает (не запуская) входной поток с размером блока текущего профиля задержки"""
+        stats = self.callback_stats.get(self.block_size)
+        if stats is None or stats.sample_rate != self.sample_rate:
+            stats = self.callback_stats[self.block_size] = CallbackStats(self.sample_rate, self.block_size)
+        self.stats = stats
+        self.audio_stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=self.input_channels,
+            blocksize=self.block_size,
+            callback=self.audio_callback,
+        )
+
+    def set_latency_profile(self, block_size):
+        """Переоткрывает поток с новым размером блока; запись продолжается в тот же файл"""
+        if block_size == self.block_size:
+            return
+        if self.stats is not None and self.stats.blocks:
+            print(f"{profile_label(self.block_size, self.sample_rate)}: {self.stats.summary()}")
+
+        stopped = datetime.datetime.now()
+        self.audio_stream.stop()
+        self.audio_stream.close()
+        self.block_size = block_size
+        self.level_meter = LevelMeter(
+            self.input_channels, peak_ceiling=None if self.true_peak else 1.0,
+            block_size=block_size, true_peak=self.true_peak
+        )
+        self.open_stream()
+        # Пока потока не было, вход не шел — разрыв в файле заполняем тишиной
+        # до первых блоков нового потока
+        gap = (datetime.datetime.now() - stopped).total_seconds()
+        if not self.recorder.pad_silence(int(gap * self.sample_rate)):
+            print("Silence padding timed out")
+        self.audio_stream.start()
+        print(f"Latency profile: {profile_label(block_size, self.sample_rate)}")
+
     def audio_callback(self, indata, frames, time, status):
+        started = CallbackStats.begin()
         if status:
             print(status)
 
-        # Записываем данные в файл, WAV 16bit
-        if self.recording and self.audio_file:
-            try:
-                audio_data_int16 = (indata * 32767).astype(np.int16)
-                self.audio_file.writeframes(audio_data_int16.tobytes())
-            except Exception as e:
-                print(f"Error writing to audio file: {e}")
-        
-        # Добавляем новые данные в буфер
-        frames_to_copy = min(frames, self.rms_buffer_size - self.buffer_index)
-        self.audio_buffer[self.buffer_index:self.buffer_index + frames_to_copy] = indata[:frames_to_copy]
-        self.buffer_index += frames_to_copy
+        # Запись WAV 16bit: только копия в буфер рекордера, на диск пишет его поток
+        self.recorder.push(indata)
         
-        # Если буфер заполнен, сдвигаем данные
-        if self.buffer_index >= self.rms_buffer_size:
-            self.buffer_index = 0
-        
-        # Обновляем уровни
-        for channel in range(self.input_channels):
-            # Используем все доступные данные из буфера для расчета RMS
-            valid_data_count = min(self.buffer_index + frames, self.rms_buffer_size)
-            if valid_data_count > 0:
-                channel_data = self.audio_buffer[:valid_data_count, channel]
-                rms = np.sqrt(np.mean(channel_data**2))
-                self.rms_level[channel] = 20 * np.log10(max(rms, 10**(-60/20)))
-            else:
-                self.rms_level[channel] = -self.LEVEL_RANGE
+        # Скользящий RMS всех каналов: цена зависит только от размера блока
+        self.sliding_rms.process(indata)
+
+        # Пик рассчитывается только из текущего блока: по отсчетам (ограничен 0 dB)
+        # или true peak с передискретизацией 4x
+        level_meter = self.level_meter
+        level_meter.process(indata)
+
+        # Громкость (K-фильтр и окна 400 мс / 3 с) — только в режиме LUFS
+        loudness = self.loudness
+        if loudness is not None:
+            loudness.process(indata)
+
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.sliding_rms.rms_db, level_meter.peak_db)
+        self.stats.end(started, status)
+
+    def update_meter(self):
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level[:] = self.levels.rms_db
+            peak_db = self.levels.peak_db
 
-            # Пик рассчитывается только из текущего блока (как раньше)
-            peak = np.max(np.abs(indata[:, channel]))
-            peak_capped = min(peak, 1.0)  # ограничивает индикатор на 0 dB (1.0)
-            peak_db = 20 * np.log10(max(peak_capped, 1e-6))
-            
             # Обновляем пиковый уровень с задержкой (для красной черты)
-            if peak_db > self.peak_level[channel]:
-                self.peak_level[channel] = peak_db
-                self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+            latch_peaks(
+                self.peak_level, peak_db, self.peak_hold_left,
+                self.PEAK_HOLD_TIME
+            )
 
             # Для режима PEAK - обновляем отображаемые уровни
             if self.display_mode == "PEAK":
-                if peak_db > self.peak_display_level[channel]:
-                    self.peak_display_level[channel] = peak_db
-                
+                np.maximum(self.peak_display_level, peak_db, out=self.peak_display_level)
                 # Черта RMS - плавное обновление
-                if self.rms_level[channel] > self.rms_display_level[channel]:
-                    self.rms_display_level[channel] = self.rms_level[channel]
-
-    def update_meter(self):
-        level_exceeded_title = any(level > -3 for level in self.peak_level)
-        new_color = 'red' if level_exceeded_title else 'black'
-        if new_color != self.title_label.cget('bg'):
-            self.title_label.configure(bg=new_color)
+                np.maximum(self.rms_display_level, self.rms_level, out=self.rms_display_level)
 
+        display_levels = self.display_levels
+        loudness = self.loudness
+        if loudness is not None:
+            self.update_title()
         for channel in range(self.input_channels):
-            canvas = self.canvases[channel]
-
-            level_exceeded_channel = self.peak_level[channel] > -6
-            new_color = 'red' if level_exceeded_channel else 'orange'
-            if new_color != canvas.channel_label.cget('fg'):
-                canvas.channel_label.config(fg=new_color)
-
             # Обновляем smoothed_level в зависимости от режима отображения
-            if self.display_mode == "RMS":
+            if self.display_mode == "LUFS":
+                # Столбик — momentary, черта — short-term (в smoothed_level); окна
+                # BS.1770 уже задают баллистику. Громкость одна на все каналы
+                if loudness is not None:
+                    self.smoothed_level[channel] = loudness.short_term
+                    display_level = loudness.momentary
+                else:
+                    display_level = -self.LEVEL_RANGE
+
+            elif self.display_mode == "RMS":
                 # Режим RMS - работает как раньше
                 if self.rms_level[channel] > self.smoothed_level[channel]:
                     self.smoothed_level[channel] = self.rms_level[channel]
                 else:
-                    decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                    decay_amount = self.DECAY_RATE * dt
                     self.smoothed_level[channel] = max(
                         self.smoothed_level[channel] - decay_amount, 
                         -self.LEVEL_RANGE
@@ -641,7 +795,7 @@ class AudioLevelMeter:
                 #PEAK
                 if self.peak_display_level[channel] > -self.LEVEL_RANGE:
                     distance = (self.peak_display_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
-                    alpha = 0.005 + 0.01 * distance  # 0.5-1% в зависимости от позиции
+                    alpha = rate_alpha(0.005 + 0.01 * distance, dt, self.SMOOTHING_TICK)  # 0.5-1% в зависимости от позиции
                     self.peak_display_level[channel] = (1 - alpha) * self.peak_display_level[channel] + alpha * (-self.LEVEL_RANGE)
                     if self.peak_display_level[channel] < (-self.LEVEL_RANGE + 0.1):
                         self.peak_display_level[channel] = -self.LEVEL_RANGE
@@ -656,37 +810,60 @@ class AudioLevelMeter:
                     distance = (self.rms_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
                     alpha = 0.1 + 0.3 * distance  # 10-30% в зависимости от позиции
 
+                alpha = rate_alpha(alpha, dt, self.SMOOTHING_TICK)
                 self.smoothed_level[channel] = (1 - alpha) * self.smoothed_level[channel] + alpha * self.rms_level[channel]
                 display_level = self.peak_display_level[channel]
 
             # Обновляем пиковую черту (как раньше)
-            if self.peak_hold_counter[channel] > 0:
-                self.peak_hold_counter[channel] -= 1
+            if self.peak_hold_left[channel] > 0:
+                self.peak_hold_left[channel] -= dt
             else:
                 # Экспоненциальное сглаживание пика
-                alpha = 0.1
+                alpha = rate_alpha(0.1, dt, self.SMOOTHING_TICK)
                 self.peak_level[channel] = (1 - alpha) * self.peak_level[channel] + alpha * (-self.LEVEL_RANGE)
             
             if self.peak_level[channel] < display_level:
                 self.peak_level[channel] = display_level                
 
-            
-            # Позиции для отображения
-            def db_to_pos(db):
-                return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
+            display_levels[channel] = display_level
+
+        # Рисуем только если что-то сдвинулось хотя бы на пиксель
+        if self.renderer.begin_frame(display_levels, self.peak_level, self.smoothed_level):
+            self.draw_meters()
+            self.renderer.end_frame()
+        
+        self.root.after(self.refresh.next_interval(display_levels, self.peak_level, self.smoothed_level), self.update_meter)
+
+    def draw_meters(self):
+        render = self.renderer
+
+        level_exceeded_title = any(level > -3 for level in self.peak_level)
+        render.configure(self.title_label, bg='red' if level_exceeded_title else 'black')
+
+        # Позиции для отображения
+        def db_to_pos(db):
+            return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
+
+        for channel in range(self.input_channels):
+            canvas = self.canvases[channel]
+
+            level_exceeded_channel = self.peak_level[channel] > -6
+            render.configure(canvas.channel_label, fg='red' if level_exceeded_channel else 'orange')
+
+            display_level = self.display_levels[channel]
             display_pos = db_to_pos(display_level)
             peak_pos = db_to_pos(self.peak_level[channel])
             rms_pos = db_to_pos(self.smoothed_level[channel])
             
             # Обновляем основной столбик
-            canvas.coords(canvas.level_bar, 0, display_pos, 10, 220)
+            render.coords(canvas, canvas.level_bar, 0, display_pos, 10, 220)
             
             # Обновляем пиковую черту (красная линия)
-            canvas.coords(canvas.peak_bar, 0, peak_pos, 10, peak_pos)
+            render.coords(canvas, canvas.peak_bar, 0, peak_pos, 10, peak_pos)
             
-            # Обновляем RMS черту (черная линия) только в режимe PEAK
-            if self.display_mode == "PEAK":
-                canvas.coords(canvas.rms_bar, 0, rms_pos, 10, rms_pos)
+            # Обновляем RMS черту (черная линия) в режимах PEAK и LUFS (short-term)
+            if self.display_mode != "RMS":
+                render.coords(canvas, canvas.rms_bar, 0, rms_pos, 10, rms_pos)
             
             # Выбираем цвет для основного столбика
             if display_level > -6:
@@ -696,9 +873,7 @@ class AudioLevelMeter:
             else:
                 color = 'green'
             
-            canvas.itemconfig(canvas.level_bar, fill=color)
-        
-        self.root.after(self.update_interval, self.update_meter)
+            render.itemconfig(canvas, canvas.level_bar, fill=color)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
@@ -719,11 +894,12 @@ class AudioLevelMeter:
     def close_program(self):
         """Корректно закрывает программу"""
         try:
-            if self.recording:
-                self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+            # Останавливаем запись если активна (хвост дописывается)
+            self.recording = False
+            if self.recorder:
+                self.recorder.stop()
+            self.renderer.report()
+            self.refresh.report()
             
             if hasattr(self, 'audio_stream') and self.audio_stream:
                 self.audio_stream.stop()
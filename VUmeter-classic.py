@@ -5,9 +5,14 @@ import tkinter as tk
 from tkinter import font as tkfont
 import os
 from collections import deque
-import wave
 import datetime
 
+from meterlib.levels import LevelMeter, latch_peaks
+from meterlib.recorder import AudioRecorder
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.snapshot import LevelSnapshot
+from meterlib.tk_render import TkRenderer
+
 class AudioLevelMeter:
     def __init__(self):
         self.root = tk.Tk()
@@ -34,23 +39,31 @@ class AudioLevelMeter:
         self.DECAY_RATE = 25
         
         # Состояние уровней
-        self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.peak_hold_counter = [0] * self.input_channels
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        self.level_meter = LevelMeter(self.input_channels, rms_floor=10**(-60/20), peak_ceiling=1.0, block_size=1024)
+        self.levels = LevelSnapshot(self.input_channels, floor=-self.LEVEL_RANGE)
+
+        # Отрисовка только изменившихся элементов (шкала 220 px на LEVEL_RANGE)
+        self.renderer = TkRenderer(px_per_db=220 / self.LEVEL_RANGE)
         
         # Состояние записи
         self.recording = False
-        self.audio_file = None
+        self.recorder = None
         self.recording_start_time = 0
         self.recorded_data = []
+        self.ROLLOVER_MINUTES = 15  # Долгая запись делится на файлы встык
+        self.JOURNAL_RECORDING = True  # Журнал блоков: после падения запись восстанавливает recover.py
 
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
         
-        self.update_interval = 30
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -342,12 +355,10 @@ class AudioLevelMeter:
                 records_path = os.path.join(base_records_path, date_str)
 
                 os.makedirs(records_path, exist_ok=True)
-                filename = os.path.join(records_path, f"Record {timestamp}.wav")
+                filename = os.path.join(records_path, f"Record {timestamp}{self.recorder.extension}")
                 
-                self.audio_file = wave.open(filename, 'wb')
-                self.audio_file.setnchannels(self.input_channels)
-                self.audio_file.setsampwidth(2)
-                self.audio_file.setframerate(self.sample_rate)
+                # WAV пишет фоновый поток рекордера
+                self.recorder.open(filename)
                 
                 self.recording = True
                 self.recording_start_time = now
@@ -365,10 +376,12 @@ class AudioLevelMeter:
             # Останавливаем запись
             try:
                 self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+                # Ждем, пока поток записи допишет хвост и закроет файл
+                if self.recorder.close():
                     print("Recording stopped and file saved")
+                else:
+                    print("Recording stop timed out, file may be incomplete")
+                self.recorder.report()
                 
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, text="Record")
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, fill='#555555')
@@ -381,6 +394,12 @@ class AudioLevelMeter:
             device_info = sd.query_devices(sd.default.device[0])
             self.sample_rate = int(device_info['default_samplerate'])
             print(f"Using device sample rate: {self.sample_rate} Hz")
+
+            self.recorder = AudioRecorder(
+                self.sample_rate, self.input_channels,
+                rollover_seconds=self.ROLLOVER_MINUTES * 60, journal=self.JOURNAL_RECORDING
+            )
+            self.recorder.start()
             self.audio_stream = sd.InputStream(
                 samplerate=self.sample_rate,
                 channels=self.input_channels,
@@ -398,70 +417,71 @@ class AudioLevelMeter:
         if status:
             print(status)
 
-        # Записываем данные в файл, WAV 16bit
-        if self.recording and self.audio_file:
-            try:
-                audio_data_int16 = (indata * 32767).astype(np.int16)
-                self.audio_file.writeframes(audio_data_int16.tobytes())
-            except Exception as e:
-                print(f"Error writing to audio file: {e}")
+        # Запись WAV 16bit: только копия в буфер рекордера, на диск пишет его поток
+        self.recorder.push(indata)
         
-        # Обновляем уровни
-        for channel in range(self.input_channels):
-            channel_data = indata[:, channel]
-            rms = np.sqrt(np.mean(channel_data**2))
-            self.rms_level[channel] = 20 * np.log10(max(rms, 10**(-60/20)))
-
-            peak = np.max(np.abs(channel_data))
-            peak_capped = min(peak, 1.0) # ограничивает индикатор на 0 dB (1.0)
-
-            peak_db = 20 * np.log10(max(peak_capped, 1e-6))
-            
-            
-            if peak_db > self.peak_level[channel]:
-                self.peak_level[channel] = peak_db
-                self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+        # Уровни всех каналов за один проход
+        self.level_meter.process(indata)
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.level_meter.rms_db, self.level_meter.peak_db, stream_time=time.currentTime)
 
     def update_meter(self):
-        level_exceeded_title = any(level > -3 for level in self.peak_level)
-        new_color = 'red' if level_exceeded_title else 'black'
-        if new_color != self.title_label.cget('bg'):
-            self.title_label.configure(bg=new_color)
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level[:] = self.levels.rms_db
+            latch_peaks(
+                self.peak_level, self.levels.peak_db, self.peak_hold_left,
+                self.PEAK_HOLD_TIME
+            )
 
         for channel in range(self.input_channels):
-            canvas = self.canvases[channel]
-
-            level_exceeded_channel = self.peak_level[channel] > -6
-            new_color = 'red' if level_exceeded_channel else 'orange'
-            if new_color != canvas.channel_label.cget('fg'):
-                canvas.channel_label.config(fg=new_color)
-
             if self.rms_level[channel] > self.smoothed_level[channel]:
                 self.smoothed_level[channel] = self.rms_level[channel]
             else:
-                decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * dt
                 self.smoothed_level[channel] = max(
                     self.smoothed_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
             
-            if self.peak_hold_counter[channel] > 0:
-                self.peak_hold_counter[channel] -= 1
+            if self.peak_hold_left[channel] > 0:
+                self.peak_hold_left[channel] -= dt
             else:
-                decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * 2 * dt
                 self.peak_level[channel] = max(
                     self.peak_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
-            
-            def db_to_pos(db):
-                return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
-            
+
+        # Рисуем только если что-то сдвинулось хотя бы на пиксель
+        if self.renderer.begin_frame(self.smoothed_level, self.peak_level):
+            self.draw_meters()
+            self.renderer.end_frame()
+        
+        self.root.after(self.refresh.next_interval(self.smoothed_level, self.peak_level), self.update_meter)
+
+    def draw_meters(self):
+        render = self.renderer
+
+        level_exceeded_title = any(level > -3 for level in self.peak_level)
+        render.configure(self.title_label, bg='red' if level_exceeded_title else 'black')
+
+        def db_to_pos(db):
+            return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
+
+        for channel in range(self.input_channels):
+            canvas = self.canvases[channel]
+
+            level_exceeded_channel = self.peak_level[channel] > -6
+            render.configure(canvas.channel_label, fg='red' if level_exceeded_channel else 'orange')
+
             rms_pos = db_to_pos(self.smoothed_level[channel])
             peak_pos = db_to_pos(self.peak_level[channel])
             
-            canvas.coords(canvas.level_bar, 0, rms_pos, 10, 220)
-            canvas.coords(canvas.peak_bar, 0, peak_pos, 10, peak_pos)
+            render.coords(canvas, canvas.level_bar, 0, rms_pos, 10, 220)
+            render.coords(canvas, canvas.peak_bar, 0, peak_pos, 10, peak_pos)
             
             if self.smoothed_level[channel] > -6:
                 color = 'red'
@@ -469,9 +489,7 @@ class AudioLevelMeter:
                 color = 'orange'
             else:
                 color = 'green'
-            canvas.itemconfig(canvas.level_bar, fill=color)
-        
-        self.root.after(self.update_interval, self.update_meter)
+            render.itemconfig(canvas, canvas.level_bar, fill=color)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
@@ -491,11 +509,12 @@ class AudioLevelMeter:
     def close_program(self):
         """Корректно закрывает программу"""
         try:
-            if self.recording:
-                self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+            # Останавливаем запись если активна (хвост дописывается)
+            self.recording = False
+            if self.recorder:
+                self.recorder.stop()
+            self.renderer.report()
+            self.refresh.report()
             
             if hasattr(self, 'audio_stream') and self.audio_stream:
                 self.audio_stream.stop()
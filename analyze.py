@@ -0,0 +1,104 @@
+"""Пакетный анализ записей: уровни (и спектр) по окнам в столбцовые .npz, быстрее реального времени.
+
+Те же расчеты, что у индикаторов на живом потоке, но по готовым файлам:
+WAV читается через memmap большими блоками, RMS и пик считаются сразу
+для всех окон блока.
+
+Примеры:
+    python analyze.py ~/Records                         # все .wav/.flac в папке и подпапках
+    python analyze.py "Record 12-30 01022026.wav" --window 50 --spectrum
+    python analyze.py ~/Records --output ~/QA --spectrum --bands 31
+
+Результат — "<файл>.levels.npz" (рядом с записью или в --output с той же
+структурой папок): time, rms_db, peak_db, [band_db, band_centers].
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from meterlib.analysis import LEVELS_EXTENSION, analyze_file, save_levels
+from meterlib.audiofile import AUDIO_EXTENSIONS
+
+
+def find_recordings(paths):
+    """Пары (файл, корень): корень нужен, чтобы повторить структуру папок в --output"""
+    recordings = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                recordings += [
+                    (os.path.join(root, name), path) for name in sorted(files)
+                    if name.lower().endswith(AUDIO_EXTENSIONS)
+                ]
+        else:
+            recordings.append((path, os.path.dirname(path)))
+    return recordings
+
+
+def output_path(recording, root, output_dir):
+    if output_dir is None:
+        return recording + LEVELS_EXTENSION
+    target = os.path.join(output_dir, os.path.relpath(recording, root) + LEVELS_EXTENSION)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    return target
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze recordings offline into per-window level series")
+    parser.add_argument("paths", nargs="+", help="recordings or folders to scan")
+    parser.add_argument("--output", help="folder for .levels.npz files (default: next to each recording)")
+    parser.add_argument("--window", type=float, default=100, help="analysis window, ms")
+    parser.add_argument("--spectrum", action="store_true", help="include 1/3-octave band levels")
+    parser.add_argument("--spectrum-engine", default="IIR", choices=["IIR", "FFT"])
+    parser.add_argument("--bands", type=int, default=31)
+    parser.add_argument("--min-freq", type=float, default=20)
+    parser.add_argument("--max-freq", type=float, default=16000)
+    parser.add_argument("--level-range", type=float, default=60)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    recordings = find_recordings(args.paths)
+    if not recordings:
+        print("No recordings found")
+        return
+    output_dir = os.path.expanduser(args.output) if args.output else None
+
+    band_centers = None
+    if args.spectrum:
+        band_centers = np.logspace(np.log10(args.min_freq), np.log10(args.max_freq), args.bands)
+
+    total_audio = total_time = 0.0
+    failed = 0
+    for recording, root in recordings:
+        started = time.perf_counter()
+        try:
+            result = analyze_file(
+                recording, window_ms=args.window, band_centers=band_centers, max_freq=args.max_freq,
+                spectrum_engine=args.spectrum_engine, level_range=args.level_range,
+            )
+            save_levels(output_path(recording, root, output_dir), result)
+        except (OSError, ValueError, RuntimeError) as e:
+            failed += 1
+            print(f"Failed: {recording}: {e}")
+            continue
+        elapsed = time.perf_counter() - started
+        duration = float(result['duration'])
+        total_audio += duration
+        total_time += elapsed
+        peak = float(result['peak_db'].max()) if len(result['peak_db']) else -args.level_range
+        print(f"{recording}: {duration:.0f} s in {elapsed:.2f} s ({duration / max(elapsed, 1e-9):.0f}x), peak {peak:.1f} dBFS")
+
+    print(
+        f"Analyzed {len(recordings) - failed} files, {total_audio / 60:.1f} min of audio in {total_time:.1f} s"
+        + (f", {failed} failed" if failed else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
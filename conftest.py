@@ -0,0 +1 @@
+"""Корень репозитория в sys.path для тестов meterlib (pytest подхватывает этот файл первым)."""
@@ -0,0 +1,166 @@
+"""Измеритель уровней без GUI: публикует уровни по UDP или Unix-сокету и может писать файл.
+
+Примеры:
+    python meterd.py --udp 127.0.0.1:9000 --rate 30 --true-peak
+    python meterd.py --unix /tmp/meterd.sock --spectrum --record ~/Records/capture.wav --journal
+    python meterd.py --listen-udp 127.0.0.1:9000      # печать кадров для проверки
+
+Кадр — одна датаграмма (см. meterlib.engine.pack_levels).
+"""
+import argparse
+import os
+import signal
+import socket
+import time
+
+import numpy as np
+
+from meterlib.engine import MeterEngine, pack_levels, unpack_levels
+from meterlib.latency import DEFAULT_BLOCK_SIZE
+from meterlib.recorder import AudioRecorder
+from meterlib.sinks import DEFAULT_FORMAT, SINK_FORMATS
+
+
+class LevelPublisher:
+    """Отправляет кадры уровней датаграммами на UDP-адрес или Unix-сокет"""
+    def __init__(self, udp=None, unix=None):
+        if unix:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.address = unix
+        else:
+            host, port = udp.rsplit(':', 1)
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.address = (host, int(port))
+        self.sock.setblocking(False)
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, frame):
+        try:
+            self.sock.sendto(frame, self.address)
+            self.sent += 1
+        except OSError:
+            # Нет слушателя или переполнен буфер сокета — кадр просто теряется
+            self.dropped += 1
+
+    def close(self):
+        self.sock.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless audio level meter")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--udp", help="publish level frames to HOST:PORT")
+    target.add_argument("--unix", help="publish level frames to a Unix datagram socket path")
+    target.add_argument("--listen-udp", help="print level frames received on HOST:PORT and exit on Ctrl+C")
+    parser.add_argument("--device", default=None, help="input device index or name")
+    parser.add_argument("--samplerate", type=int, default=None, help="default: device sample rate")
+    parser.add_argument("--channels", type=int, default=None, help="default: device input channels (max 2)")
+    parser.add_argument("--blocksize", type=int, default=DEFAULT_BLOCK_SIZE,
+                        help="frames per callback: 128/256 low latency, 4096 power save")
+    parser.add_argument("--rate", type=float, default=20, help="level frames per second")
+    parser.add_argument("--rms-window", type=int, default=50, help="RMS integration time, ms")
+    parser.add_argument("--true-peak", action="store_true", help="report 4x oversampled true peak (dBTP)")
+    parser.add_argument("--spectrum", action="store_true", help="include 1/3-octave band levels")
+    parser.add_argument("--spectrum-engine", default="IIR", choices=["IIR", "FFT"])
+    parser.add_argument("--bands", type=int, default=31)
+    parser.add_argument("--min-freq", type=float, default=20)
+    parser.add_argument("--max-freq", type=float, default=16000)
+    parser.add_argument("--record", help="record to this file while metering")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=list(SINK_FORMATS))
+    parser.add_argument("--journal", action="store_true",
+                        help="keep a block journal so a crashed recording can be rebuilt with recover.py")
+    return parser.parse_args()
+
+
+def listen(address):
+    host, port = address.rsplit(':', 1)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, int(port)))
+    print(f"Listening on {address}")
+    try:
+        while True:
+            frame = unpack_levels(sock.recv(65536))
+            rms = " ".join(f"{v:6.1f}" for v in frame['rms_db'])
+            peak = " ".join(f"{v:6.1f}" for v in frame['peak_hold_db'])
+            print(f"#{frame['seq']:<8} rms {rms}  peak {peak}  bands {len(frame['band_db'])}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+def main():
+    args = parse_args()
+    if args.listen_udp:
+        listen(args.listen_udp)
+        return
+
+    import sounddevice as sd
+
+    device = args.device
+    if device is not None and device.isdigit():
+        device = int(device)
+    device_info = sd.query_devices(device, 'input')
+    sample_rate = args.samplerate or int(device_info['default_samplerate'])
+    channels = args.channels or min(device_info['max_input_channels'], 2)
+    print(f"Using {device_info['name']}: {sample_rate} Hz, {channels} ch")
+
+    recorder = None
+    if args.record:
+        recorder = AudioRecorder(sample_rate, channels, fmt=args.format, journal=args.journal)
+        recorder.start()
+
+    band_centers = None
+    if args.spectrum:
+        band_centers = np.logspace(np.log10(args.min_freq), np.log10(args.max_freq), args.bands)
+    engine = MeterEngine(
+        sample_rate, channels, block_size=args.blocksize, rms_window_ms=args.rms_window,
+        band_centers=band_centers, max_freq=args.max_freq,
+        spectrum_engine=args.spectrum_engine, recorder=recorder, true_peak=args.true_peak,
+    )
+
+    publisher = None
+    if args.udp or args.unix:
+        publisher = LevelPublisher(udp=args.udp, unix=args.unix)
+
+    running = True
+
+    def request_stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    engine.start(device)
+    if recorder is not None:
+        recorder.open(os.path.expanduser(args.record))
+        print(f"Recording started: {recorder.filename}")
+
+    interval = 1.0 / args.rate
+    seq = 0
+    next_tick = time.monotonic()
+    try:
+        while running:
+            if publisher is not None:
+                publisher.send(pack_levels(engine, seq))
+            seq += 1
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    finally:
+        if recorder is not None:
+            if recorder.close():
+                print("Recording stopped and file saved")
+            else:
+                print("Recording stop timed out, file may be incomplete")
+            recorder.report()
+        engine.stop()
+        print(f"Callback: {engine.stats.summary()}")
+        if publisher is not None:
+            print(f"Published {publisher.sent} frames, dropped {publisher.dropped}")
+            publisher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Общие компоненты для индикаторов уровня, спектроанализаторов и рекордеров."""
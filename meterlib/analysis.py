@@ -0,0 +1,165 @@
+"""Пакетный анализ записей: уровни и полосы спектра по окнам, быстрее реального времени."""
+import os
+
+import numpy as np
+
+from .audiofile import open_audio
+from .levels import TruePeakMeter, to_db
+from .spectrum import create_spectrum_engine
+
+LEVELS_EXTENSION = '.levels.npz'
+
+
+def window_levels(block, window_frames, rms_floor, peak_floor=1e-6, peak_ceiling=1.0):
+    """RMS и пик (dB) каждого окна блока одним векторным проходом.
+
+    block (frames, channels), frames кратно window_frames. Та же математика,
+    что у LevelMeter на живом потоке: RMS и пик по окну, пик не выше
+    peak_ceiling, dB с полом rms_floor/peak_floor.
+    """
+    windows = len(block) // window_frames
+    shaped = block[:windows * window_frames].reshape(windows, window_frames, block.shape[1])
+    rms = np.einsum('ijk,ijk->ik', shaped, shaped)
+    rms /= window_frames
+    np.sqrt(rms, out=rms)
+    # max(|x|) = max(max(x), -min(x)) — без временного массива модулей на весь блок
+    peak = np.maximum(shaped.max(axis=1), -shaped.min(axis=1))
+    np.minimum(peak, peak_ceiling, out=peak)
+    return to_db(rms, rms_floor, out=rms), to_db(peak, peak_floor, out=peak)
+
+
+def iter_windows(reader, window_frames, chunk_seconds=30):
+    """Блоки записи, нарезанные по окнам: (часть, размер окна).
+
+    Части идут по ~chunk_seconds и содержат целое число окон размера
+    window_frames; хвост файла — отдельной частью из одного неполного окна.
+    """
+    chunk_frames = max(1, int(chunk_seconds * reader.sample_rate) // window_frames) * window_frames
+    for block in reader.blocks(chunk_frames):
+        full = len(block) // window_frames * window_frames
+        if full:
+            yield block[:full], window_frames
+        if full < len(block):
+            yield block[full:], len(block) - full
+
+
+def analyze_file(path, window_ms=100, band_centers=None, max_freq=16000, spectrum_engine="IIR",
+                 level_range=60, chunk_seconds=30):
+    """Уровни записи по окнам window_ms. Возвращает словарь столбцов.
+
+    Файл читается блоками по ~chunk_seconds (memmap для WAV); RMS и пик
+    всех окон блока считаются разом, полосы — тем же движком спектра,
+    что в окне индикатора (состояние фильтров переходит от окна к окну).
+
+    Столбцы: time (начало окна, с), rms_db и peak_db (окна × каналы),
+    band_db (окна × полосы, если задан band_centers) и описание анализа.
+    """
+    reader = open_audio(path)
+    try:
+        sample_rate = reader.sample_rate
+        window_frames = max(1, int(round(window_ms * sample_rate / 1000)))
+        windows = -(-reader.frames // window_frames)
+        rms_floor = 10 ** (-level_range / 20)
+
+        rms_db = np.empty((windows, reader.channels), dtype=np.float32)
+        peak_db = np.empty((windows, reader.channels), dtype=np.float32)
+        spectrum = None
+        band_db = None
+        if band_centers is not None:
+            # Окно анализа само задает интегрирование — без усреднения между окнами
+            options = {'averaging_seconds': 0} if spectrum_engine == "IIR" else {}
+            spectrum = create_spectrum_engine(spectrum_engine, sample_rate, band_centers, max_freq, **options)
+            band_db = np.empty((windows, len(band_centers)), dtype=np.float32)
+
+        row = 0
+        for part, size in iter_windows(reader, window_frames, chunk_seconds):
+            rms, peak = window_levels(part, size, rms_floor)
+            rows = len(rms)
+            rms_db[row:row + rows] = rms
+            peak_db[row:row + rows] = peak
+            if spectrum is not None:
+                mono = part.mean(axis=1) if part.shape[1] >= 2 else part[:, 0]
+                for i in range(rows):
+                    band = spectrum.process(mono[i * size:(i + 1) * size])
+                    np.clip(band, -level_range, 0, out=band_db[row + i])
+            row += rows
+
+        result = {
+            'time': np.arange(windows) * (window_frames / sample_rate),
+            'rms_db': rms_db,
+            'peak_db': peak_db,
+            'sample_rate': np.int32(sample_rate),
+            'window_ms': np.float32(window_ms),
+            'duration': np.float64(reader.duration),
+            'source': np.array(os.path.abspath(path)),
+        }
+        if band_db is not None:
+            result['band_db'] = band_db
+            result['band_centers'] = np.asarray(band_centers, dtype=np.float32)
+            result['spectrum_engine'] = np.array(spectrum_engine)
+        return result
+    finally:
+        reader.close()
+
+
+def file_report(path, window_ms=100, silence_db=-60.0, clip_level=0.999, chunk_seconds=30):
+    """Сводка по записи для архивного отчета (report.py).
+
+    rms_db — интегральный RMS всего файла (все каналы вместе),
+    sample_peak_db и true_peak_db — пик по отсчетам и true peak 4x
+    (TruePeakMeter, как у индикаторов; не ниже пика по отсчетам), clipped_samples — отсчеты с |x| >= clip_level,
+    silence_ratio — доля окон window_ms, где даже самый громкий канал
+    тише silence_db.
+    """
+    reader = open_audio(path)
+    try:
+        channels = reader.channels
+        window_frames = max(1, int(round(window_ms * reader.sample_rate / 1000)))
+        sum_squares = 0.0
+        sample_peak = 0.0
+        true_peak = 0.0
+        clipped = 0
+        windows = silent = 0
+        true_peak_meter = TruePeakMeter(channels, block_size=8192)
+
+        for part, size in iter_windows(reader, window_frames, chunk_seconds):
+            sum_squares += float(np.einsum('ij,ij->', part, part, dtype=np.float64))
+            peak = max(float(part.max()), -float(part.min()))
+            sample_peak = max(sample_peak, peak)
+            if peak >= clip_level:
+                clipped += np.count_nonzero(part >= clip_level) + np.count_nonzero(part <= -clip_level)
+
+            rms, _ = window_levels(part, size, 10 ** (silence_db / 20) / 10)
+            windows += len(rms)
+            silent += np.count_nonzero(rms.max(axis=1) < silence_db)
+            # Состояние интерполятора переходит от части к части — стыки не теряются
+            true_peak = max(true_peak, sample_peak, float(true_peak_meter.process(part).max()))
+
+        samples = reader.frames * channels
+        return {
+            'duration': reader.duration,
+            'sample_rate': reader.sample_rate,
+            'channels': channels,
+            'rms_db': _db(np.sqrt(sum_squares / samples)) if samples else None,
+            'sample_peak_db': _db(sample_peak),
+            'true_peak_db': _db(true_peak),
+            'clipped_samples': int(clipped),
+            'silence_ratio': round(float(silent) / windows, 4) if windows else 1.0,
+        }
+    finally:
+        reader.close()
+
+
+def _db(value, floor=1e-6):
+    return round(20 * float(np.log10(max(value, floor))), 2)
+
+
+def save_levels(path, result):
+    """Столбцы анализа в сжатый .npz (каждый столбец — отдельный массив)"""
+    np.savez_compressed(path, **result)
+
+
+def load_levels(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
@@ -0,0 +1,155 @@
+"""Чтение записей большими блоками без загрузки файла в память (WAV/RF64 через memmap, FLAC)."""
+import struct
+
+import numpy as np
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+UINT32_MAX = 0xFFFFFFFF
+
+
+class WavReader:
+    """WAV и RF64 как memmap: блоки читаются прямо из отображенного файла.
+
+    Поддерживаются PCM 16/24/32 бит и float 32/64 (в том числе
+    WAVE_FORMAT_EXTENSIBLE). Если размер data в заголовке нулевой
+    или 0xFFFFFFFF (файл не закрыт штатно), данными считается все
+    до конца файла.
+
+    blocks() отдает float32 (frames, channels) в [-1, 1] во внутреннем
+    буфере, который переиспользуется на следующем шаге.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            riff, riff_size, wave = struct.unpack('<4sI4s', f.read(12))
+            if riff not in (b'RIFF', b'RF64') or wave != b'WAVE':
+                raise ValueError(f"not a WAV file: {path}")
+            f.seek(0, 2)
+            file_size = f.tell()
+            f.seek(12)
+
+            fmt = None
+            ds64_data_size = None
+            data_offset = data_size = None
+            while data_offset is None:
+                header = f.read(8)
+                if len(header) < 8:
+                    break
+                chunk_id, size = struct.unpack('<4sI', header)
+                if chunk_id == b'fmt ':
+                    fmt = f.read(size)
+                elif chunk_id == b'ds64':
+                    ds64_data_size = struct.unpack('<QQ', f.read(16))[1]
+                    f.seek(size - 16, 1)
+                elif chunk_id == b'data':
+                    data_offset = f.tell()
+                    data_size = size
+                    continue
+                else:
+                    f.seek(size, 1)
+                f.seek(size % 2, 1)  # чанки выровнены по 2 байта
+
+        if fmt is None or data_offset is None:
+            raise ValueError(f"WAV file has no fmt or data chunk: {path}")
+
+        format_tag, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE:
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        if data_size == UINT32_MAX and ds64_data_size is not None:
+            data_size = ds64_data_size
+        if data_size in (0, UINT32_MAX) or data_offset + data_size > file_size:
+            data_size = file_size - data_offset
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.bits = bits
+        self.format_tag = format_tag
+        self.frames = data_size // block_align
+
+        if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+            dtype, self.scale = ('<f4' if bits == 32 else '<f8'), 1.0
+        elif format_tag == WAVE_FORMAT_PCM and bits == 16:
+            dtype, self.scale = '<i2', 1 / 32768
+        elif format_tag == WAVE_FORMAT_PCM and bits == 32:
+            dtype, self.scale = '<i4', 1 / 2**31
+        elif format_tag == WAVE_FORMAT_PCM and bits == 24:
+            dtype, self.scale = np.uint8, 1 / 2**31
+        else:
+            raise ValueError(f"unsupported WAV format {format_tag}, {bits} bit: {path}")
+
+        shape = (self.frames, channels, 3) if bits == 24 else (self.frames, channels)
+        self._data = np.memmap(path, dtype=dtype, mode='r', offset=data_offset, shape=shape) if self.frames else None
+        self._out = None
+        self._int24 = None
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def blocks(self, frames):
+        """Последовательные блоки по frames кадров (последний короче)"""
+        for start in range(0, self.frames, frames):
+            yield self.read(start, min(frames, self.frames - start))
+
+    def read(self, start, frames):
+        if self._out is None or len(self._out) < frames:
+            self._out = np.empty((frames, self.channels), dtype=np.float32)
+        out = self._out[:frames]
+        raw = self._data[start:start + frames]
+        if self.bits == 24:
+            # 3 байта отсчета — в старшие байты int32: знак на месте, сдвиг не нужен
+            if self._int24 is None or len(self._int24) < frames:
+                self._int24 = np.zeros((frames, self.channels), dtype='<i4')
+            packed = self._int24[:frames]
+            packed.view(np.uint8).reshape(frames, self.channels, 4)[..., 1:] = raw
+            raw = packed
+        np.multiply(raw, self.scale, out=out, casting='unsafe')
+        return out
+
+    def close(self):
+        self._data = None
+
+
+class SoundFileReader:
+    """FLAC (и все, что читает libsndfile) блоками через soundfile"""
+    def __init__(self, path):
+        if sf is None:
+            raise RuntimeError("reading this format requires the soundfile package")
+        self.path = path
+        self.file = sf.SoundFile(path)
+        self.sample_rate = self.file.samplerate
+        self.channels = self.file.channels
+        self.frames = self.file.frames
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def blocks(self, frames):
+        self.file.seek(0)
+        out = np.empty((frames, self.channels), dtype=np.float32)
+        while True:
+            block = self.file.read(frames, dtype='float32', always_2d=True, out=out)
+            if not len(block):
+                return
+            yield block
+
+    def close(self):
+        self.file.close()
+
+
+AUDIO_EXTENSIONS = ('.wav', '.flac')
+
+
+def open_audio(path):
+    """Читатель по расширению: WAV/RF64 — memmap, остальное — soundfile"""
+    if path.lower().endswith('.wav'):
+        return WavReader(path)
+    return SoundFileReader(path)
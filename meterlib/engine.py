@@ -0,0 +1,231 @@
+"""Движок измерений без GUI: уровни, пики с удержанием, спектр и запись."""
+import struct
+import time
+
+import numpy as np
+
+from .latency import CallbackStats
+from .levels import LevelMeter, SlidingRMS, latch_peaks
+from .loudness import LoudnessMeter
+from .snapshot import LevelSnapshot
+from .spectrum import create_spectrum_engine
+
+
+class MeterEngine:
+    """Все измерения AudioLevelMeter'а, отделенные от окна.
+
+    process(block) вызывается из аудио-callback'а (своего потока движка
+    или чужого — как в GUI) и обновляет заранее выделенные массивы:
+
+      rms_db        — RMS по скользящему окну rms_window_ms, по каналам
+      peak_db       — пик текущего блока: по отсчетам (не выше 0 dBFS)
+                      или, с true_peak=True, true peak 4x (dBTP, без
+                      ограничения сверху — выбросы выше 0 dBTP видны)
+      peak_hold_db  — пик с удержанием peak_hold_time секунд и спадом
+                      2 * decay_rate dB/с; время считается по кадрам,
+                      а не по тикам интерфейса
+      band_db       — уровни полос спектра в [-level_range, 0]
+      band_peak_db  — пики полос с тем же удержанием
+      loudness      — LoudnessMeter (LUFS momentary/short-term/integrated),
+                      только после set_loudness(True); иначе None
+
+    Эти массивы переписываются на каждом блоке. Клиенту из другого потока
+    (GUI, meterd) они же отдаются через levels (LevelSnapshot): версионированный
+    снимок rms/peak/band и пиков с удержанием, пики в котором накапливаются
+    до чтения.
+
+    Сглаживание для отрисовки остается за клиентом (GUI или подписчик
+    потока уровней). Если передан recorder (AudioRecorder), блок копируется
+    и в него.
+    """
+    def __init__(self, sample_rate, channels, block_size=2048, rms_window_ms=50,
+                 level_range=60, peak_hold_time=1.5, decay_rate=25,
+                 band_centers=None, max_freq=16000, spectrum_engine="IIR", recorder=None,
+                 true_peak=False):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.block_size = block_size
+        self.level_range = level_range
+        self.peak_hold_time = peak_hold_time
+        self.decay_rate = decay_rate
+        self.recorder = recorder
+
+        floor = -level_range
+        self.set_true_peak(true_peak)
+        self.peak_hold_db = np.full(channels, floor, dtype=np.float32)
+        self._peak_hold_left = np.zeros(channels, dtype=np.float32)
+        self.set_rms_window(rms_window_ms)
+
+        self.levels = LevelSnapshot(channels, floor=floor)
+        self.spectrum_enabled = band_centers is not None
+        self.spectrum = None
+        self.band_db = np.zeros(0, dtype=np.float32)
+        self.band_peak_db = np.zeros(0, dtype=np.float32)
+        self._band_hold_left = np.zeros(0, dtype=np.float32)
+        if band_centers is not None:
+            self.set_spectrum(spectrum_engine, band_centers, max_freq)
+        self.loudness = None
+
+        self.frames_processed = 0
+        self.last_block_time = 0.0
+        self.stream = None
+        # Нагрузка callback'а собственного потока (start()); чужой callback ведет свою
+        self.stats = CallbackStats(sample_rate, block_size)
+
+    def set_true_peak(self, enabled):
+        """Пик по отсчетам (с потолком 0 dBFS) или true peak с передискретизацией 4x"""
+        level_meter = LevelMeter(
+            self.channels, peak_ceiling=None if enabled else 1.0, block_size=self.block_size, true_peak=enabled
+        )
+        self.true_peak = enabled
+        self.level_meter = level_meter
+        self.peak_db = level_meter.peak_db
+
+    def set_rms_window(self, rms_window_ms):
+        window_frames = int(rms_window_ms * self.sample_rate / 1000)
+        # Новый объект подменяется целиком — callback никогда не видит полусобранный буфер
+        sliding_rms = SlidingRMS(window_frames, self.channels, floor=10**(-self.level_range/20))
+        self.rms_window_ms = rms_window_ms
+        self.sliding_rms = sliding_rms
+        self.rms_db = sliding_rms.rms_db
+
+    def set_spectrum(self, engine_name, band_centers, max_freq):
+        """Пересоздает движок спектра и сбрасывает уровни полос"""
+        bands = len(band_centers)
+        spectrum = create_spectrum_engine(engine_name, self.sample_rate, band_centers, max_freq)
+        if len(self.band_db) != bands:
+            self.band_db = np.full(bands, -self.level_range, dtype=np.float32)
+            self.band_peak_db = np.full(bands, -self.level_range, dtype=np.float32)
+            self._band_hold_left = np.zeros(bands, dtype=np.float32)
+            self.levels = LevelSnapshot(self.channels, bands, floor=-self.level_range)
+        else:
+            self.band_db.fill(-self.level_range)
+            self.band_peak_db.fill(-self.level_range)
+            self._band_hold_left.fill(0)
+        self.spectrum_engine = engine_name
+        self.spectrum = spectrum
+
+    def set_loudness(self, enabled):
+        """Включает измерение громкости (заново, с новым integrated) или выключает его"""
+        # Как и SlidingRMS — подмена объекта целиком, callback видит старый или новый
+        self.loudness = LoudnessMeter(self.sample_rate, self.channels, floor=-self.level_range) if enabled else None
+
+    def process(self, indata):
+        """Обрабатывает блок (frames, channels) из аудио-callback'а"""
+        if self.recorder is not None:
+            self.recorder.push(indata)
+
+        dt = len(indata) / self.sample_rate
+        self.sliding_rms.process(indata)
+        # Измеритель пика может подмениться из другого потока — берем его один раз
+        level_meter = self.level_meter
+        level_meter.process(indata)
+        peak_db = level_meter.peak_db
+        self._hold(self.peak_hold_db, peak_db, self._peak_hold_left, dt)
+        loudness = self.loudness
+        if loudness is not None:
+            loudness.process(indata)
+
+        if self.spectrum_enabled and self.spectrum is not None:
+            mono_signal = np.mean(indata, axis=1) if indata.shape[1] >= 2 else indata[:, 0]
+            band_db = self.spectrum.process(mono_signal)
+            np.clip(band_db, -self.level_range, 0, out=self.band_db)
+            self._hold(self.band_peak_db, self.band_db, self._band_hold_left, dt)
+            self.levels.publish(self.rms_db, peak_db, self.band_db,
+                                peak_hold_db=self.peak_hold_db, band_hold_db=self.band_peak_db)
+        else:
+            self.levels.publish(self.rms_db, peak_db, peak_hold_db=self.peak_hold_db)
+
+        self.frames_processed += len(indata)
+        self.last_block_time = time.time()
+
+    def _hold(self, held, current, hold_left, dt):
+        rising = latch_peaks(held, current, hold_left, self.peak_hold_time)
+        hold_left -= dt
+        falling = (hold_left <= 0) & ~rising
+        held[falling] = np.maximum(held[falling] - 2 * self.decay_rate * dt, -self.level_range)
+
+    # --- Собственный входной поток (для работы без GUI) ---
+
+    def start(self, device=None):
+        # sounddevice нужен только здесь: остальной движок работает и без PortAudio
+        import sounddevice as sd
+
+        if self.recorder is not None and not self.recorder.worker.is_alive():
+            self.recorder.start()
+        self.stream = sd.InputStream(
+            device=device,
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            blocksize=self.block_size,
+            callback=self._callback,
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        if self.recorder is not None:
+            self.recorder.stop()
+
+    def _callback(self, indata, frames, time_info, status):
+        started = self.stats.begin()
+        if status:
+            print(status)
+        self.process(indata)
+        self.stats.end(started, status)
+
+
+# Кадр потока уровней: заголовок + float32-массивы, little-endian.
+# magic, version, channels, bands, seq, timestamp (unix, с)
+FRAME_HEADER = struct.Struct('<4sBBHId')
+FRAME_MAGIC = b'MTRL'
+FRAME_VERSION = 1
+
+
+def pack_levels(engine, seq, timestamp=None):
+    """Упаковывает уровни движка в компактный бинарный кадр.
+
+    После заголовка идут float32: rms_db, peak_db, peak_hold_db (по каналам),
+    затем band_db и band_peak_db (по полосам; bands = 0, если спектр выключен).
+    band_peak_db — пики полос с удержанием.
+
+    Вызывается из другого потока, чем callback, поэтому уровни берутся
+    из снимка engine.levels: кадр не бывает разорванным, а peak_db — максимум
+    всех блоков с прошлого кадра. pack_levels забирает снимок (read()),
+    так что у снимка не должно быть другого читателя.
+    """
+    levels = engine.levels
+    levels.read()
+    bands = levels.bands if engine.spectrum_enabled else 0
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, engine.channels, bands, seq & 0xFFFFFFFF,
+        time.time() if timestamp is None else timestamp
+    )
+    arrays = [levels.rms_db, levels.peak_db, levels.peak_hold_db]
+    if bands:
+        arrays += [levels.band_db, levels.band_hold_db]
+    return header + np.concatenate(arrays).astype('<f4').tobytes()
+
+
+def unpack_levels(data):
+    """Разбирает кадр pack_levels в словарь массивов"""
+    magic, version, channels, bands, seq, timestamp = FRAME_HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError("not a level frame")
+    values = np.frombuffer(data, dtype='<f4', offset=FRAME_HEADER.size)
+    expected = 3 * channels + 2 * bands
+    if len(values) != expected:
+        raise ValueError(f"level frame has {len(values)} values, expected {expected}")
+    c = channels
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'rms_db': values[:c],
+        'peak_db': values[c:2 * c],
+        'peak_hold_db': values[2 * c:3 * c],
+        'band_db': values[3 * c:3 * c + bands],
+        'band_peak_db': values[3 * c + bands:],
+    }
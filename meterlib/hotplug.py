@@ -0,0 +1,102 @@
+"""Уведомления о подключении/отключении аудиоустройств (CoreAudio, macOS)."""
+import ctypes
+import ctypes.util
+import sys
+
+
+def _fourcc(code):
+    return int.from_bytes(code.encode('ascii'), 'big')
+
+
+class _PropertyAddress(ctypes.Structure):
+    _fields_ = [
+        ('mSelector', ctypes.c_uint32),
+        ('mScope', ctypes.c_uint32),
+        ('mElement', ctypes.c_uint32),
+    ]
+
+
+# OSStatus (*)(AudioObjectID, UInt32, const AudioObjectPropertyAddress *, void *)
+_LISTENER_PROC = ctypes.CFUNCTYPE(
+    ctypes.c_int32, ctypes.c_uint32, ctypes.c_uint32, ctypes.POINTER(_PropertyAddress), ctypes.c_void_p
+)
+
+SYSTEM_OBJECT = 1
+SCOPE_GLOBAL = _fourcc('glob')
+ELEMENT_MAIN = 0
+# Список устройств и устройство ввода по умолчанию
+WATCHED_PROPERTIES = ('dev#', 'dIn ')
+PROPERTY_RUN_LOOP = _fourcc('rnlp')
+
+
+class DeviceChangeListener:
+    """Вызывает on_change() при изменении списка устройств или входа по умолчанию.
+
+    Слушатели ставятся на системный объект CoreAudio через ctypes; HAL
+    вызывает их из своего потока, поэтому on_change должен только поднять
+    флаг (threading.Event и т. п.), а реагировать — поток интерфейса.
+
+    На других системах (или без CoreAudio) start() возвращает False,
+    и остается только проверка по таймауту callback'ов.
+    """
+    def __init__(self, on_change):
+        self.on_change = on_change
+        self.available = False
+        self.changes = 0
+        self._lib = None
+        self._proc = None
+        self._addresses = []
+
+    def start(self):
+        if sys.platform != 'darwin':
+            return False
+        path = ctypes.util.find_library('CoreAudio')
+        if not path:
+            return False
+        try:
+            lib = ctypes.cdll.LoadLibrary(path)
+            lib.AudioObjectAddPropertyListener.argtypes = [
+                ctypes.c_uint32, ctypes.POINTER(_PropertyAddress), _LISTENER_PROC, ctypes.c_void_p
+            ]
+            lib.AudioObjectRemovePropertyListener.argtypes = lib.AudioObjectAddPropertyListener.argtypes
+            lib.AudioObjectSetPropertyData.argtypes = [
+                ctypes.c_uint32, ctypes.POINTER(_PropertyAddress), ctypes.c_uint32, ctypes.c_void_p,
+                ctypes.c_uint32, ctypes.c_void_p
+            ]
+        except (OSError, AttributeError) as e:
+            print(f"Device change notifications unavailable: {e}")
+            return False
+
+        # Уведомления — в собственном потоке HAL, а не в run loop главного потока
+        run_loop = ctypes.c_void_p(None)
+        address = _PropertyAddress(PROPERTY_RUN_LOOP, SCOPE_GLOBAL, ELEMENT_MAIN)
+        lib.AudioObjectSetPropertyData(
+            SYSTEM_OBJECT, ctypes.byref(address), 0, None, ctypes.sizeof(run_loop), ctypes.byref(run_loop)
+        )
+
+        # Ссылку на обертку держим, пока слушатель стоит, иначе ее соберет GC
+        self._lib = lib
+        self._proc = _LISTENER_PROC(self._callback)
+        for selector in WATCHED_PROPERTIES:
+            address = _PropertyAddress(_fourcc(selector), SCOPE_GLOBAL, ELEMENT_MAIN)
+            status = lib.AudioObjectAddPropertyListener(SYSTEM_OBJECT, ctypes.byref(address), self._proc, None)
+            if status == 0:
+                self._addresses.append(address)
+            else:
+                print(f"Could not watch '{selector}': OSStatus {status}")
+        self.available = bool(self._addresses)
+        return self.available
+
+    def stop(self):
+        for address in self._addresses:
+            self._lib.AudioObjectRemovePropertyListener(SYSTEM_OBJECT, ctypes.byref(address), self._proc, None)
+        self._addresses = []
+        self.available = False
+
+    def _callback(self, object_id, count, addresses, client_data):
+        self.changes += 1
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Device change handler error: {e}")
+        return 0
@@ -0,0 +1,71 @@
+"""Журнал записи: индекс блоков рядом с WAV, чтобы восстановить файл после сбоя."""
+import json
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b'MLJ1'
+# Запись на блок: номер, смещение в кадрах, кадров, время (unix), crc32 данных блока
+RECORD = struct.Struct('<IQIdI')
+JOURNAL_EXTENSION = '.jidx'
+
+
+def journal_path(filename):
+    return filename + JOURNAL_EXTENSION
+
+
+class JournalWriter:
+    """Индекс журнала: заголовок с форматом аудио и по записи на блок.
+
+    Файл только дописывается. Данные блока уже должны быть в аудиофайле,
+    когда вызывается append(): индекс никогда не ссылается вперед данных.
+    """
+    def __init__(self, path, info):
+        self.path = path
+        self.seq = 0
+        self.frame_offset = 0
+        self.file = open(path, 'wb')
+        header = json.dumps(info).encode('utf-8')
+        self.file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self.file.flush()
+
+    def append(self, data, frames):
+        self.file.write(RECORD.pack(self.seq, self.frame_offset, frames, time.time(), zlib.crc32(data)))
+        self.file.flush()
+        self.seq += 1
+        self.frame_offset += frames
+
+    def close(self, remove=True):
+        """Закрывает индекс; remove=True — запись завершена штатно, журнал не нужен"""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        if remove:
+            os.remove(self.path)
+
+
+class JournalReader:
+    """Чтение журнала порциями, без загрузки индекса целиком"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        magic = self.file.read(len(MAGIC))
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f"not a recording journal: {path}")
+        size, = struct.unpack('<I', self.file.read(4))
+        self.info = json.loads(self.file.read(size).decode('utf-8'))
+
+    def records(self, chunk_records=256):
+        """(seq, frame_offset, frames, timestamp, crc) по порядку; недописанная последняя запись отбрасывается"""
+        while True:
+            data = self.file.read(RECORD.size * chunk_records)
+            whole = len(data) - len(data) % RECORD.size
+            yield from RECORD.iter_unpack(data[:whole])
+            if len(data) < RECORD.size * chunk_records:
+                return
+
+    def close(self):
+        self.file.close()
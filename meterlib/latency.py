@@ -0,0 +1,73 @@
+"""Профили задержки входного потока (размер блока) и нагрузка аудио-callback'а."""
+import time
+
+# (название, размер блока в кадрах) — в порядке роста задержки
+LATENCY_PROFILES = (
+    ("Low Latency", 128),
+    ("Low Latency", 256),
+    ("Balanced", 1024),
+    ("Standard", 2048),
+    ("Power Save", 4096),
+)
+DEFAULT_BLOCK_SIZE = 2048
+
+
+def profile_label(block_size, sample_rate):
+    """'Balanced 1024 (21 ms)' — задержка блока при текущей частоте"""
+    name = next((name for name, size in LATENCY_PROFILES if size == block_size), "Custom")
+    return f"{name} {block_size} ({1000 * block_size / sample_rate:.0f} ms)"
+
+
+class CallbackStats:
+    """Время работы аудио-callback'а и переполнения входа для одного размера блока.
+
+    В начале callback'а берется started = begin(), в конце вызывается
+    end(started, status). Счетчики пишет только поток callback'а; поток
+    интерфейса их только читает (summary) — блокировки не нужны, а
+    значение, прочитанное посреди обновления, отстает не больше чем на блок.
+
+    load — доля длительности блока, занятая обработкой (в среднем и
+    в худшем блоке): при max_load около 1 callback перестает успевать,
+    и PortAudio начинает терять вход (overflows).
+    """
+    def __init__(self, sample_rate, block_size):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.block_seconds = block_size / sample_rate
+        self.blocks = 0
+        self.overflows = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+
+    @staticmethod
+    def begin():
+        return time.perf_counter()
+
+    def end(self, started, status=None):
+        elapsed = time.perf_counter() - started
+        self.blocks += 1
+        self.busy_seconds += elapsed
+        if elapsed > self.max_seconds:
+            self.max_seconds = elapsed
+        if status and getattr(status, 'input_overflow', False):
+            self.overflows += 1
+
+    @property
+    def average_seconds(self):
+        return self.busy_seconds / self.blocks if self.blocks else 0.0
+
+    @property
+    def load(self):
+        return self.average_seconds / self.block_seconds
+
+    @property
+    def max_load(self):
+        return self.max_seconds / self.block_seconds
+
+    def summary(self):
+        if not self.blocks:
+            return "no data"
+        return (
+            f"{1000 * self.average_seconds:.2f} ms avg, {1000 * self.max_seconds:.2f} ms max "
+            f"({self.load:.0%}/{self.max_load:.0%} of block), {self.overflows} overflows"
+        )
@@ -0,0 +1,193 @@
+"""Расчет уровней (RMS, пик, true peak, dB) сразу по всем каналам."""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Интерполятор 4x для true peak из ITU-R BS.1770-4, приложение 2: 48 отводов, 4 фазы по 12
+TRUE_PEAK_PHASES = np.array([
+    [0.0017089843750, 0.0109863281250, -0.0196533203125, 0.0332031250000, -0.0594482421875, 0.1373291015625,
+     0.9721679687500, -0.1022949218750, 0.0476074218750, -0.0266113281250, 0.0148925781250, -0.0083007812500],
+    [-0.0291748046875, 0.0292968750000, -0.0517578125000, 0.0891113281250, -0.1665039062500, 0.4650878906250,
+     0.7797851562500, -0.2003173828125, 0.1015625000000, -0.0582275390625, 0.0330810546875, -0.0189208984375],
+    [-0.0189208984375, 0.0330810546875, -0.0582275390625, 0.1015625000000, -0.2003173828125, 0.7797851562500,
+     0.4650878906250, -0.1665039062500, 0.0891113281250, -0.0517578125000, 0.0292968750000, -0.0291748046875],
+    [-0.0083007812500, 0.0148925781250, -0.0266113281250, 0.0476074218750, -0.1022949218750, 0.9721679687500,
+     0.1373291015625, -0.0594482421875, 0.0332031250000, -0.0196533203125, 0.0109863281250, 0.0017089843750],
+], dtype=np.float32)
+
+
+def to_db(values, floor, out=None):
+    """20*log10(max(values, floor)) без промежуточных списков"""
+    out = np.maximum(values, floor, out=out)
+    np.log10(out, out=out)
+    out *= 20
+    return out
+
+
+def latch_peaks(peak_level, peak_db, hold_counter, hold_value):
+    """Поднимает удерживаемые пики там, где новый пик выше, и взводит удержание.
+
+    Возвращает маску каналов, где пик обновился.
+    """
+    rising = peak_db > peak_level
+    np.copyto(peak_level, peak_db, where=rising)
+    hold_counter[rising] = hold_value
+    return rising
+
+
+class TruePeakMeter:
+    """Пик сигнала, передискретизированного в 4 раза (true peak по BS.1770).
+
+    Интерполятор — полифазный КИХ TRUE_PEAK_PHASES: все 4 фазы всех
+    каналов считаются одним матричным умножением по скользящим окнам
+    из 12 кадров. История хранится по каналам (channels, frames): окна
+    каждого канала лежат подряд, и умножение идет через BLAS — в ~5 раз
+    быстрее, чем по (frames, channels). Последние 11 кадров блока остаются
+    в истории, поэтому выбросы между отсчетами на стыке блоков не теряются.
+    На стерео 96 кГц блок 2048 кадров — ~0.15 мс из 21 мс. Блоки длиннее
+    block_size обрабатываются кусками — память не растет с длиной блока.
+
+    process(block) возвращает peak — массив по каналам (линейный, не dB),
+    который перезаписывается на следующем блоке.
+    """
+    def __init__(self, channels, block_size=2048):
+        self.channels = channels
+        self.block_size = block_size
+        phases, taps = TRUE_PEAK_PHASES.shape
+        self.history = taps - 1
+        # Окно j — это x[n - (taps - 1 - j)], поэтому коэффициенты в обратном порядке
+        self._kernel = np.ascontiguousarray(TRUE_PEAK_PHASES[:, ::-1].T)
+        self._buffer = np.zeros((channels, self.history + block_size), dtype=np.float32)
+        self._scratch = np.empty((channels, block_size, phases), dtype=np.float32)
+        self._block_peak = np.empty(channels, dtype=np.float32)
+        self.peak = np.zeros(channels, dtype=np.float32)
+
+    def process(self, block):
+        self.peak.fill(0)
+        for start in range(0, len(block), self.block_size):
+            self._process(block[start:start + self.block_size])
+        return self.peak
+
+    def _process(self, block):
+        frames = len(block)
+        history = self.history
+        buffer = self._buffer[:, :history + frames]
+        buffer[:, history:] = block.T
+
+        # (channels, frames, taps) @ (taps, phases) -> отсчеты всех фаз
+        oversampled = self._scratch[:, :frames]
+        np.matmul(sliding_window_view(buffer, history + 1, axis=1), self._kernel, out=oversampled)
+        np.abs(oversampled, out=oversampled)
+        np.max(oversampled, axis=(1, 2), out=self._block_peak)
+        np.maximum(self.peak, self._block_peak, out=self.peak)
+
+        buffer[:, :history] = buffer[:, frames:frames + history].copy()
+
+    def reset(self):
+        self._buffer[:, :self.history] = 0
+        self.peak.fill(0)
+
+
+class LevelMeter:
+    """RMS, пик и их dB для всех каналов блока за один векторный проход.
+
+    Результаты лежат в заранее выделенных float32-массивах (по элементу на канал),
+    которые перезаписываются на каждом блоке — в callback'е нет ни циклов
+    по каналам, ни новых Python-списков.
+
+    С true_peak=True пик — true peak (TruePeakMeter), но не ниже пика по
+    отсчетам; peak_ceiling в этом режиме обычно не нужен — выбросы выше
+    0 dBTP как раз и надо видеть.
+    """
+    def __init__(self, channels, rms_floor=1e-6, peak_floor=1e-6, peak_ceiling=None, block_size=2048,
+                 true_peak=False):
+        self.channels = channels
+        self.rms_floor = rms_floor
+        self.peak_floor = peak_floor
+        self.peak_ceiling = peak_ceiling
+        self.true_peak = TruePeakMeter(channels, block_size) if true_peak else None
+
+        self.rms = np.zeros(channels, dtype=np.float32)
+        self.peak = np.zeros(channels, dtype=np.float32)
+        self.rms_db = np.full(channels, 20 * np.log10(rms_floor), dtype=np.float32)
+        self.peak_db = np.full(channels, 20 * np.log10(peak_floor), dtype=np.float32)
+
+        self._scratch = np.empty((block_size, channels), dtype=np.float32)
+
+    def process(self, block):
+        """Обрабатывает блок (frames, channels) и обновляет rms/peak/rms_db/peak_db"""
+        frames = len(block)
+        if frames > len(self._scratch):
+            self._scratch = np.empty((frames, self.channels), dtype=np.float32)
+        work = self._scratch[:frames]
+
+        np.multiply(block, block, out=work)
+        np.mean(work, axis=0, out=self.rms)
+        np.sqrt(self.rms, out=self.rms)
+
+        np.abs(block, out=work)
+        np.max(work, axis=0, out=self.peak)
+        if self.true_peak is not None:
+            np.maximum(self.peak, self.true_peak.process(block), out=self.peak)
+        if self.peak_ceiling is not None:
+            np.minimum(self.peak, self.peak_ceiling, out=self.peak)
+
+        to_db(self.rms, self.rms_floor, out=self.rms_db)
+        to_db(self.peak, self.peak_floor, out=self.peak_db)
+
+
+class SlidingRMS:
+    """RMS по скользящему окну фиксированной длины с бегущей суммой квадратов.
+
+    Квадраты отсчетов лежат в кольцевом буфере длиной в окно. На каждом блоке
+    к сумме прибавляются новые квадраты и вычитаются вытесненные, поэтому
+    цена блока зависит только от его длины, а окно всегда сплошное — без
+    пропусков на границе кольца. Пока окно не заполнено, среднее берется
+    по уже накопленным кадрам.
+    """
+    def __init__(self, window_frames, channels, floor=1e-6):
+        self.window = max(1, int(window_frames))
+        self.channels = channels
+        self.floor = floor
+
+        self.squares = np.zeros((self.window, channels), dtype=np.float32)
+        self.sum = np.zeros(channels, dtype=np.float64)
+        self.pos = 0
+        self.filled = 0
+
+        self.rms = np.zeros(channels, dtype=np.float32)
+        self.rms_db = np.full(channels, 20 * np.log10(floor), dtype=np.float32)
+        self._scratch = np.empty((min(self.window, 2048), channels), dtype=np.float32)
+
+    def process(self, block):
+        """Добавляет блок (frames, channels) и обновляет rms/rms_db"""
+        frames = len(block)
+        if frames >= self.window:
+            # Окно целиком помещается в блок — пересчитываем с нуля
+            np.multiply(block[-self.window:], block[-self.window:], out=self.squares)
+            self.sum[:] = self.squares.sum(axis=0, dtype=np.float64)
+            self.pos = 0
+            self.filled = self.window
+        else:
+            if frames > len(self._scratch):
+                self._scratch = np.empty((frames, self.channels), dtype=np.float32)
+            new = self._scratch[:frames]
+            np.multiply(block, block, out=new)
+
+            first = min(frames, self.window - self.pos)
+            self._replace(self.pos, new[:first])
+            if first < frames:
+                self._replace(0, new[first:])
+
+            self.pos = (self.pos + frames) % self.window
+            self.filled = min(self.filled + frames, self.window)
+
+        # Ошибка округления не должна уводить сумму в минус на тишине
+        np.maximum(self.sum, 0, out=self.sum)
+        np.sqrt(self.sum / self.filled, out=self.rms, casting='same_kind')
+        to_db(self.rms, self.floor, out=self.rms_db)
+
+    def _replace(self, start, new):
+        region = self.squares[start:start + len(new)]
+        self.sum -= region.sum(axis=0, dtype=np.float64)
+        self.sum += new.sum(axis=0, dtype=np.float64)
+        region[:] = new
@@ -0,0 +1,147 @@
+"""Громкость по ITU-R BS.1770 / EBU R128: K-взвешивание, momentary, short-term и integrated (LUFS)."""
+import numpy as np
+from scipy import signal
+
+# Шаг измерения и окна EBU R128, с
+STEP_SECONDS = 0.1
+MOMENTARY_SECONDS = 0.4
+SHORT_TERM_SECONDS = 3.0
+# Стробирование integrated: абсолютный порог и относительный (ниже среднего)
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# Гистограмма громкости блоков для integrated: шаг и верхняя граница, LUFS
+HISTOGRAM_STEP = 0.01
+HISTOGRAM_TOP = 10.0
+
+
+def k_weighting(sample_rate):
+    """SOS-каскад K-фильтра (полка +4 дБ и ФВЧ RLB) для любой частоты дискретизации.
+
+    Коэффициенты BS.1770 заданы для 48 кГц; здесь они получены из
+    аналоговых прототипов тем же билинейным преобразованием, на 48 кГц
+    совпадают с таблицей стандарта.
+    """
+    # Полка высоких частот (модель головы)
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [
+        (vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+        1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0,
+    ]
+
+    # ФВЧ RLB
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.array([shelf, highpass])
+
+
+def _lufs(mean_square, floor):
+    return max(-0.691 + 10 * np.log10(mean_square), floor) if mean_square > 0 else floor
+
+
+class LoudnessMeter:
+    """Громкость потока по блокам произвольной длины, с постоянной ценой блока.
+
+    process(block) прогоняет блок через K-фильтр (состояние фильтра
+    переходит от блока к блоку) и копит взвешенную по каналам сумму
+    квадратов в шаги по STEP_SECONDS. Завершенные шаги лежат в кольце
+    на SHORT_TERM_SECONDS: momentary — среднее последних 400 мс, short-term —
+    всех 3 с. Каждый завершенный 400-мс блок (с перекрытием 75 %) идет
+    в гистограмму для integrated: стробирование по абсолютному и
+    относительному порогу считается по ней, без хранения всех блоков.
+
+    momentary, short_term и integrated — LUFS, не ниже floor; пока окно
+    не набралось, значение — floor. channel_weights — веса каналов
+    по BS.1770 (1.0 для L/R/C, 1.41 для тыловых); по умолчанию все 1.0.
+    """
+    def __init__(self, sample_rate, channels, channel_weights=None, floor=-70.0):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.floor = floor
+        weights = np.ones(channels) if channel_weights is None else np.asarray(channel_weights, dtype=np.float64)
+        self.weights = weights
+
+        self.sos = k_weighting(sample_rate)
+        self.step_frames = int(round(STEP_SECONDS * sample_rate))
+        self.momentary_steps = int(round(MOMENTARY_SECONDS / STEP_SECONDS))
+        self.short_term_steps = int(round(SHORT_TERM_SECONDS / STEP_SECONDS))
+
+        bins = int(round((HISTOGRAM_TOP - ABSOLUTE_GATE) / HISTOGRAM_STEP)) + 1
+        self._histogram_count = np.zeros(bins, dtype=np.int64)
+        self._histogram_energy = np.zeros(bins, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """Начинает измерение заново (integrated тоже)"""
+        self._zi = np.zeros((len(self.sos), 2, self.channels))
+        self._steps = np.zeros(self.short_term_steps, dtype=np.float64)
+        self._step_pos = 0
+        self._steps_done = 0
+        self._partial = 0.0
+        self._partial_frames = 0
+        self._histogram_count.fill(0)
+        self._histogram_energy.fill(0)
+
+        self.momentary = self.floor
+        self.short_term = self.floor
+        self.integrated = self.floor
+        self.max_momentary = self.floor
+
+    def process(self, block):
+        """Добавляет блок (frames, channels) и обновляет momentary/short_term/integrated"""
+        if not len(block):
+            return
+        filtered, self._zi = signal.sosfilt(self.sos, block, axis=0, zi=self._zi)
+        filtered *= filtered
+        # Взвешенная по каналам энергия каждого кадра
+        energy = filtered @ self.weights
+
+        start = 0
+        frames = len(energy)
+        while start < frames:
+            take = min(frames - start, self.step_frames - self._partial_frames)
+            self._partial += float(energy[start:start + take].sum())
+            self._partial_frames += take
+            start += take
+            if self._partial_frames == self.step_frames:
+                self._finish_step(self._partial / self.step_frames)
+                self._partial = 0.0
+                self._partial_frames = 0
+
+    def _finish_step(self, mean_square):
+        self._steps[self._step_pos] = mean_square
+        self._step_pos = (self._step_pos + 1) % self.short_term_steps
+        self._steps_done += 1
+
+        if self._steps_done >= self.momentary_steps:
+            last = (self._step_pos - np.arange(1, self.momentary_steps + 1)) % self.short_term_steps
+            block_energy = float(self._steps[last].mean())
+            self.momentary = _lufs(block_energy, self.floor)
+            self.max_momentary = max(self.max_momentary, self.momentary)
+            self._gate_block(block_energy)
+        if self._steps_done >= self.short_term_steps:
+            self.short_term = _lufs(float(self._steps.mean()), self.floor)
+
+    def _gate_block(self, block_energy):
+        """400-мс блок в гистограмму и пересчет integrated"""
+        if block_energy <= 0:
+            return
+        loudness = -0.691 + 10 * np.log10(block_energy)
+        if loudness <= ABSOLUTE_GATE:
+            return
+        index = min(int((loudness - ABSOLUTE_GATE) / HISTOGRAM_STEP), len(self._histogram_count) - 1)
+        self._histogram_count[index] += 1
+        self._histogram_energy[index] += block_energy
+
+        # Относительный порог — от средней энергии блоков выше абсолютного
+        count = self._histogram_count.sum()
+        threshold = -0.691 + 10 * np.log10(self._histogram_energy.sum() / count) + RELATIVE_GATE
+        first = max(0, int(np.ceil((threshold - ABSOLUTE_GATE) / HISTOGRAM_STEP)))
+        gated_count = self._histogram_count[first:].sum()
+        if gated_count:
+            self.integrated = _lufs(float(self._histogram_energy[first:].sum() / gated_count), self.floor)
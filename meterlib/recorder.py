@@ -0,0 +1,349 @@
+"""Запись в фоновом потоке: callback только копирует кадры в кольцевой буфер."""
+import numpy as np
+
+from .ringbuffer import AudioRingBuffer, PreRollBuffer
+from .sinks import DEFAULT_FORMAT, RollingSink, sink_extension
+from .trigger import LevelTrigger
+from .worker import DSPWorker
+
+
+class AudioRecorder:
+    """Фоновая запись в выбранном формате (см. meterlib.sinks.SINK_FORMATS).
+
+    Аудио-callback вызывает push(): пока запись идет, блок копируется
+    в заранее выделенный AudioRingBuffer, и на этом работа callback'а
+    заканчивается. Поток записи собирает кадры в собственный пакетный буфер
+    и отдает приемнику крупными кусками (batch_seconds): кодирование
+    (int16/int24/float/FLAC) и диск задерживают только этот поток, так что
+    формат никак не влияет на callback.
+
+    Формат (fmt) можно менять между записями.
+
+    close() ждет, пока поток вычитает все, что уже лежит в буфере, допишет
+    неполный пакет и закроет файл, — хвост записи не теряется.
+
+    С preroll_seconds > 0 блоки идут в буфер и между записями: поток
+    записи держит последние preroll_seconds входа в PreRollBuffer (int16
+    по умолчанию, память выделена заранее), и open() начинает файл с них —
+    в запись попадает и то, что прозвучало до нажатия Record.
+
+    Файл пишется через RollingSink: с rollover_seconds/rollover_bytes
+    долгая запись делится на части встык (с точностью до кадра), а раз
+    в sync_seconds заголовок обновляется — недописанный файл читается.
+    С journal=True WAV пишется с журналом блоков (JournalSink): после
+    падения процесса запись восстанавливается recover.py.
+
+    arm(trigger, segment_name) вместо open() включает запись по уровню:
+    поток записи сам открывает файл-сегмент на LevelTrigger.START (начиная
+    с пре-ролла) и закрывает его на STOP, а тишина между сегментами на диск
+    не идет. Решения триггер принимает шагами фиксированной длины, поэтому
+    границы сегментов не зависят от отставания потока записи; без пре-ролла
+    сегмент начинается со шага, следующего за START.
+
+    pad_silence() закрывает разрыв входного потока (переподключение
+    устройства) тишиной, чтобы длительность файла совпадала с реальным
+    временем.
+
+    processor — обработка входа перед записью в потоке записи (например,
+    шумоподавление), объект с тем же интерфейсом, что StreamingSpectralGate:
+    process(block) возвращает кадры для записи (их может быть больше или
+    меньше, чем в блоке), flush() — кадры, задержанные обработкой; их
+    дописывают в конец записи (close). Через processor идет каждый блок —
+    и в пре-ролл, и в триггер, и в файл — одним непрерывным потоком:
+    сегменты триггера режут уже обработанный поток и processor не
+    сбрасывают, конец сегмента покрывает пост-ролл триггера.
+    """
+    def __init__(self, sample_rate, channels, fmt=DEFAULT_FORMAT, ring_seconds=5, batch_seconds=0.5,
+                 preroll_seconds=0, preroll_dtype=np.int16, rollover_seconds=None, rollover_bytes=None,
+                 sync_seconds=5.0, journal=False, processor=None, name="audio-writer"):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.fmt = fmt
+        self.recording = False
+        self.filename = None
+        self.rollover_seconds = rollover_seconds
+        self.rollover_bytes = rollover_bytes
+        self.sync_seconds = sync_seconds
+        self.journal = journal
+        self.processor = processor
+
+        self.ring = AudioRingBuffer(int(ring_seconds * sample_rate), channels)
+        self.worker = DSPWorker(self.ring, sample_rate, self._write_block, name=name)
+
+        self.batch = np.zeros((max(1, int(batch_seconds * sample_rate)), channels), dtype=np.float32)
+        self.batch_fill = 0
+        self.sink = None
+
+        self.preroll = None
+        if preroll_seconds > 0:
+            self.preroll = PreRollBuffer(int(preroll_seconds * sample_rate), channels, dtype=preroll_dtype)
+        self.preroll_frames = 0
+
+        # Запись по уровню (arm): триггер и имена сегментов — у потока записи
+        self.trigger = None
+        self.segment_name = None
+        self.segments = 0
+        self._segment_start = 0
+
+        # Метрики (пишутся потоком записи)
+        self.written_frames = 0
+        self.batches_written = 0
+        self.write_errors = 0
+        self.padded_frames = 0
+        self.armed_frames = 0
+        self.segment_frames = 0
+        self.rollovers = 0
+
+    def start(self):
+        """Запускает поток записи (один раз, вместе с аудиопотоком)"""
+        self.worker.start()
+
+    @property
+    def extension(self):
+        """Расширение файла для текущего формата ('.wav', '.flac')"""
+        return sink_extension(self.fmt)
+
+    def open(self, filename):
+        """Создает файл и начинает запись. Ошибки открытия файла поднимаются сразу."""
+        sink = self._create_sink(filename)
+
+        # Приемник передается потоку записи — дальше с ним работает только он.
+        # Ждем подключения, чтобы первые блоки не пришли раньше файла
+        self.worker.call(lambda: self._start_file(sink), wait=True)
+        self.filename = filename
+        self.recording = True
+
+    def arm(self, trigger, segment_name):
+        """Запись по уровню: сегменты открывает и закрывает trigger (LevelTrigger).
+
+        segment_name(index) возвращает путь файла сегмента index (1, 2, ...);
+        вызывается потоком записи в момент срабатывания. close() снимает
+        триггер и закрывает открытый сегмент.
+        """
+        self.worker.call(lambda: self._arm(trigger, segment_name), wait=True)
+        self.filename = None
+        self.recording = True
+
+    @property
+    def segment_open(self):
+        """Идет ли сейчас запись сегмента (для индикации в интерфейсе)"""
+        return self.sink is not None
+
+    def push(self, block):
+        """Вызывается из аудио-callback'а: только копия блока в кольцевой буфер"""
+        if self.recording or self.preroll is not None:
+            self.ring.write(block)
+
+    def pad_silence(self, frames, timeout=5.0):
+        """Дописывает frames кадров тишины после уже принятых блоков.
+
+        Ждет, пока поток записи это сделает: блоки, пришедшие после вызова,
+        гарантированно лягут в файл после тишины.
+        """
+        if not self.recording or frames <= 0:
+            return True
+        return self.worker.call(lambda: self._write_silence(frames), wait=True, timeout=timeout)
+
+    def close(self, timeout=5.0):
+        """Останавливает запись и ждет, пока хвост будет записан. True — если успели."""
+        if not self.recording:
+            return True
+        self.recording = False
+        return self.worker.call(self._stop_writing, wait=True, timeout=timeout)
+
+    def stop(self, timeout=5.0):
+        """Закрывает запись (если идет) и останавливает поток"""
+        if self.recording:
+            self.recording = False
+            self.worker.call(self._stop_writing)
+        self.worker.stop(timeout)
+
+    def queue_depth_ms(self):
+        return self.worker.lag_ms()
+
+    def stats(self):
+        """Глубина очереди, ее максимум (high-water) и счетчики записи"""
+        stats = self.worker.stats()
+        stats.update({
+            'queue_depth_ms': stats['lag_ms'],
+            'high_water_ms': stats['max_lag_ms'],
+            'written_frames': self.written_frames,
+            'batches_written': self.batches_written,
+            'write_errors': self.write_errors,
+            'padded_ms': 1000 * self.padded_frames / self.sample_rate,
+            'preroll_ms': 1000 * self.preroll_frames / self.sample_rate,
+            'segments': self.segments,
+            'armed_seconds': self.armed_frames / self.sample_rate,
+            'segment_seconds': self.segment_frames / self.sample_rate,
+            'rollovers': self.rollovers,
+        })
+        return stats
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"Recorder: queue {stats['queue_depth_ms']:.0f} ms, high-water {stats['high_water_ms']:.0f} ms, "
+            f"overflows {stats['overflows']} ({stats['dropped_frames']} frames), "
+            f"{stats['batches_written']} writes, {stats['write_errors']} errors, "
+            f"{stats['padded_ms']:.0f} ms of silence padding, {stats['preroll_ms']:.0f} ms pre-roll, "
+            f"{stats['rollovers']} rollovers"
+        )
+        if stats['segments']:
+            print(
+                f"Level trigger: {stats['segments']} segments, {stats['segment_seconds']:.0f} s written "
+                f"of {stats['armed_seconds']:.0f} s armed"
+            )
+
+    def _create_sink(self, filename):
+        return RollingSink(
+            self.fmt, filename, self.sample_rate, self.channels,
+            rollover_seconds=self.rollover_seconds, rollover_bytes=self.rollover_bytes,
+            sync_seconds=self.sync_seconds, on_rollover=self._on_rollover, journal=self.journal,
+        )
+
+    # --- Поток записи ---
+
+    def _on_rollover(self, filename):
+        self.filename = filename
+        self.rollovers += 1
+        print(f"Recording continues in: {filename}")
+
+    def _start_file(self, sink):
+        if self.preroll is None:
+            # Блок, проскочивший в буфер уже после прошлого close(), в новый файл не идет
+            self.ring.clear()
+        self._attach(sink)
+
+    def _attach(self, sink):
+        self.sink = sink
+        self.batch_fill = 0
+        if self.preroll is None:
+            return
+
+        # Буфер к этому моменту вычитан (команды выполняются после него), так что
+        # пре-ролл вплотную примыкает к блокам, которые придут следующими
+        self.preroll_frames = self.preroll.frames
+        for chunk in self.preroll.chunks():
+            self._append(chunk)
+        self.preroll.clear()
+
+    def _arm(self, trigger, segment_name):
+        if self.preroll is None:
+            self.ring.clear()
+        trigger.reset()
+        self.trigger = trigger
+        self.segment_name = segment_name
+        self.segments = 0
+        self.armed_frames = 0
+        self.segment_frames = 0
+
+    def _stop_writing(self):
+        self._flush_processor()
+        if self.trigger is not None and self.sink is not None:
+            self._close_segment()
+        self.trigger = None
+        self._detach()
+
+    def _open_segment(self):
+        index = self.segments + 1
+        filename = self.segment_name(index)
+        try:
+            sink = self._create_sink(filename)
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error opening segment file: {e}")
+            return
+        self.segments = index
+        self.filename = filename
+        self._segment_start = self.written_frames
+        self._attach(sink)
+        print(f"Segment {index} started: {filename}")
+
+    def _close_segment(self):
+        self._detach()
+        frames = self.written_frames - self._segment_start
+        self.segment_frames += frames
+        print(f"Segment {self.segments} saved ({frames / self.sample_rate:.1f} s)")
+
+    def _flush_processor(self):
+        """Конец записи: задержанный processor'ом хвост — в открытый файл"""
+        if self.processor is None or self.sink is None:
+            return
+        tail = self.processor.flush()
+        if tail is not None and len(tail):
+            self._append(tail)
+
+    def _detach(self):
+        if self.sink is None:
+            return
+        self._flush_batch()
+        try:
+            self.sink.close()
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error closing audio file: {e}")
+        self.sink = None
+
+    def _write_block(self, block):
+        if self.processor is not None:
+            block = self.processor.process(block)
+            if not len(block):
+                return
+
+        if self.trigger is None:
+            self._store(block)
+            return
+
+        # Триггер решает на границах своих шагов, а не кусков этого потока
+        # (их размер зависит от отставания). Кадры шага уходят в файл или
+        # пре-ролл до решения, так что сегмент начинается за пре-ролл до
+        # конца шага с START и кончается шагом с STOP — как бы ни вычитывался буфер
+        while len(block):
+            frames = min(len(block), self.trigger.frames_to_decision())
+            part, block = block[:frames], block[frames:]
+            self.armed_frames += frames
+            self._store(part)
+            event = self.trigger.process(part)
+            if event == LevelTrigger.START and self.sink is None:
+                self._open_segment()
+            elif event == LevelTrigger.STOP and self.sink is not None:
+                self._close_segment()
+
+    def _store(self, block):
+        """В открытый файл, а между файлами — в пре-ролл"""
+        if self.sink is None:
+            if self.preroll is not None:
+                self.preroll.write(block)
+            return
+        self._append(block)
+
+    def _append(self, block):
+        while len(block):
+            frames = min(len(block), len(self.batch) - self.batch_fill)
+            self.batch[self.batch_fill:self.batch_fill + frames] = block[:frames]
+            self.batch_fill += frames
+            block = block[frames:]
+            if self.batch_fill == len(self.batch):
+                self._flush_batch()
+
+    def _write_silence(self, frames):
+        if self.sink is None:
+            return
+        silence = np.zeros((min(frames, len(self.batch)), self.channels), dtype=np.float32)
+        self.padded_frames += frames
+        while frames > 0:
+            chunk = min(frames, len(silence))
+            self._append(silence[:chunk])
+            frames -= chunk
+
+    def _flush_batch(self):
+        if self.batch_fill == 0:
+            return
+        try:
+            self.sink.write(self.batch[:self.batch_fill])
+            self.written_frames += self.batch_fill
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            print(f"Error writing to audio file: {e}")
+        self.batch_fill = 0
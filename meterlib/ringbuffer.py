@@ -0,0 +1,127 @@
+"""Кольцевой буфер для передачи аудио из callback'а PortAudio в рабочий поток."""
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Кольцевой буфер без блокировок: один писатель (аудио-callback), один читатель.
+
+    Писатель двигает только write_pos, читатель — только read_pos. Оба счетчика
+    монотонно растут, поэтому заполненность = write_pos - read_pos, и стороны
+    никогда не ждут друг друга. Память выделяется один раз в конструкторе.
+    """
+    def __init__(self, capacity, channels, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self.write_pos = 0
+        self.read_pos = 0
+
+        # Статистика переполнений (пишется только писателем)
+        self.overflows = 0
+        self.dropped_frames = 0
+
+    def available(self):
+        """Сколько кадров ждут чтения"""
+        return self.write_pos - self.read_pos
+
+    def free_space(self):
+        return self.capacity - self.available()
+
+    def write(self, block):
+        """Копирует блок в буфер. При нехватке места блок отбрасывается целиком."""
+        frames = len(block)
+        if frames > self.free_space():
+            self.overflows += 1
+            self.dropped_frames += frames
+            return False
+
+        start = self.write_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if first < frames:
+            self.buffer[:frames - first] = block[first:]
+
+        # Публикуем данные только после копирования
+        self.write_pos += frames
+        return True
+
+    def read(self, max_frames=None, out=None):
+        """Забирает до max_frames кадров. Если передан out, данные пишутся в него."""
+        frames = self.available()
+        if max_frames is not None:
+            frames = min(frames, max_frames)
+        if out is None:
+            out = np.empty((frames, self.channels), dtype=self.buffer.dtype)
+
+        start = self.read_pos % self.capacity
+        first = min(frames, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < frames:
+            out[first:frames] = self.buffer[:frames - first]
+
+        self.read_pos += frames
+        return out[:frames]
+
+    def clear(self):
+        """Сбрасывает непрочитанные данные (вызывать со стороны читателя)"""
+        self.read_pos = self.write_pos
+
+
+class PreRollBuffer:
+    """Последние capacity кадров входа (новые вытесняют старые) — пре-ролл записи.
+
+    Работает в одном потоке (поток записи), память выделяется один раз.
+    В int16 буфер вдвое компактнее float32: кадры квантуются при записи
+    и переводятся обратно во float32 при чтении (chunks).
+    """
+    def __init__(self, capacity, channels, dtype=np.int16, chunk_frames=4096):
+        self.capacity = max(1, int(capacity))
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=dtype)
+        self.scale = float(np.iinfo(dtype).max) if np.issubdtype(self.buffer.dtype, np.integer) else None
+        self._scratch = np.zeros((chunk_frames, channels), dtype=np.float32)
+        self.write_pos = 0
+        self.frames = 0
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    def write(self, block):
+        if len(block) > self.capacity:
+            block = block[-self.capacity:]
+        while len(block):
+            start = self.write_pos
+            frames = min(len(block), self.capacity - start, len(self._scratch))
+            self._store(self.buffer[start:start + frames], block[:frames])
+            self.write_pos = (start + frames) % self.capacity
+            self.frames = min(self.frames + frames, self.capacity)
+            block = block[frames:]
+
+    def chunks(self):
+        """Содержимое от старых кадров к новым кусками float32 (view на общий буфер)"""
+        pos = (self.write_pos - self.frames) % self.capacity
+        left = self.frames
+        while left:
+            frames = min(left, self.capacity - pos, len(self._scratch))
+            out = self._scratch[:frames]
+            if self.scale is None:
+                out[:] = self.buffer[pos:pos + frames]
+            else:
+                np.multiply(self.buffer[pos:pos + frames], 1 / self.scale, out=out)
+            yield out
+            pos = (pos + frames) % self.capacity
+            left -= frames
+
+    def clear(self):
+        self.frames = 0
+
+    def _store(self, dst, src):
+        if self.scale is None:
+            dst[:] = src
+            return
+        tmp = self._scratch[:len(src)]
+        np.clip(src, -1.0, 1.0, out=tmp)
+        tmp *= self.scale
+        np.rint(tmp, out=tmp)
+        dst[:] = tmp
@@ -0,0 +1,87 @@
+"""Частота перерисовки индикаторов по активности сигнала."""
+import time
+
+import numpy as np
+
+
+class AdaptiveRefresh:
+    """Выбирает интервал следующего кадра по тому, движутся ли уровни.
+
+    В каждом тике интерфейс вызывает tick() — получает реальное время
+    с прошлого кадра (для удержания пиков и спада) — и next_interval(*state)
+    с текущими уровнями. Если хоть один уровень сдвинулся больше чем на
+    settle_db, индикатор переходит на fast_interval и держит его еще
+    linger секунд после последнего движения; когда все успокоилось
+    (тишина, спад закончился), кадры идут раз в idle_interval.
+
+    Интервалы — в миллисекундах, как у root.after и QTimer.
+    """
+    def __init__(self, fast_interval=16, idle_interval=200, settle_db=0.25, linger=0.5, max_dt=0.5):
+        self.fast_interval = fast_interval
+        self.idle_interval = idle_interval
+        self.settle_db = settle_db
+        self.linger = linger
+        self.max_dt = max_dt
+
+        self.interval = fast_interval
+        self._last_tick = None
+        self._last_state = None
+        self._last_active = time.monotonic()
+
+        self.ticks = 0
+        self.idle_ticks = 0
+
+    def tick(self):
+        """Секунды с прошлого кадра (первый кадр — fast_interval).
+
+        Очень долгие паузы (окно перетаскивали, система спала) обрезаются
+        до max_dt, чтобы пики не исчезали одним скачком.
+        """
+        now = time.monotonic()
+        if self._last_tick is None:
+            dt = self.fast_interval / 1000
+        else:
+            dt = min(now - self._last_tick, self.max_dt)
+        self._last_tick = now
+        return dt
+
+    def next_interval(self, *state):
+        """Интервал до следующего кадра, мс"""
+        now = time.monotonic()
+        values = np.concatenate([np.ravel(s) for s in state]).astype(np.float32)
+        last = self._last_state
+        if last is None or len(last) != len(values) or np.max(np.abs(values - last), initial=0) > self.settle_db:
+            self._last_active = now
+        self._last_state = values
+
+        self.ticks += 1
+        if now - self._last_active < self.linger:
+            self.interval = self.fast_interval
+        else:
+            self.interval = self.idle_interval
+            self.idle_ticks += 1
+        return self.interval
+
+    def wake(self):
+        """Переходит на быстрый режим сразу (смена режима, устройства, раскладки)"""
+        self._last_active = time.monotonic()
+        self._last_state = None
+        self.interval = self.fast_interval
+
+    @property
+    def idle(self):
+        return self.interval == self.idle_interval
+
+    def report(self):
+        share = 100 * self.idle_ticks / self.ticks if self.ticks else 0.0
+        print(f"Refresh: {self.ticks} frames, {share:.0f}% at idle rate ({self.idle_interval} ms)")
+
+
+def rate_alpha(alpha, dt, reference_dt):
+    """Коэффициент сглаживания, подобранный для шага reference_dt, пересчитанный на шаг dt.
+
+    (1 - alpha) за reference_dt секунд = (1 - alpha) ** (dt / reference_dt)
+    за dt: экспоненциальный спад занимает одно и то же время при любой
+    частоте кадров.
+    """
+    return 1 - (1 - alpha) ** (dt / reference_dt)
@@ -0,0 +1,349 @@
+"""Форматы записи: WAV 16/24 бит и float32 с переходом в RF64, FLAC через soundfile."""
+import os
+import struct
+import time
+
+import numpy as np
+
+from .journal import JournalWriter, journal_path
+
+try:
+    import soundfile as sf
+except ImportError:
+    sf = None
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+# Размер тела ds64 без таблицы: riffSize, dataSize, sampleCount (по 8 байт) + tableLength
+DS64_SIZE = 28
+UINT32_MAX = 0xFFFFFFFF
+
+
+def encode_pcm16(block):
+    scaled = np.clip(block, -1, 1) * 32767
+    return scaled.astype('<i2').tobytes()
+
+
+def encode_pcm24(block):
+    scaled = (np.clip(block, -1, 1) * 8388607).astype('<i4')
+    # Младшие 3 байта каждого little-endian int32
+    return scaled.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+
+def encode_float32(block):
+    return np.asarray(block, dtype='<f4').tobytes()
+
+
+WAV_SUBTYPES = {
+    # subtype: (формат, бит на отсчет, кодировщик)
+    'PCM_16': (WAVE_FORMAT_PCM, 16, encode_pcm16),
+    'PCM_24': (WAVE_FORMAT_PCM, 24, encode_pcm24),
+    'FLOAT': (WAVE_FORMAT_IEEE_FLOAT, 32, encode_float32),
+}
+
+
+class WavSink:
+    """Потоковая запись WAV, которая сама становится RF64 после 4 ГБ.
+
+    Заголовок пишется сразу с JUNK-чанком на месте будущего ds64
+    (как в EBU Tech 3306). При закрытии размеры дописываются в заголовок;
+    если файл вырос за предел 32-битных полей, RIFF меняется на RF64,
+    JUNK — на ds64 с 64-битными размерами, а старые поля получают 0xFFFFFFFF.
+    Кадры на входе — float (frames, channels). В PCM_16/PCM_24 значения
+    за пределами [-1, 1] обрезаются, а не заворачиваются; FLOAT пишет их
+    как есть — float WAV хранит и выбросы выше 0 dBFS.
+    """
+    extension = ".wav"
+
+    def __init__(self, filename, sample_rate, channels, subtype='PCM_16'):
+        self.filename = filename
+        self.sample_rate = int(sample_rate)
+        self.channels = channels
+        self.subtype = subtype
+        self.format_tag, self.bits, self.encode = WAV_SUBTYPES[subtype]
+        self.block_align = channels * self.bits // 8
+
+        self.frames_written = 0
+        self.data_bytes = 0
+        self.file = open(filename, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        f = self.file
+        f.write(b'RIFF' + struct.pack('<I', 0) + b'WAVE')
+
+        self.ds64_pos = f.tell()
+        f.write(b'JUNK' + struct.pack('<I', DS64_SIZE) + bytes(DS64_SIZE))
+
+        fmt = struct.pack(
+            '<HHIIHH', self.format_tag, self.channels, self.sample_rate,
+            self.sample_rate * self.block_align, self.block_align, self.bits
+        )
+        if self.format_tag != WAVE_FORMAT_PCM:
+            fmt += struct.pack('<H', 0)  # cbSize
+        f.write(b'fmt ' + struct.pack('<I', len(fmt)) + fmt)
+
+        self.fact_pos = None
+        if self.format_tag != WAVE_FORMAT_PCM:
+            self.fact_pos = f.tell()
+            f.write(b'fact' + struct.pack('<II', 4, 0))
+
+        f.write(b'data')
+        self.data_size_pos = f.tell()
+        f.write(struct.pack('<I', 0))
+
+    def write(self, block):
+        self.write_encoded(self.encode(block))
+
+    def write_encoded(self, data):
+        """Дописывает уже закодированные кадры (целое число block_align байт)"""
+        self.file.write(data)
+        self.data_bytes += len(data)
+        self.frames_written += len(data) // self.block_align
+
+    @property
+    def data_offset(self):
+        """Смещение первого байта аудиоданных в файле"""
+        return self.data_size_pos + 4
+
+    def size(self):
+        """Размер файла в байтах"""
+        return self.data_offset + self.data_bytes
+
+    def sync(self):
+        """Дописывает текущие размеры в заголовок и сбрасывает буферы на диск.
+
+        Файл, оборвавшийся после sync (сбой, выдернутый диск), читается
+        целиком до этого места.
+        """
+        if self.file is None:
+            return
+        self._patch_sizes(0)
+        self.file.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        pad = self.data_bytes % 2
+        if pad:
+            self.file.write(b'\x00')  # выравнивание чанка
+        self._patch_sizes(pad)
+        self.file.close()
+        self.file = None
+
+    def _patch_sizes(self, pad):
+        riff_size = self.data_size_pos + 4 + self.data_bytes + pad - 8
+
+        if riff_size <= UINT32_MAX:
+            self._patch(4, struct.pack('<I', riff_size))
+            self._patch(self.data_size_pos, struct.pack('<I', self.data_bytes))
+            if self.fact_pos is not None:
+                self._patch(self.fact_pos + 8, struct.pack('<I', self.frames_written))
+        else:
+            self._patch(0, b'RF64' + struct.pack('<I', UINT32_MAX))
+            self._patch(self.ds64_pos, b'ds64' + struct.pack(
+                '<IQQQI', DS64_SIZE, riff_size, self.data_bytes, self.frames_written, 0
+            ))
+            self._patch(self.data_size_pos, struct.pack('<I', UINT32_MAX))
+            if self.fact_pos is not None:
+                self._patch(self.fact_pos + 8, struct.pack('<I', UINT32_MAX))
+
+    def _patch(self, pos, data):
+        self.file.seek(pos)
+        self.file.write(data)
+        self.file.seek(0, 2)
+
+
+class JournalSink(WavSink):
+    """WAV, который переживает падение процесса: данные плюс журнал блоков.
+
+    Рядом с аудиофайлом ведется индекс <имя>.wav.jidx (meterlib.journal):
+    номер, смещение, время и crc32 каждого блока. Оба файла сбрасываются
+    в ОС после каждого блока, так что при падении программы в них остается
+    все, что было записано. sync() по-прежнему обновляет размеры
+    в заголовке (WavSink.sync): оборванный файл и без recover.py читается
+    до последнего sync, а журнал нужен только для хвоста после него.
+
+    При штатном закрытии журнал удаляется. Оставшийся журнал означает
+    оборванную запись — ее восстанавливает recover.py.
+    """
+    def __init__(self, filename, sample_rate, channels, subtype='PCM_16'):
+        super().__init__(filename, sample_rate, channels, subtype)
+        self.file.flush()
+        self.journal = JournalWriter(journal_path(filename), {
+            'sample_rate': self.sample_rate,
+            'channels': self.channels,
+            'subtype': self.subtype,
+            'block_align': self.block_align,
+            'data_offset': self.data_offset,
+            'started': time.time(),
+        })
+
+    def write_encoded(self, data):
+        super().write_encoded(data)
+        self.file.flush()
+        self.journal.append(data, len(data) // self.block_align)
+
+    def close(self):
+        if self.file is None:
+            return
+        super().close()
+        self.journal.close()
+
+
+class FlacSink:
+    """Потоковое кодирование FLAC через libsndfile (пакет soundfile)"""
+    extension = ".flac"
+
+    def __init__(self, filename, sample_rate, channels, subtype='PCM_24'):
+        if sf is None:
+            raise RuntimeError("FLAC recording requires the soundfile package")
+        self.filename = filename
+        self.channels = channels
+        self.subtype = subtype
+        self.frames_written = 0
+        self.file = sf.SoundFile(
+            filename, 'w', samplerate=int(sample_rate), channels=channels,
+            format='FLAC', subtype=subtype
+        )
+
+    def write(self, block):
+        self.file.write(np.clip(block, -1, 1))
+        self.frames_written += len(block)
+
+    def size(self):
+        return os.path.getsize(self.filename)
+
+    def sync(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+SINK_FORMATS = {
+    "WAV 16-bit": (WavSink, 'PCM_16'),
+    "WAV 24-bit": (WavSink, 'PCM_24'),
+    "WAV 32-bit float": (WavSink, 'FLOAT'),
+    "FLAC": (FlacSink, 'PCM_24'),
+}
+DEFAULT_FORMAT = "WAV 16-bit"
+
+
+def available_formats():
+    """Форматы, доступные в этой установке (FLAC — только с soundfile)"""
+    return [name for name, (sink, _) in SINK_FORMATS.items() if sink is not FlacSink or sf is not None]
+
+
+def sink_extension(fmt):
+    return SINK_FORMATS[fmt][0].extension
+
+
+def create_sink(fmt, filename, sample_rate, channels, journal=False):
+    """Приемник формата fmt. journal=True — WAV с журналом (JournalSink); для FLAC журнал не ведется"""
+    sink, subtype = SINK_FORMATS[fmt]
+    if journal and sink is WavSink:
+        return JournalSink(filename, sample_rate, channels, subtype)
+    return sink(filename, sample_rate, channels, subtype)
+
+
+def part_filename(filename, part):
+    """Имя части part долгой записи: 'Record.wav', 'Record part 2.wav', ..."""
+    if part == 1:
+        return filename
+    root, ext = os.path.splitext(filename)
+    return f"{root} part {part}{ext}"
+
+
+class RollingSink:
+    """Долгая запись частями: новый файл каждые rollover_seconds или rollover_bytes.
+
+    Интерфейс тот же, что у WavSink/FlacSink (write/sync/close), поэтому
+    подставляется вместо них. Граница по времени режет блок с точностью до
+    кадра; граница по размеру для WAV тоже считается в кадрах, для FLAC
+    (размер заранее неизвестен) — проверяется после каждого write. Части
+    идут встык, без пропусков и повторов кадров.
+
+    Раз в sync_seconds заголовок текущей части обновляется (sink.sync()),
+    так что после сбоя теряется не вся запись, а только последние секунды.
+
+    Части открываются и закрываются в том потоке, который вызывает write, —
+    в потоке записи; on_rollover(filename) сообщает о каждой новой части.
+    """
+    def __init__(self, fmt, filename, sample_rate, channels, rollover_seconds=None, rollover_bytes=None,
+                 sync_seconds=5.0, on_rollover=None, journal=False):
+        self.fmt = fmt
+        self.journal = journal
+        self.base_filename = filename
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.rollover_frames = int(rollover_seconds * sample_rate) if rollover_seconds else None
+        self.rollover_bytes = rollover_bytes
+        self.sync_seconds = sync_seconds
+        self.on_rollover = on_rollover
+
+        self.part = 1
+        self.frames_written = 0
+        self.sink = create_sink(fmt, filename, sample_rate, channels, journal=journal)
+        self.filename = filename
+        self._last_sync = time.monotonic()
+
+    def write(self, block):
+        while len(block):
+            # Новую часть открываем, только когда для нее есть кадры: пустых частей не бывает
+            if self._part_full():
+                self._rollover()
+            left = self._frames_left()
+            # Хотя бы кадр за проход, даже если лимит меньше заголовка
+            frames = len(block) if left is None else min(len(block), max(1, left))
+            self.sink.write(block[:frames])
+            self.frames_written += frames
+            block = block[frames:]
+
+        if self.sync_seconds and time.monotonic() - self._last_sync >= self.sync_seconds:
+            self.sync()
+
+    def size(self):
+        return self.sink.size()
+
+    def sync(self):
+        self.sink.sync()
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def _frames_left(self):
+        """Сколько кадров еще помещается в текущую часть (None — без ограничения)"""
+        left = None
+        if self.rollover_frames:
+            left = self.rollover_frames - self.sink.frames_written
+        block_align = getattr(self.sink, 'block_align', None)
+        if self.rollover_bytes and block_align:
+            by_size = (self.rollover_bytes - self.sink.size()) // block_align
+            left = by_size if left is None else min(left, by_size)
+        return left
+
+    def _part_full(self):
+        if self.sink.frames_written == 0:
+            return False
+        left = self._frames_left()
+        if left is not None and left <= 0:
+            return True
+        # Размер FLAC известен только после записи
+        return bool(self.rollover_bytes) and not hasattr(self.sink, 'block_align') and self.sink.size() >= self.rollover_bytes
+
+    def _rollover(self):
+        self.sink.close()
+        self.part += 1
+        self.filename = part_filename(self.base_filename, self.part)
+        # Если новая часть не открылась, исключение уходит в write — как у обычного приемника
+        self.sink = create_sink(self.fmt, self.filename, self.sample_rate, self.channels, journal=self.journal)
+        self._last_sync = time.monotonic()
+        if self.on_rollover is not None:
+            self.on_rollover(self.filename)
@@ -0,0 +1,111 @@
+"""Передача уровней из аудио-callback'а в поток интерфейса без блокировок."""
+import numpy as np
+
+
+class LevelSnapshot:
+    """Двойной буфер уровней с номером версии (seqlock на один писатель).
+
+    Писатель — аудио-callback — вызывает publish(): заполняет свободный слот
+    и только после этого увеличивает seq. Читатель — поток интерфейса —
+    вызывает read(): копирует опубликованный слот в свои массивы
+    (rms_db, peak_db, band_db, band_peak_db) и проверяет, что seq не ушел
+    так далеко, что писатель мог начать переписывать этот слот; если ушел,
+    чтение повторяется с более свежей версией.
+
+    Писатель, который сам держит пики с удержанием (MeterEngine), передает
+    их в publish(peak_hold_db=..., band_hold_db=...) — они, как и RMS,
+    значения последнего блока; у остальных эти массивы остаются на полу.
+
+    Пики в опубликованном снимке — максимум по всем блокам с момента
+    прошлого read(), а не пик последнего блока: сколько бы блоков ни
+    пришло между кадрами интерфейса, короткий выброс не теряется.
+    RMS и уровни полос — значения последнего блока.
+
+    Интерфейс сам ничего в этих массивах не пишет, а у callback'а нет
+    общих с интерфейсом изменяемых массивов — только этот объект.
+    """
+    READ_ATTEMPTS = 4
+
+    def __init__(self, channels, bands=0, floor=-60.0):
+        self.channels = channels
+        self.bands = bands
+        self.floor = floor
+
+        self._slots = [self._new_slot() for _ in range(2)]
+        self._peak_acc = np.full(channels, floor, dtype=np.float32)
+        self._band_peak_acc = np.full(bands, floor, dtype=np.float32)
+        self.seq = 0
+        self._consumed = 0
+
+        # Копия последнего прочитанного снимка (принадлежит читателю)
+        (self.rms_db, self.peak_db, self.band_db, self.band_peak_db,
+         self.peak_hold_db, self.band_hold_db) = self._new_slot()[:6]
+        self.time = 0.0
+        self.blocks = 0
+
+        self.torn_reads = 0
+
+    def _new_slot(self):
+        floor = self.floor
+        return [
+            np.full(self.channels, floor, dtype=np.float32),
+            np.full(self.channels, floor, dtype=np.float32),
+            np.full(self.bands, floor, dtype=np.float32),
+            np.full(self.bands, floor, dtype=np.float32),
+            np.full(self.channels, floor, dtype=np.float32),
+            np.full(self.bands, floor, dtype=np.float32),
+            0.0,  # время потока последнего блока
+            0,    # блоков с прошлого чтения
+        ]
+
+    def publish(self, rms_db, peak_db, band_db=None, stream_time=0.0, peak_hold_db=None, band_hold_db=None):
+        """Вызывается из аудио-callback'а: новый блок уровней"""
+        # Читатель забрал все до текущей версии — начинаем новый максимум
+        fresh = self._consumed == self.seq
+        if fresh:
+            np.copyto(self._peak_acc, peak_db)
+        else:
+            np.maximum(self._peak_acc, peak_db, out=self._peak_acc)
+
+        slot = self._slots[(self.seq + 1) & 1]
+        slot[0][:] = rms_db
+        slot[1][:] = self._peak_acc
+        if band_db is not None and self.bands:
+            if fresh:
+                np.copyto(self._band_peak_acc, band_db)
+            else:
+                np.maximum(self._band_peak_acc, band_db, out=self._band_peak_acc)
+            slot[2][:] = band_db
+            slot[3][:] = self._band_peak_acc
+            if band_hold_db is not None:
+                slot[5][:] = band_hold_db
+        if peak_hold_db is not None:
+            slot[4][:] = peak_hold_db
+        slot[6] = stream_time
+        slot[7] = 1 if fresh else self._slots[self.seq & 1][7] + 1
+
+        # Публикация: одна запись int'а, после нее слот принадлежит читателю
+        self.seq += 1
+
+    def read(self):
+        """Забирает свежий снимок в rms_db/peak_db/... False — нового ничего нет."""
+        for attempt in range(self.READ_ATTEMPTS):
+            seq = self.seq
+            if seq == self._consumed:
+                return False
+            slot = self._slots[seq & 1]
+            np.copyto(self.rms_db, slot[0])
+            np.copyto(self.peak_db, slot[1])
+            np.copyto(self.band_db, slot[2])
+            np.copyto(self.band_peak_db, slot[3])
+            np.copyto(self.peak_hold_db, slot[4])
+            np.copyto(self.band_hold_db, slot[5])
+            self.time = slot[6]
+            self.blocks = slot[7]
+            # Пока seq не сдвинулся, писатель в этот слот не заходил
+            if self.seq == seq:
+                break
+        else:
+            self.torn_reads += 1
+        self._consumed = seq
+        return True
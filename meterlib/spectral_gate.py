@@ -0,0 +1,124 @@
+"""Потоковое стационарное шумоподавление (спектральный гейт с overlap-add)."""
+import numpy as np
+
+
+class StreamingSpectralGate:
+    """Спектральный гейт с постоянным профилем шума.
+
+    Профиль считается один раз в fit(): для каждого канала и каждого бина
+    хранится порог |X| (mean + n_std * std в dB по кадрам шума). Дальше
+    process() обрабатывает блоки любой длины через STFT с перекрытием 75%
+    (sqrt-Hann на анализе и синтезе) и возвращает ровно столько же кадров,
+    сколько получил, с фиксированной задержкой latency = n_fft. Память
+    на блок постоянна: хранится только хвост входа, хвост overlap-add и
+    маска предыдущего кадра.
+
+    Пока профиль не задан, гейт пропускает сигнал без изменений
+    (с той же задержкой), поэтому включение профиля не сдвигает таймлайн.
+    """
+    def __init__(self, sample_rate, channels, n_fft=1024, hop=256,
+                 n_std_thresh=1.5, prop_decrease=0.6, time_smooth_ms=50):
+        if n_fft % hop:
+            raise ValueError("n_fft must be a multiple of hop")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.n_fft = n_fft
+        self.hop = hop
+        self.n_std_thresh = n_std_thresh
+        self.prop_decrease = prop_decrease
+        self.latency = n_fft
+
+        # sqrt периодического Ханна: произведение окон анализа и синтеза — Ханн
+        hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)
+        self.window = np.sqrt(hann).astype(np.float32)
+        overlap_sum = np.sum((self.window ** 2).reshape(-1, hop), axis=0)
+        self.synthesis_window = (self.window / overlap_sum.mean()).astype(np.float32)
+
+        self.time_smooth = float(np.exp(-hop / (sample_rate * time_smooth_ms / 1000)))
+        self.threshold = None
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает потоковое состояние (профиль шума сохраняется)"""
+        overlap = self.n_fft - self.hop
+        self._in_tail = np.zeros((overlap, self.channels), dtype=np.float32)
+        self._ola_tail = np.zeros((overlap, self.channels), dtype=np.float32)
+        self._out = np.zeros((self.hop, self.channels), dtype=np.float32)
+        self._mask = np.ones((self.channels, self.n_fft // 2 + 1), dtype=np.float32)
+
+    def fit(self, noise):
+        """Считает порог по записи шума (frames, channels) и сохраняет только его"""
+        noise = np.asarray(noise, dtype=np.float32)
+        if len(noise) < self.n_fft:
+            noise = np.pad(noise, ((0, self.n_fft - len(noise)), (0, 0)))
+
+        frames = self._frames(noise, (len(noise) - self.n_fft) // self.hop + 1)
+        spectrum_db = 20 * np.log10(np.abs(np.fft.rfft(frames * self.window, axis=-1)) + 1e-10)
+
+        # (frames, channels, bins) -> (channels, bins)
+        mean_db = spectrum_db.mean(axis=0)
+        std_db = spectrum_db.std(axis=0)
+        self.threshold = (10 ** ((mean_db + self.n_std_thresh * std_db) / 20)).astype(np.float32)
+        self._mask.fill(1)
+
+    def process(self, block):
+        """Обрабатывает блок (frames, channels), возвращает столько же кадров"""
+        block = np.asarray(block, dtype=np.float32)
+        x = np.concatenate((self._in_tail, block))
+        n_frames = (len(x) - (self.n_fft - self.hop)) // self.hop
+
+        completed = np.empty((0, self.channels), dtype=np.float32)
+        if n_frames > 0:
+            spectrum = np.fft.rfft(self._frames(x, n_frames) * self.window, axis=-1)
+            if self.threshold is not None:
+                spectrum *= self._gains(np.abs(spectrum))
+            y = np.fft.irfft(spectrum, n=self.n_fft, axis=-1).astype(np.float32)
+            y *= self.synthesis_window
+            completed = self._overlap_add(y, n_frames)
+            self._in_tail = x[n_frames * self.hop:].copy()
+        else:
+            self._in_tail = x
+
+        out = np.concatenate((self._out, completed))
+        self._out = out[len(block):]
+        return out[:len(block)]
+
+    def flush(self):
+        """Выдает задержанный хвост (latency кадров) и сбрасывает состояние"""
+        tail = self.process(np.zeros((self.latency, self.channels), dtype=np.float32))
+        self.reset()
+        return tail
+
+    def _frames(self, x, n_frames):
+        # (n_frames, channels, n_fft) без копирования
+        windows = np.lib.stride_tricks.sliding_window_view(x, self.n_fft, axis=0)
+        return windows[::self.hop][:n_frames]
+
+    def _gains(self, magnitude):
+        mask = (magnitude > self.threshold).astype(np.float32)
+
+        # Сглаживание маски по частоте
+        mask[..., 1:-1] = 0.25 * mask[..., :-2] + 0.5 * mask[..., 1:-1] + 0.25 * mask[..., 2:]
+
+        # Сглаживание по времени (состояние переносится между блоками)
+        a = self.time_smooth
+        for i in range(len(mask)):
+            self._mask = a * self._mask + (1 - a) * mask[i]
+            mask[i] = self._mask
+
+        return 1 - self.prop_decrease * (1 - mask)
+
+    def _overlap_add(self, y, n_frames):
+        overlap = self.n_fft - self.hop
+        ratio = self.n_fft // self.hop
+        acc = np.zeros((n_frames * self.hop + overlap, self.channels), dtype=np.float32)
+        acc[:overlap] += self._ola_tail
+
+        # (frames, channels, ratio, hop) -> сдвигаем каждую четверть кадра за раз
+        segments = y.reshape(n_frames, self.channels, ratio, self.hop)
+        for r in range(ratio):
+            part = segments[:, :, r, :].transpose(0, 2, 1).reshape(n_frames * self.hop, self.channels)
+            acc[r * self.hop:r * self.hop + n_frames * self.hop] += part
+
+        self._ola_tail = acc[n_frames * self.hop:].copy()
+        return acc[:n_frames * self.hop]
@@ -0,0 +1,424 @@
+"""Движки спектроанализатора: банк IIR-фильтров и FFT с весами полос.
+
+Оба движка принимают моно-блок и обновляют band_db — уровень каждой полосы
+в dB (RMS полосы, пол 1e-6). Полосы — 1/3 октавы вокруг band_centers,
+как в исходном create_filters.
+"""
+from functools import lru_cache
+
+import numpy as np
+from scipy import signal
+
+from .levels import to_db
+
+
+def _load_sosfilt_kernel():
+    """C-ядро sosfilt, если оно ведет себя как публичный signal.sosfilt; иначе None.
+
+    Публичная обертка тратит ~65 мкс на проверки аргументов на каждый
+    вызов — больше, чем сама фильтрация короткого блока. Но ядро — приватное
+    API SciPy: его сигнатура и правила типов менялись между версиями. Поэтому
+    оно один раз прогоняется на известном сигнале (два блока подряд, чтобы
+    проверить и состояние) и сравнивается с sosfilt; при любом расхождении
+    или исключении остается публичный путь.
+    """
+    try:
+        from scipy.signal._sosfilt import _sosfilt
+
+        sos = signal.butter(4, [0.1, 0.3], btype='bandpass', output='sos')
+        x = np.random.default_rng(0).standard_normal(64)
+        expected, expected_zi = signal.sosfilt(sos, x, zi=signal.sosfilt_zi(sos))
+
+        sos = np.array(sos)
+        zi = signal.sosfilt_zi(sos)[np.newaxis]
+        head, tail = x[np.newaxis, :40].copy(), x[np.newaxis, 40:].copy()
+        _sosfilt(sos, head, zi)
+        _sosfilt(sos, tail, zi)
+        if np.allclose(np.concatenate((head[0], tail[0])), expected) and np.allclose(zi[0], expected_zi):
+            return _sosfilt
+    except Exception:
+        pass
+    return None
+
+
+_sosfilt = _load_sosfilt_kernel()
+
+# Секция-заглушка: b = [1, 0, 0], a = [1, 0, 0]
+IDENTITY_SECTION = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+# Постоянная времени усреднения мощности полос IIR, с: прежний блок 2048 при 44.1-48 кГц
+SPECTRUM_AVERAGING_SECONDS = 0.045
+
+
+def band_edges(sample_rate, band_centers, max_freq, widen_last_from=16000):
+    """Края полос 1/3 октавы: список (low, high).
+
+    Если max_freq >= widen_last_from, верхний край последней полосы
+    тянется до max_freq (но не выше Найквиста).
+    """
+    edges = []
+    nyquist = sample_rate / 2
+    for i, center_freq in enumerate(band_centers):
+        low = center_freq / (2**(1/6))
+        high = center_freq * (2**(1/6))
+        if i == len(band_centers) - 1 and max_freq >= widen_last_from:
+            high = min(max_freq, nyquist - 1)
+        edges.append((low, high))
+    return edges
+
+
+def design_band_filters(sample_rate, band_centers, max_freq, widen_last_from=16000):
+    """Полосовые Баттерворты 1/3 октавы на полной частоте (SOS); None там, где фильтр не строится.
+
+    На полной частоте узкие полосы ниже 200 Гц численно неустойчивы,
+    поэтому там порядок 2, выше — 4.
+    """
+    filters = []
+    for center_freq, (low, high) in zip(band_centers, band_edges(sample_rate, band_centers, max_freq, widen_last_from)):
+        try:
+            order = 2 if center_freq < 200 else 4
+            sos = signal.butter(order, [low, high], btype='bandpass', fs=sample_rate, output='sos')
+            filters.append(sos)
+        except Exception:
+            filters.append(None)
+    return filters
+
+
+def _sosfilt_inplace(sos, x, zi):
+    """Фильтрует x (1, frames) и обновляет zi (1, sections, 2) на месте"""
+    if _sosfilt is not None:
+        _sosfilt(sos, x, zi)
+    else:
+        x[0], zi[0] = signal.sosfilt(sos, x[0], zi=zi[0])
+
+
+def _stack_sos(filters):
+    sections = [len(sos) if sos is not None else 1 for sos in filters]
+    stacked = np.tile(IDENTITY_SECTION, (len(filters), max(sections), 1))
+    for i, sos in enumerate(filters):
+        if sos is None:
+            stacked[i, 0, :3] = 0  # нулевое усиление: полоса всегда на полу
+        else:
+            stacked[i, :len(sos)] = sos
+    stacked.setflags(write=False)
+    return stacked, tuple(sections), tuple(i for i, sos in enumerate(filters) if sos is None)
+
+
+@lru_cache(maxsize=32)
+def _stacked_band_sos(sample_rate, band_centers, max_freq, widen_last_from):
+    return _stack_sos(design_band_filters(sample_rate, band_centers, max_freq, widen_last_from))
+
+
+def _centers_key(band_centers):
+    return tuple(round(float(f), 6) for f in band_centers)
+
+
+def band_filter_bank(sample_rate, band_centers, max_freq, widen_last_from=16000):
+    """SOSFilterBank для полос 1/3 октавы на полной частоте.
+
+    Коэффициенты кешируются по (sample_rate, band_centers, max_freq), поэтому
+    возврат к уже встречавшимся настройкам не пересчитывает фильтры заново;
+    состояние у каждого банка свое.
+    """
+    sos, sections, failed = _stacked_band_sos(float(sample_rate), _centers_key(band_centers),
+                                              float(max_freq), widen_last_from)
+    return SOSFilterBank(sos, sections, failed)
+
+
+class SOSFilterBank:
+    """Параллельный банк SOS-фильтров с общим состоянием.
+
+    Коэффициенты всех полос лежат в одном массиве (bands, sections, 6):
+    короткие каскады дополнены секциями-заглушками. Состояние — массив
+    (bands, sections, 2), который переживает границы блоков, поэтому
+    низкие полосы не стартуют с нуля на каждом блоке. Выход всех полос
+    пишется в одну матрицу (bands, frames), а RMS и dB считаются по ней
+    одним векторным проходом.
+
+    SciPy не умеет применять разные коэффициенты вдоль оси батча, поэтому
+    сама фильтрация — по вызову C-ядра sosfilt на полосу, прямо в строку
+    выходной матрицы и в строку состояния, без промежуточных копий.
+    """
+    def __init__(self, sos, sections=None, failed=()):
+        self.sos = sos
+        self.bands = len(sos)
+        self.sections = sections if sections is not None else (sos.shape[1],) * self.bands
+        self.failed = failed
+        self.zi = np.zeros((self.bands, sos.shape[1], 2))
+        # Ядру нужны записываемые C-массивы; заглушки почти ничего не стоят
+        self._band_sos = [np.array(band_sos) for band_sos in sos]
+
+        self.output = np.zeros((self.bands, 0))
+        self.band_rms = np.zeros(self.bands)
+        self.band_db = np.full(self.bands, -120, dtype=np.float32)
+
+    def reset(self):
+        self.zi.fill(0)
+
+    def filter(self, x):
+        """Фильтрует моно-блок всеми полосами, возвращает матрицу (bands, frames)"""
+        x = np.asarray(x, dtype=np.float64)
+        if self.output.shape[1] != len(x):
+            self.output = np.empty((self.bands, len(x)))
+        self.output[:] = x
+        for i, sos in enumerate(self._band_sos):
+            _sosfilt_inplace(sos, self.output[i:i + 1], self.zi[i:i + 1])
+        return self.output
+
+    def process(self, x):
+        """Фильтрует блок и обновляет band_rms/band_db (RMS полос, пол 1e-6)"""
+        filtered = self.filter(x)
+        np.einsum('ij,ij->i', filtered, filtered, out=self.band_rms)
+        self.band_rms /= max(filtered.shape[1], 1)
+        np.sqrt(self.band_rms, out=self.band_rms)
+        to_db(self.band_rms, 1e-6, out=self.band_db)
+        return self.band_db
+
+
+# Полоса уходит на уровень k, если ее верхний край <= BAND_HEADROOM * (sample_rate / 2**k)
+BAND_HEADROOM = 0.2
+MAX_DECIMATION_LEVELS = 8
+# Антиалиасинг перед каждым /2: Чебышев II, 60 dB от 0.4 частоты уровня.
+# Все, что после прореживания ляжет ниже BAND_HEADROOM, подавлено на 60 dB,
+# а полоса пропускания до 0.1 частоты уровня плоская
+DECIMATION_LOWPASS = signal.cheby2(8, 60, 0.8, output='sos')
+
+
+@lru_cache(maxsize=32)
+def _multirate_design(sample_rate, band_centers, max_freq, widen_last_from, band_order):
+    edges = band_edges(sample_rate, band_centers, max_freq, widen_last_from)
+
+    band_levels = []
+    for low, high in edges:
+        level = int(np.floor(np.log2(BAND_HEADROOM * sample_rate / high))) if high > 0 else 0
+        band_levels.append(min(max(level, 0), MAX_DECIMATION_LEVELS))
+
+    levels = []
+    for level in range(max(band_levels) + 1):
+        rate = sample_rate / 2**level
+        indices = tuple(i for i, band_level in enumerate(band_levels) if band_level == level)
+        filters = []
+        for i in indices:
+            try:
+                filters.append(signal.butter(band_order, edges[i], btype='bandpass', fs=rate, output='sos'))
+            except Exception:
+                filters.append(None)
+        stacked = _stack_sos(filters) if filters else None
+        levels.append((indices, stacked))
+    return tuple(levels)
+
+
+def multirate_filter_bank(sample_rate, band_centers, max_freq, widen_last_from=16000, band_order=4):
+    """MultirateFilterBank для полос 1/3 октавы; проект кешируется как в band_filter_bank"""
+    design = _multirate_design(float(sample_rate), _centers_key(band_centers),
+                               float(max_freq), widen_last_from, band_order)
+    return MultirateFilterBank(sample_rate, design)
+
+
+def multirate_band_responses(sample_rate, band_centers, max_freq, freqs, widen_last_from=16000, band_order=4):
+    """|H(f)|^2 полос MultirateFilterBank на частотах freqs (исходной частоты), массив (bands, freqs).
+
+    Отклик полосы — ее фильтр на частоте уровня, умноженный на НЧ-фильтры
+    всех прореживаний до этого уровня. Выше Найквиста уровня фильтр полосы
+    периодичен — так учитывается и то, что проходит через наложение
+    (подавленное НЧ-фильтрами на 60 dB).
+    """
+    design = _multirate_design(float(sample_rate), _centers_key(band_centers),
+                               float(max_freq), widen_last_from, band_order)
+    freqs = np.asarray(freqs, dtype=np.float64)
+    bands = max((max(indices) + 1 for indices, stacked in design if stacked is not None), default=0)
+    responses = np.zeros((bands, len(freqs)))
+    chain = np.ones(len(freqs))
+    for level, (indices, stacked) in enumerate(design):
+        rate = sample_rate / 2**level
+        if level:
+            _, lowpass = signal.sosfreqz(DECIMATION_LOWPASS, worN=freqs, fs=2 * rate)
+            chain *= np.abs(lowpass) ** 2
+        if stacked is None:
+            continue
+        sos, sections, failed = stacked
+        for j, i in enumerate(indices):
+            if j not in failed:
+                _, response = signal.sosfreqz(sos[j, :sections[j]], worN=freqs, fs=rate)
+                responses[i] = chain * np.abs(response) ** 2
+    return responses
+
+
+class HalfDecimator:
+    """Антиалиасинговый НЧ-фильтр и прореживание в 2 раза с состоянием между блоками.
+
+    Фаза прореживания переносится между блоками, поэтому блоки нечетной
+    длины (на глубоких уровнях) не сдвигают сетку отсчетов.
+    """
+    def __init__(self, sos=DECIMATION_LOWPASS):
+        self.sos = np.array(sos)
+        self.zi = np.zeros((1, len(self.sos), 2))
+        self.phase = 0
+
+    def reset(self):
+        self.zi.fill(0)
+        self.phase = 0
+
+    def process(self, x):
+        y = np.array(x, dtype=np.float64, ndmin=2)
+        _sosfilt_inplace(self.sos, y, self.zi)
+        out = y[0, self.phase::2]
+        self.phase = (self.phase - len(x)) % 2
+        return out
+
+
+class MultirateFilterBank:
+    """Банк полос 1/3 октавы на дереве октавного прореживания.
+
+    Сигнал на каждом уровне — предыдущий уровень после НЧ-фильтра и
+    прореживания в 2 раза. Полоса считается на самом глубоком уровне, где
+    ее верхний край не выше BAND_HEADROOM от частоты уровня, поэтому
+    полосы 20-200 Гц работают на частоте в десятки раз ниже исходной.
+    Там узкий полосовой фильтр уже хорошо обусловлен, и у всех полос один
+    порядок (band_order, по умолчанию 4) — без отката на порядок 2.
+
+    Цена: дерево стоит меньше двух НЧ-фильтров на полной частоте, а банк
+    каждого уровня обрабатывает вдвое меньше отсчетов, чем предыдущий.
+    Мощность полосы сохраняется при прореживании, поэтому RMS на уровне
+    сравним с RMS на полной частоте.
+    """
+    def __init__(self, sample_rate, design):
+        self.sample_rate = sample_rate
+        self.levels = []
+        bands = 0
+        failed = []
+        for level, (indices, stacked) in enumerate(design):
+            decimator = HalfDecimator() if level else None
+            bank = None
+            if stacked is not None:
+                sos, sections, level_failed = stacked
+                bank = SOSFilterBank(sos, sections, level_failed)
+                failed.extend(indices[i] for i in level_failed)
+                bands = max(bands, max(indices) + 1)
+            self.levels.append((decimator, np.array(indices, dtype=np.intp), bank))
+
+        self.bands = bands
+        self.failed = tuple(sorted(failed))
+        self.band_db = np.full(bands, -120, dtype=np.float32)
+
+    def reset(self):
+        for decimator, _, bank in self.levels:
+            if decimator is not None:
+                decimator.reset()
+            if bank is not None:
+                bank.reset()
+
+    def process(self, x):
+        """Обрабатывает моно-блок и обновляет band_db (RMS полос, пол 1e-6)"""
+        x = np.asarray(x, dtype=np.float64)
+        for decimator, indices, bank in self.levels:
+            if decimator is not None:
+                x = decimator.process(x)
+            # На глубоком уровне короткий блок может не дать ни одного отсчета —
+            # тогда у полос уровня остается прошлое значение
+            if bank is not None and len(x):
+                self.band_db[indices] = bank.process(x)
+        return self.band_db
+
+
+class IIRSpectrum:
+    """Банк полосовых IIR-фильтров с состоянием между блоками (на дереве прореживания).
+
+    Мощность полос усредняется экспоненциально с постоянной времени
+    averaging_seconds, а не по одному блоку: показания не зависят от размера
+    блока — на блоках 128 кадров полосы не дрожат, а на 4096 не замирают.
+    averaging_seconds=0 — уровень одного блока (для анализа по окнам).
+    """
+    name = "IIR"
+
+    def __init__(self, sample_rate, band_centers, max_freq, averaging_seconds=SPECTRUM_AVERAGING_SECONDS):
+        self.sample_rate = sample_rate
+        self.averaging_seconds = averaging_seconds
+        self.bank = multirate_filter_bank(sample_rate, band_centers, max_freq)
+        self.band_db = np.full(self.bank.bands, -120, dtype=np.float32)
+        self._power = np.zeros(self.bank.bands)
+        self._block_power = np.zeros(self.bank.bands)
+
+    def process(self, mono):
+        band_db = self.bank.process(mono)
+        if self.averaging_seconds <= 0:
+            self.band_db[:] = band_db
+            return self.band_db
+        alpha = 1 - np.exp(-len(mono) / (self.averaging_seconds * self.sample_rate))
+        np.power(10.0, band_db / 10, out=self._block_power)
+        self._power += alpha * (self._block_power - self._power)
+        # Пол 1e-6 по RMS, как у самих полос
+        np.maximum(self._power, 1e-12, out=self._block_power)
+        np.log10(self._block_power, out=self._block_power)
+        self.band_db[:] = 10 * self._block_power
+        return self.band_db
+
+
+class FFTSpectrum:
+    """Все полосы за одно rFFT на блок.
+
+    Каждый блок дописывается в историю длиной fft_size, история умножается
+    на окно Ханна и переводится в спектр мощности. Мощность полосы —
+    скалярное произведение спектра на заранее посчитанную строку весов:
+    |H(f)|^2 полос IIR-движка (multirate_band_responses: фильтр полосы
+    с НЧ-фильтрами прореживания) на частотах бинов.
+
+    Точность относительно IIRSpectrum при 48 кГц и fft_size=8192:
+      * синус в центре полосы — ±0.1 dB от ~80 Гц и выше, ±0.25 dB от 50 Гц;
+        на 20-40 Гц полоса уже 4 бинов, главный лепесток окна размазывает
+        тон по соседям, и FFT показывает на 1-7 dB меньше;
+      * утечка тона в соседнюю полосу — как у IIR (около -25 dB) от ~125 Гц;
+        ниже ее поднимает лепесток окна: -7..-22 dB на 20-100 Гц;
+      * широкополосный шум — ±0.2 dB от 50 Гц, на 20-40 Гц от -3.5 до +1.1 dB.
+    Время интегрирования другое: окно 8192 отсчетов (~170 мс) против
+    усреднения SPECTRUM_AVERAGING_SECONDS (45 мс) у IIR. По CPU — примерно
+    в 3 раза дешевле IIRSpectrum на блок 2048.
+    """
+    name = "FFT"
+
+    def __init__(self, sample_rate, band_centers, max_freq, fft_size=8192):
+        self.sample_rate = sample_rate
+        self.fft_size = fft_size
+        self.history = np.zeros(fft_size, dtype=np.float32)
+        self.window = signal.get_window('hann', fft_size).astype(np.float32)
+        self.band_db = np.full(len(band_centers), -120, dtype=np.float32)
+
+        freqs = np.fft.rfftfreq(fft_size, 1 / sample_rate)
+        weights = np.zeros((len(band_centers), len(freqs)))
+        responses = multirate_band_responses(sample_rate, band_centers, max_freq, freqs)
+        weights[:len(responses)] = responses
+
+        # Односторонний спектр: все бины, кроме DC и Найквиста, считаются дважды;
+        # нормировка на энергию окна дает среднюю мощность (Парсеваль)
+        one_sided = np.full(len(freqs), 2.0)
+        one_sided[0] = 1.0
+        one_sided[-1] = 1.0
+        weights *= one_sided / (fft_size * np.sum(self.window.astype(np.float64) ** 2))
+        self.weights = weights.astype(np.float32)
+
+    def process(self, mono):
+        n = len(mono)
+        if n >= self.fft_size:
+            self.history[:] = mono[-self.fft_size:]
+        else:
+            self.history[:-n] = self.history[n:]
+            self.history[-n:] = mono
+
+        spectrum = np.fft.rfft(self.history * self.window)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        band_power = self.weights @ power.astype(np.float32)
+
+        np.sqrt(band_power, out=band_power)
+        np.maximum(band_power, 1e-6, out=band_power)
+        np.log10(band_power, out=self.band_db)
+        self.band_db *= 20
+        return self.band_db
+
+
+SPECTRUM_ENGINES = {
+    IIRSpectrum.name: IIRSpectrum,
+    FFTSpectrum.name: FFTSpectrum,
+}
+
+
+def create_spectrum_engine(name, sample_rate, band_centers, max_freq, **options):
+    return SPECTRUM_ENGINES[name](sample_rate, band_centers, max_freq, **options)
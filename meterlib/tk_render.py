@@ -0,0 +1,115 @@
+"""Отрисовка tkinter-индикаторов только по изменениям."""
+import time
+
+import numpy as np
+
+
+class TkRenderer:
+    """Кеш последнего нарисованного состояния для элементов Canvas и виджетов.
+
+    coords/itemconfig/configure сравнивают новое значение с тем, что уже
+    отправлено в Tk, и вызывают Tcl только при изменении. Координаты
+    округляются до пикселя, поэтому дробные сдвиги уровня, которые
+    на экране не видны, не стоят ни одного вызова.
+
+    begin_frame(*state) дополнительно позволяет пропустить кадр целиком:
+    если состояние индикаторов (в пикселях) не изменилось с прошлого кадра,
+    метод возвращает False и отрисовку можно не начинать.
+
+    Счетчики: fps (нарисованные кадры в секунду), среднее время отрисовки,
+    число пропущенных кадров и вызовов Tcl.
+    """
+    def __init__(self, px_per_db=1.0, stats_window=1.0):
+        self.px_per_db = px_per_db
+        self.stats_window = stats_window
+        self._coords = {}
+        self._options = {}
+        self._last_state = None
+
+        self.frames_drawn = 0
+        self.frames_skipped = 0
+        self.tcl_calls = 0
+        self.render_time = 0.0
+        self.fps = 0.0
+        self.render_ms = 0.0
+        self._frame_start = 0.0
+        self._window_start = time.perf_counter()
+        self._window_frames = 0
+        self._window_time = 0.0
+
+    def begin_frame(self, *state):
+        """Начинает кадр. False — состояние не изменилось, рисовать не нужно."""
+        if state:
+            key = np.round(np.concatenate([np.ravel(s) for s in state]) * self.px_per_db).astype(np.int32).tobytes()
+            if key == self._last_state:
+                self.frames_skipped += 1
+                self._update_rates()
+                return False
+            self._last_state = key
+        self._frame_start = time.perf_counter()
+        return True
+
+    def end_frame(self):
+        elapsed = time.perf_counter() - self._frame_start
+        self.frames_drawn += 1
+        self.render_time += elapsed
+        self._window_frames += 1
+        self._window_time += elapsed
+        self._update_rates()
+
+    def invalidate(self):
+        """Забывает кеш (после пересоздания элементов или смены раскладки)"""
+        self._coords.clear()
+        self._options.clear()
+        self._last_state = None
+
+    def coords(self, canvas, item, *coords):
+        key = (canvas, item)
+        rounded = tuple(int(round(c)) for c in coords)
+        if self._coords.get(key) != rounded:
+            canvas.coords(item, *rounded)
+            self._coords[key] = rounded
+            self.tcl_calls += 1
+
+    def itemconfig(self, canvas, item, **options):
+        self._apply((canvas, item), options, lambda changed: canvas.itemconfig(item, **changed))
+
+    def configure(self, widget, **options):
+        self._apply((widget, None), options, lambda changed: widget.configure(**changed))
+
+    def _apply(self, key, options, call):
+        cached = self._options.setdefault(key, {})
+        changed = {name: value for name, value in options.items() if cached.get(name) != value}
+        if changed:
+            call(changed)
+            cached.update(changed)
+            self.tcl_calls += 1
+
+    def _update_rates(self):
+        now = time.perf_counter()
+        span = now - self._window_start
+        if span >= self.stats_window:
+            self.fps = self._window_frames / span
+            self.render_ms = 1000 * self._window_time / self._window_frames if self._window_frames else 0.0
+            self._window_start = now
+            self._window_frames = 0
+            self._window_time = 0.0
+
+    def stats(self):
+        total = self.frames_drawn + self.frames_skipped
+        return {
+            'fps': self.fps,
+            'render_ms': self.render_ms,
+            'frames_drawn': self.frames_drawn,
+            'frames_skipped': self.frames_skipped,
+            'skipped_ratio': self.frames_skipped / total if total else 0.0,
+            'tcl_calls_per_frame': self.tcl_calls / self.frames_drawn if self.frames_drawn else 0.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"Render: {stats['fps']:.0f} fps, {stats['render_ms']:.2f} ms/frame, "
+            f"{stats['frames_skipped']} of {stats['frames_drawn'] + stats['frames_skipped']} frames skipped, "
+            f"{stats['tcl_calls_per_frame']:.1f} Tcl calls/frame"
+        )
@@ -0,0 +1,81 @@
+"""Запись по уровню: когда открывать и закрывать сегменты файла."""
+import numpy as np
+
+
+class LevelTrigger:
+    """Гистерезис по уровню блока для записи сегментами.
+
+    Уровень оценивается шагами по block_frames кадров (блок аудио-callback'а),
+    а не кусками, которыми поток записи вычитывает буфер: их размер зависит
+    от отставания, а начало и конец сегмента не должны. process(block)
+    принимает не больше frames_to_decision() кадров; на границе шага он
+    возвращает START, когда RMS шага (по самому громкому каналу) достигает
+    attack_db, и STOP, когда уровень продержался ниже release_db
+    hold_seconds подряд.
+    Эти секунды после сигнала остаются в сегменте (пост-ролл), а паузы
+    между фразами короче hold_seconds не режут запись на куски. release_db
+    ниже attack_db: уровень, колеблющийся около одного порога, не открывает
+    и не закрывает сегмент на каждом блоке.
+    """
+    START = 'start'
+    STOP = 'stop'
+
+    def __init__(self, sample_rate, attack_db=-40.0, release_db=-50.0, hold_seconds=2.0, block_frames=1024):
+        if release_db > attack_db:
+            raise ValueError("release_db must not be above attack_db")
+        self.sample_rate = sample_rate
+        self.attack_db = attack_db
+        self.release_db = release_db
+        self.hold_seconds = hold_seconds
+        self.hold_frames = int(hold_seconds * sample_rate)
+        self.block_frames = block_frames
+
+        self.active = False
+        self.quiet_frames = 0
+        self.level_db = -np.inf
+        # Сумма квадратов по каналам и число кадров текущего шага
+        self._energy = 0.0
+        self._filled = 0
+
+    def frames_to_decision(self):
+        """Сколько кадров осталось до конца текущего шага"""
+        return self.block_frames - self._filled
+
+    def process(self, block):
+        """Кадры шага -> START, STOP или None (шаг не закончен или состояние не изменилось)"""
+        frames = len(block)
+        if frames == 0:
+            return None
+        if frames > self.frames_to_decision():
+            raise ValueError("block crosses a trigger step boundary")
+        self._energy = self._energy + np.einsum('ij,ij->j', block, block)
+        self._filled += frames
+        if self._filled < self.block_frames:
+            return None
+
+        mean_square = self._energy / self.block_frames
+        self._energy = 0.0
+        self._filled = 0
+        self.level_db = 10 * np.log10(max(float(np.max(mean_square)), 1e-12))
+
+        if not self.active:
+            if self.level_db >= self.attack_db:
+                self.active = True
+                self.quiet_frames = 0
+                return self.START
+            return None
+
+        if self.level_db >= self.release_db:
+            self.quiet_frames = 0
+            return None
+        self.quiet_frames += self.block_frames
+        if self.quiet_frames >= self.hold_frames:
+            self.active = False
+            return self.STOP
+        return None
+
+    def reset(self):
+        self.active = False
+        self.quiet_frames = 0
+        self._energy = 0.0
+        self._filled = 0
@@ -0,0 +1,103 @@
+"""Рабочий поток для тяжелой обработки аудио вне real-time callback'а."""
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class DSPWorker(threading.Thread):
+    """Забирает блоки из AudioRingBuffer и передает их обработчику handler(block).
+
+    handler получает view на внутренний буфер, который переиспользуется
+    на следующем шаге — если данные нужны дольше, их надо скопировать.
+    Управляющие команды (call) выполняются в этом же потоке после того,
+    как буфер вычитан, поэтому порядок команд и аудиоданных сохраняется.
+    """
+    def __init__(self, ring, sample_rate, handler, chunk_frames=4096,
+                 poll_interval=0.01, name="dsp-worker"):
+        super().__init__(name=name, daemon=True)
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.handler = handler
+        self.chunk_frames = chunk_frames
+        self.poll_interval = poll_interval
+        self.commands = queue.Queue()
+
+        self._chunk = np.zeros((chunk_frames, ring.channels), dtype=ring.buffer.dtype)
+        self._running = True
+
+        # Метрики
+        self.processed_frames = 0
+        self.max_lag_frames = 0
+        self.errors = 0
+
+    def call(self, func, wait=False, timeout=2.0):
+        """Выполняет func в рабочем потоке. С wait=True ждет завершения."""
+        done = threading.Event() if wait else None
+        self.commands.put((func, done))
+        if done is not None:
+            return done.wait(timeout)
+        return True
+
+    def run(self):
+        while self._running:
+            had_data = self._drain()
+            if not self.commands.empty():
+                self._drain()
+                self._run_commands()
+            elif not had_data:
+                time.sleep(self.poll_interval)
+
+        # Дописываем хвост и выполняем оставшиеся команды
+        self._drain()
+        self._run_commands()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def _drain(self):
+        lag = self.ring.available()
+        if lag == 0:
+            return False
+        self.max_lag_frames = max(self.max_lag_frames, lag)
+
+        while self.ring.available():
+            block = self.ring.read(self.chunk_frames, out=self._chunk)
+            try:
+                self.handler(block)
+            except Exception as e:
+                self.errors += 1
+                print(f"DSP worker error: {e}")
+            self.processed_frames += len(block)
+        return True
+
+    def _run_commands(self):
+        while True:
+            try:
+                func, done = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                func()
+            except Exception as e:
+                print(f"DSP worker command error: {e}")
+            finally:
+                if done is not None:
+                    done.set()
+
+    def lag_ms(self):
+        return 1000 * self.ring.available() / self.sample_rate
+
+    def stats(self):
+        """Сводка для отчета: текущее/максимальное отставание и переполнения"""
+        return {
+            'lag_ms': self.lag_ms(),
+            'max_lag_ms': 1000 * self.max_lag_frames / self.sample_rate,
+            'overflows': self.ring.overflows,
+            'dropped_frames': self.ring.dropped_frames,
+            'processed_frames': self.processed_frames,
+            'errors': self.errors,
+        }
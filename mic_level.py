@@ -1,8 +1,11 @@
 import sounddevice as sd
-import numpy as np
 import tkinter as tk
 from tkinter import font as tkfont
 
+from meterlib.levels import LevelMeter
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.snapshot import LevelSnapshot
+
 class AudioLevelMeter:
     def __init__(self):
         self.root = tk.Tk()
@@ -22,14 +25,17 @@ class AudioLevelMeter:
         self.rms_level = -self.LEVEL_RANGE
         self.smoothed_level = -self.LEVEL_RANGE
         self.last_peak_time = 0
-        self.peak_hold_counter = 0
+        self.peak_hold_left = 0.0  # Остаток удержания (сек)
+        self.level_meter = LevelMeter(1, rms_floor=1e-6, block_size=1024)
+        self.levels = LevelSnapshot(1, floor=-self.LEVEL_RANGE)
         
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
         
-        self.update_interval = 30  # мс
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -115,33 +121,37 @@ class AudioLevelMeter:
         if status:
             print(status)
         
-        rms = np.sqrt(np.mean(indata**2))
-        self.rms_level = 20 * np.log10(max(rms, 1e-6))
-        
-        peak = np.max(np.abs(indata))
-        peak_db = 20 * np.log10(max(peak, 1e-6))
-        
-        if peak_db > self.peak_level:
-            self.peak_level = peak_db
-            self.last_peak_time = time.currentTime  # Фиксируем время последнего пика
-            self.peak_hold_counter = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+        self.level_meter.process(indata)
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.level_meter.rms_db, self.level_meter.peak_db, stream_time=time.currentTime)
 
     def update_meter(self):
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level = float(self.levels.rms_db[0])
+            peak_db = float(self.levels.peak_db[0])
+            if peak_db > self.peak_level:
+                self.peak_level = peak_db
+                self.last_peak_time = self.levels.time  # Фиксируем время последнего пика
+                self.peak_hold_left = self.PEAK_HOLD_TIME
+
         # Обновление RMS уровня (зеленый индикатор)
         if self.rms_level > self.smoothed_level:
             self.smoothed_level = self.rms_level
         else:
-            decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+            decay_amount = self.DECAY_RATE * dt
             self.smoothed_level = max(
                 self.smoothed_level - decay_amount, 
                 -self.LEVEL_RANGE
             )
         
         # Обновление пикового уровня (красный индикатор)
-        if self.peak_hold_counter > 0:
-            self.peak_hold_counter -= 1
+        if self.peak_hold_left > 0:
+            self.peak_hold_left -= dt
         else:
-            decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+            decay_amount = self.DECAY_RATE * 2 * dt
             self.peak_level = max(
                 self.peak_level - decay_amount, 
                 -self.LEVEL_RANGE
@@ -165,7 +175,7 @@ class AudioLevelMeter:
             color = 'green'
         self.canvas.itemconfig(self.level_bar, fill=color)
         
-        self.root.after(self.update_interval, self.update_meter)
+        self.root.after(self.refresh.next_interval(self.smoothed_level, self.peak_level), self.update_meter)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
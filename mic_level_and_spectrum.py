@@ -2,7 +2,12 @@ import sounddevice as sd
 import numpy as np
 import tkinter as tk
 from tkinter import font as tkfont
-from scipy import signal
+
+from meterlib.levels import latch_peaks
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.snapshot import LevelSnapshot
+from meterlib.spectrum import multirate_filter_bank
+from meterlib.tk_render import TkRenderer
 
 class SpectrumAnalyzer:
     def __init__(self):
@@ -35,7 +40,7 @@ class SpectrumAnalyzer:
         self.rms_level = -self.LEVEL_RANGE
         self.smoothed_rms = -self.LEVEL_RANGE
         self.peak_rms = -self.LEVEL_RANGE
-        self.peak_rms_hold_counter = 0
+        self.peak_rms_hold_left = 0.0
 
         # UI elements storage
         self.freq_labels = []
@@ -56,36 +61,28 @@ class SpectrumAnalyzer:
         self.band_levels = np.full(self.NUM_BANDS, -self.LEVEL_RANGE, dtype=np.float32)
         self.smoothed_levels = np.full(self.NUM_BANDS, -self.LEVEL_RANGE, dtype=np.float32)
         self.peak_levels = np.zeros(self.NUM_BANDS)
-        self.peak_hold_counters = np.zeros(self.NUM_BANDS)
+        self.peak_hold_left = np.zeros(self.NUM_BANDS)
+        self.levels = LevelSnapshot(1, self.NUM_BANDS, floor=-self.LEVEL_RANGE)
+
+        # Отрисовка только изменившихся элементов (шкала 200 px на LEVEL_RANGE)
+        self.renderer = TkRenderer(px_per_db=200 / self.LEVEL_RANGE)
 
         self.filters = self.create_filters()
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
 
-        self.update_interval = 30
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def create_filters(self):
-        filters = []
-        for i, center_freq in enumerate(self.band_centers):
-            low = center_freq / (2**(1/6))
-            high = center_freq * (2**(1/6))
-            
-            if i == self.NUM_BANDS - 1 and self.MAX_FREQ == 20000:
-                high = self.MAX_FREQ
-
-            try:
-                if center_freq < 200:
-                    b, a = signal.butter(2, [low, high], btype='bandpass', fs=self.SAMPLE_RATE)
-                else:
-                    b, a = signal.butter(4, [low, high], btype='bandpass', fs=self.SAMPLE_RATE)
-                filters.append((b, a))
-            except:
-                filters.append(([1], [1]))
-                print(f"Warning: Could not create filter for {center_freq:.0f} Hz")
-        return filters
+        # Коэффициенты кешируются по (SAMPLE_RATE, MIN_FREQ, MAX_FREQ), состояние у банка свое
+        bank = multirate_filter_bank(self.SAMPLE_RATE, self.band_centers, self.MAX_FREQ, widen_last_from=20000)
+        for i in bank.failed:
+            print(f"Warning: Could not create filter for {self.band_centers[i]:.0f} Hz")
+        return bank
 
     def setup_window(self):
         self.root.geometry(f"{self.window_width}x{self.window_height}")
@@ -186,6 +183,7 @@ class SpectrumAnalyzer:
         # Create spectrum bars
         self.band_bars = []
         self.peak_indicators = []
+        self.band_x = []
         band_width = 10
         band_gap = 3
         bands_start_x = 10
@@ -203,6 +201,7 @@ class SpectrumAnalyzer:
                 width=1
             )
             self.band_bars.append(bar)
+            self.band_x.append((x1, x2))
             
             peak = self.canvas.create_line(
                 x1, 200, x2, 200,
@@ -389,6 +388,10 @@ class SpectrumAnalyzer:
             # Update menu item text
             self.menu_bar.entryconfig(2, label="Hide Analyzer")
 
+        # Элементы переставлены напрямую — кеш отрисовки больше не совпадает с холстом
+        self.renderer.invalidate()
+        self.refresh.wake()
+
     def show_menu_button(self, event=None):
         try:
             x = self.root.winfo_rootx() + 10
@@ -494,82 +497,51 @@ class SpectrumAnalyzer:
         
         # Общий уровень без фильтрации
         rms = np.sqrt(np.mean(mono_signal**2))
-        self.rms_level = 20 * np.log10(max(rms, 1e-6))
+        rms_db = 20 * np.log10(max(rms, 1e-6))
         
         peak = np.max(np.abs(mono_signal))
         peak_db = 20 * np.log10(max(peak, 1e-6))
         
-        if peak_db > self.peak_rms:
-            self.peak_rms = peak_db
-            self.peak_rms_hold_counter = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
-        
-        # Обработка полос частот (для спектра)
-        for i in range(self.NUM_BANDS):
-            b, a = self.filters[i]
-            try:
-                filtered = signal.lfilter(b, a, mono_signal)
-                rms = np.sqrt(np.mean(filtered**2))
-                db_level = 20 * np.log10(max(rms, 1e-6))
-                self.band_levels[i] = max(min(db_level, 0), -self.LEVEL_RANGE)
-                
-                if db_level > self.peak_levels[i]:
-                    self.peak_levels[i] = db_level
-                    self.peak_hold_counters[i] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
-            except:
-                self.band_levels[i] = -self.LEVEL_RANGE
+        # Обработка полос частот (для спектра): весь банк за один вызов
+        band_db = self.filters.process(mono_signal)
+
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(rms_db, peak_db, band_db)
 
     def update_meter(self):
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пики — максимум всех блоков с прошлого кадра
+        levels = self.levels
+        if levels.read():
+            self.rms_level = float(levels.rms_db[0])
+            peak_db = float(levels.peak_db[0])
+            if peak_db > self.peak_rms:
+                self.peak_rms = peak_db
+                self.peak_rms_hold_left = self.PEAK_HOLD_TIME
+
+            np.clip(levels.band_db, -self.LEVEL_RANGE, 0, out=self.band_levels)
+            latch_peaks(self.peak_levels, levels.band_peak_db, self.peak_hold_left,
+                        self.PEAK_HOLD_TIME)
+
         # Обновление общего уровня
         if self.rms_level > self.smoothed_rms:
             self.smoothed_rms = self.rms_level
         else:
-            decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+            decay_amount = self.DECAY_RATE * dt
             self.smoothed_rms = max(
                 self.smoothed_rms - decay_amount, 
                 -self.LEVEL_RANGE
             )
         
-        if self.peak_rms_hold_counter > 0:
-            self.peak_rms_hold_counter -= 1
+        if self.peak_rms_hold_left > 0:
+            self.peak_rms_hold_left -= dt
         else:
-            decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+            decay_amount = self.DECAY_RATE * 2 * dt
             self.peak_rms = max(
                 self.peak_rms - decay_amount, 
                 -self.LEVEL_RANGE
             )
-        
-        def db_to_y(db):
-            if self.compact_mode:
-                return 200 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
-            else:
-                return 200 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
-        
-        # Обновление RMS
-        rms_y = db_to_y(self.smoothed_rms)
-        peak_y = db_to_y(self.peak_rms)
-        
-        if self.compact_mode:
-            rms_meter_x = 60
-            meter_height = 200
-        else:
-            rms_meter_x = 450 + 20
-            meter_height = 200
-        
-        self.canvas.coords(
-            self.rms_meter,
-            rms_meter_x, rms_y,
-            rms_meter_x + 15, meter_height
-        )
-        
-        color = 'red' if self.smoothed_rms > -6 else \
-                'orange' if self.smoothed_rms > -15 else 'green'
-        self.canvas.itemconfig(self.rms_meter, fill=color)
-        
-        self.canvas.coords(
-            self.rms_peak_indicator,
-            rms_meter_x -20, peak_y,
-            rms_meter_x + 15, peak_y
-        )
 
         if not self.compact_mode:
             # Обновление полос спектра
@@ -577,39 +549,59 @@ class SpectrumAnalyzer:
                 if self.band_levels[i] > self.smoothed_levels[i]:
                     self.smoothed_levels[i] = self.band_levels[i]
                 else:
-                    decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                    decay_amount = self.DECAY_RATE * dt
                     self.smoothed_levels[i] = max(
                         self.smoothed_levels[i] - decay_amount, 
                         -self.LEVEL_RANGE
                     )
                 
-                if self.peak_hold_counters[i] > 0:
-                    self.peak_hold_counters[i] -= 1
+                if self.peak_hold_left[i] > 0:
+                    self.peak_hold_left[i] -= dt
                 else:
-                    decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                    decay_amount = self.DECAY_RATE * 2 * dt
                     self.peak_levels[i] = max(
                         self.peak_levels[i] - decay_amount, 
                         -self.LEVEL_RANGE
                     )
-                
+
+        # Рисуем только если что-то сдвинулось хотя бы на пиксель
+        if self.renderer.begin_frame(self.smoothed_rms, self.peak_rms, self.smoothed_levels, self.peak_levels):
+            self.draw_meters()
+            self.renderer.end_frame()
+        
+        self.root.after(self.refresh.next_interval(self.smoothed_rms, self.peak_rms, self.smoothed_levels, self.peak_levels), self.update_meter)
+
+    def draw_meters(self):
+        render = self.renderer
+
+        def db_to_y(db):
+            return 200 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
+
+        def level_color(db):
+            return 'red' if db > -6 else 'orange' if db > -15 else 'green'
+        
+        # Обновление RMS
+        rms_y = db_to_y(self.smoothed_rms)
+        peak_y = db_to_y(self.peak_rms)
+        
+        if self.compact_mode:
+            rms_meter_x = 60
+        else:
+            rms_meter_x = 450 + 20
+        meter_height = 200
+        
+        render.coords(self.canvas, self.rms_meter, rms_meter_x, rms_y, rms_meter_x + 15, meter_height)
+        render.itemconfig(self.canvas, self.rms_meter, fill=level_color(self.smoothed_rms))
+        render.coords(self.canvas, self.rms_peak_indicator, rms_meter_x - 20, peak_y, rms_meter_x + 15, peak_y)
+
+        if not self.compact_mode:
+            # Полосы спектра: x берется из band_x, а не запросом coords к Tk
+            for i, (x1, x2) in enumerate(self.band_x):
                 rms_y = db_to_y(self.smoothed_levels[i])
                 peak_y = db_to_y(self.peak_levels[i])
-                
-                coords = self.canvas.coords(self.band_bars[i])
-                self.canvas.coords(self.band_bars[i], coords[0], rms_y, coords[2], 200)
-                
-                color = 'red' if self.smoothed_levels[i] > -6 else \
-                        'orange' if self.smoothed_levels[i] > -15 else 'green'
-                self.canvas.itemconfig(self.band_bars[i], fill=color)
-                
-                peak_coords = self.canvas.coords(self.peak_indicators[i])
-                self.canvas.coords(
-                    self.peak_indicators[i],
-                    peak_coords[0], peak_y,
-                    peak_coords[2], peak_y
-                )
-        
-        self.root.after(self.update_interval, self.update_meter)
+                render.coords(self.canvas, self.band_bars[i], x1, rms_y, x2, 200)
+                render.itemconfig(self.canvas, self.band_bars[i], fill=level_color(self.smoothed_levels[i]))
+                render.coords(self.canvas, self.peak_indicators[i], x1, peak_y, x2, peak_y)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
@@ -7,9 +7,15 @@ import sys
 import os
 import threading
 from collections import deque
-import wave
 import time
 
+from meterlib.levels import LevelMeter, latch_peaks
+from meterlib.recorder import AudioRecorder
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.snapshot import LevelSnapshot
+from meterlib.tk_render import TkRenderer
+from meterlib.trigger import LevelTrigger
+
 class AudioLevelMeter:
     def __init__(self):
         self.root = tk.Tk()
@@ -28,7 +34,7 @@ class AudioLevelMeter:
 
         # Параметры окна (ширина зависит от количества каналов)
         self.window_width = 70 if self.input_channels == 1 else 120
-        self.window_height = 327
+        self.window_height = 351
 
         # Калибровка уровней
         self.LEVEL_RANGE = 60  # Диапазон 60 dB
@@ -36,11 +42,16 @@ class AudioLevelMeter:
         self.DECAY_RATE = 25  # Скорость затухания (dB/сек)
         
         # Состояние уровней
-        self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.last_peak_time = [0] * self.input_channels
-        self.peak_hold_counter = [0] * self.input_channels
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.last_peak_time = np.zeros(self.input_channels)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        self.level_meter = LevelMeter(self.input_channels, rms_floor=10**(-60/20), block_size=1024)
+        self.levels = LevelSnapshot(self.input_channels, floor=-self.LEVEL_RANGE)
+
+        # Отрисовка только изменившихся элементов (шкала 220 px на LEVEL_RANGE)
+        self.renderer = TkRenderer(px_per_db=220 / self.LEVEL_RANGE)
         
         # Состояние мониторинга
         self.monitoring = False
@@ -50,17 +61,28 @@ class AudioLevelMeter:
         
         # Состояние записи
         self.recording = False
-        self.audio_file = None
+        self.recorder = None
         self.recording_start_time = 0
         self.recorded_data = []
         self.bullet_visible = False  # Состояние мигающего буллета
+        self.PREROLL_SECONDS = 3  # Сколько секунд до нажатия Record попадает в файл
+        self.ROLLOVER_MINUTES = 15  # Долгая запись делится на файлы встык
+        self.JOURNAL_RECORDING = True  # Журнал блоков: после падения запись восстанавливает recover.py
+
+        # Запись по уровню (кнопка Trigger): файл-сегмент открывается, когда
+        # уровень достигает ATTACK, и закрывается после HOLD секунд ниже RELEASE
+        self.trigger_mode = False
+        self.TRIGGER_ATTACK_DB = -40
+        self.TRIGGER_RELEASE_DB = -50
+        self.TRIGGER_HOLD_SECONDS = 2.0
         
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
         
-        self.update_interval = 30  # мс
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -122,6 +144,17 @@ class AudioLevelMeter:
         )
         self.record_button_canvas.pack(pady=2)
         self.setup_record_button()
+
+        # Кнопка Trigger (запись по уровню)
+        self.trigger_button_canvas = tk.Canvas(
+            self.buttons_frame,
+            width=self.window_width,
+            height=20,
+            bg='black',
+            highlightthickness=0
+        )
+        self.trigger_button_canvas.pack(pady=2)
+        self.setup_button(self.trigger_button_canvas, "Trigger", self.toggle_trigger)
         
         # Кнопка Close
         self.close_button_canvas = tk.Canvas(
@@ -222,7 +255,7 @@ class AudioLevelMeter:
         
     def on_button_enter(self, event):
         canvas = event.widget
-        if canvas == self.close_button_canvas:
+        if canvas in (self.close_button_canvas, self.trigger_button_canvas):
             color = 'black'
             canvas.itemconfig(canvas.button_text, fill='white')
         elif canvas == self.record_button_canvas and self.recording:
@@ -239,6 +272,8 @@ class AudioLevelMeter:
         canvas.itemconfig(canvas.button_bg, fill='#000000')
         if canvas == self.record_button_canvas and self.recording:
             canvas.itemconfig(canvas.button_text, text="")
+        elif canvas == self.trigger_button_canvas:
+            self.update_trigger_button()
         else:
             canvas.itemconfig(canvas.button_text, fill='#555555')
 
@@ -246,7 +281,8 @@ class AudioLevelMeter:
         """Переключает видимость красного буллета для создания мигания"""
         if self.recording:
             self.bullet_visible = not self.bullet_visible
-            if self.bullet_visible:
+            # По уровню: мигаем только пока пишется сегмент
+            if self.bullet_visible and (not self.trigger_mode or self.recorder.segment_open):
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='normal')
             else:
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='hidden')
@@ -261,13 +297,16 @@ class AudioLevelMeter:
             try:
                 timestamp = time.strftime("%H-%M %d%m%Y")
                 desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-                filename = os.path.join(desktop_path, f"Record {timestamp}.wav")
+                filename = os.path.join(desktop_path, f"Record {timestamp}{self.recorder.extension}")
                 
-                # Создаем WAV файл и сразу начинаем писать
-                self.audio_file = wave.open(filename, 'wb')
-                self.audio_file.setnchannels(self.input_channels)
-                self.audio_file.setsampwidth(2)  # 16-bit
-                self.audio_file.setframerate(self.sample_rate)
+                if self.trigger_mode:
+                    # Файлы-сегменты открывает и закрывает поток записи по уровню
+                    self.recorder.arm(self.create_trigger(), lambda index: os.path.join(
+                        desktop_path, f"Record {time.strftime('%H-%M-%S %d%m%Y')} #{index}{self.recorder.extension}"
+                    ))
+                else:
+                    # Создаем WAV файл; пишет его фоновый поток рекордера
+                    self.recorder.open(filename)
                 
                 self.recording = True
                 self.recording_start_time = time.time()
@@ -278,7 +317,10 @@ class AudioLevelMeter:
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='normal')
                 self.root.after(500, self.toggle_bullet)
                 
-                print(f"Recording started: {filename}")
+                if self.trigger_mode:
+                    print(f"Level trigger armed: segments go to {desktop_path}")
+                else:
+                    print(f"Recording started: {filename} ({self.recorder.preroll_frames / self.sample_rate:.1f} s pre-roll)")
 
             except Exception as e:
                 print(f"Error starting recording: {e}")
@@ -290,17 +332,42 @@ class AudioLevelMeter:
                 # Останавливаем мигание буллета
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='hidden')
                 
-                # Закрываем файл
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+                # Ждем, пока поток записи допишет хвост и закроет файл
+                if self.recorder.close():
                     print("Recording stopped and file saved")
+                else:
+                    print("Recording stop timed out, file may be incomplete")
+                self.recorder.report()
                 
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, text="Record")
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, fill='#555555')
             except Exception as e:
                 print(f"Error stopping recording: {e}")
 
+    def toggle_trigger(self):
+        """Включает/выключает запись по уровню (между записями)"""
+        if self.recording:
+            print("Stop recording to change trigger mode")
+            return
+        self.trigger_mode = not self.trigger_mode
+        self.update_trigger_button()
+        if self.trigger_mode:
+            print(
+                f"Level trigger: start at {self.TRIGGER_ATTACK_DB} dBFS, stop after "
+                f"{self.TRIGGER_HOLD_SECONDS} s below {self.TRIGGER_RELEASE_DB} dBFS"
+            )
+
+    def update_trigger_button(self):
+        canvas = self.trigger_button_canvas
+        canvas.itemconfig(canvas.button_text, fill='#cccc00' if self.trigger_mode else '#555555')
+
+    def create_trigger(self):
+        return LevelTrigger(
+            self.sample_rate, attack_db=self.TRIGGER_ATTACK_DB,
+            release_db=self.TRIGGER_RELEASE_DB, hold_seconds=self.TRIGGER_HOLD_SECONDS,
+            block_frames=1024  # шаг решения — блок входного потока
+        )
+
     def create_meter(self, parent, channel):
         """Создает VU-метр для указанного канала"""
         channel_frame = tk.Frame(parent, bg='black')
@@ -362,6 +429,12 @@ class AudioLevelMeter:
             self.sample_rate = device_info['default_samplerate']
             
             print(f"Using device sample rate: {self.sample_rate} Hz")
+
+            self.recorder = AudioRecorder(
+                self.sample_rate, self.input_channels, preroll_seconds=self.PREROLL_SECONDS,
+                rollover_seconds=self.ROLLOVER_MINUTES * 60, journal=self.JOURNAL_RECORDING
+            )
+            self.recorder.start()
             
             self.audio_stream = sd.InputStream(
                 samplerate=self.sample_rate,  # Используем "родную" частоту устройства
@@ -379,71 +452,74 @@ class AudioLevelMeter:
         if status:
             print(status)
 
-        # Записываем данные напрямую в файл
-        if self.recording and self.audio_file:
-            try:
-                # Конвертируем в 16-битный формат и пишем в файл
-                audio_data_int16 = (indata * 32767).astype(np.int16)
-                self.audio_file.writeframes(audio_data_int16.tobytes())
-            except Exception as e:
-                print(f"Error writing to audio file: {e}")
+        # Только копия в буфер рекордера — на диск пишет его поток
+        self.recorder.push(indata)
         
-        for channel in range(self.input_channels):
-            channel_data = indata[:, channel]
-            rms = np.sqrt(np.mean(channel_data**2))
-            ##self.rms_level[channel] = 20 * np.log10(max(rms, 1e-6))
-            self.rms_level[channel] = 20 * np.log10(max(rms, 10**(-60/20)))
-
-            peak = np.max(np.abs(channel_data))
-            peak_db = 20 * np.log10(max(peak, 1e-6))
-            
-            if peak_db > self.peak_level[channel]:
-                self.peak_level[channel] = peak_db
-                self.last_peak_time[channel] = time.currentTime
-                self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+        # Уровни всех каналов за один проход
+        self.level_meter.process(indata)
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.level_meter.rms_db, self.level_meter.peak_db, stream_time=time.currentTime)
 
     def update_meter(self):
-        # Проверяем превышение уровня и обновляем цвет фона
-        level_exceeded_title = any(level > -3 for level in self.peak_level)
-        new_color = 'red' if level_exceeded_title else 'black'
-        if new_color != self.title_label.cget('bg'):
-            self.title_label.configure(bg=new_color)
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level[:] = self.levels.rms_db
+            rising = latch_peaks(
+                self.peak_level, self.levels.peak_db, self.peak_hold_left,
+                self.PEAK_HOLD_TIME
+            )
+            self.last_peak_time[rising] = self.levels.time
 
         for channel in range(self.input_channels):
-            canvas = self.canvases[channel]
-
-            # Проверяем превышение уровня для текущего канала и обновляем цвет channel_label
-            level_exceeded_channel = self.peak_level[channel] > -6
-            new_color = 'red' if level_exceeded_channel else 'orange'
-            if new_color != canvas.channel_label.cget('fg'):
-                canvas.channel_label.config(fg=new_color)
-
             if self.rms_level[channel] > self.smoothed_level[channel]:
                 self.smoothed_level[channel] = self.rms_level[channel]
             else:
-                decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * dt
                 self.smoothed_level[channel] = max(
                     self.smoothed_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
             
-            if self.peak_hold_counter[channel] > 0:
-                self.peak_hold_counter[channel] -= 1
+            if self.peak_hold_left[channel] > 0:
+                self.peak_hold_left[channel] -= dt
             else:
-                decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * 2 * dt
                 self.peak_level[channel] = max(
                     self.peak_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
-            
-            def db_to_pos(db):
-                return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
-            
+
+        # Рисуем только если что-то сдвинулось хотя бы на пиксель
+        if self.renderer.begin_frame(self.smoothed_level, self.peak_level):
+            self.draw_meters()
+            self.renderer.end_frame()
+        
+        self.root.after(self.refresh.next_interval(self.smoothed_level, self.peak_level), self.update_meter)
+
+    def draw_meters(self):
+        render = self.renderer
+
+        # Проверяем превышение уровня и обновляем цвет фона
+        level_exceeded_title = any(level > -3 for level in self.peak_level)
+        render.configure(self.title_label, bg='red' if level_exceeded_title else 'black')
+
+        def db_to_pos(db):
+            return 220 * (1 - (db + self.LEVEL_RANGE)/self.LEVEL_RANGE)
+
+        for channel in range(self.input_channels):
+            canvas = self.canvases[channel]
+
+            # Проверяем превышение уровня для текущего канала и обновляем цвет channel_label
+            level_exceeded_channel = self.peak_level[channel] > -6
+            render.configure(canvas.channel_label, fg='red' if level_exceeded_channel else 'orange')
+
             rms_pos = db_to_pos(self.smoothed_level[channel])
             peak_pos = db_to_pos(self.peak_level[channel])
             
-            canvas.coords(canvas.level_bar, 0, rms_pos, 10, 220)
-            canvas.coords(canvas.peak_bar, 0, peak_pos, 40, peak_pos)
+            render.coords(canvas, canvas.level_bar, 0, rms_pos, 10, 220)
+            render.coords(canvas, canvas.peak_bar, 0, peak_pos, 40, peak_pos)
             
             if self.smoothed_level[channel] > -6:
                 color = 'red'
@@ -451,9 +527,7 @@ class AudioLevelMeter:
                 color = 'orange'
             else:
                 color = 'green'
-            canvas.itemconfig(canvas.level_bar, fill=color)
-        
-        self.root.after(self.update_interval, self.update_meter)
+            render.itemconfig(canvas, canvas.level_bar, fill=color)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
@@ -487,12 +561,12 @@ class AudioLevelMeter:
     def close_program(self):
         """Корректно закрывает программу"""
         try:
-            # Останавливаем запись если активна
-            if self.recording:
-                self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+            # Останавливаем запись если активна (хвост дописывается)
+            self.recording = False
+            if self.recorder:
+                self.recorder.stop()
+            self.renderer.report()
+            self.refresh.report()
             
             # Останавливаем аудиопотоки
             if hasattr(self, 'audio_stream') and self.audio_stream:
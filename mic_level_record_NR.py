@@ -7,9 +7,105 @@ import sys
 import os
 import threading
 from collections import deque
-import wave
 import time
-import noisereduce as nr
+
+from meterlib.levels import LevelMeter, latch_peaks
+from meterlib.recorder import AudioRecorder
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.sinks import DEFAULT_FORMAT
+from meterlib.snapshot import LevelSnapshot
+from meterlib.spectral_gate import StreamingSpectralGate
+from meterlib.trigger import LevelTrigger
+
+
+class NoiseReduction:
+    """Шумоподавление перед записью: processor для AudioRecorder (поток записи).
+
+    enabled переключает интерфейс. После включения (и после reset_profile)
+    первые profile_seconds входа идут на профиль шума, затем гейт начинает
+    давить шум. Гейт дает задержку denoiser.latency кадров: при включении
+    ее начало пропускается, а при выключении и в конце записи (flush)
+    задержанный хвост дописывается — таймлайн записи совпадает со входом.
+    """
+    def __init__(self, sample_rate, channels, prop_decrease=0.6, profile_seconds=2.0):
+        self.sample_rate = sample_rate
+        self.denoiser = StreamingSpectralGate(sample_rate, channels, prop_decrease=prop_decrease)
+        self.profile_frames = int(profile_seconds * sample_rate)
+        self.enabled = False
+        self.active = False
+        self.skip_frames = 0
+        self.profile_captured = False
+        self.noise_capture_frames = 0
+        self.noise_samples = []
+
+    def reset_profile(self):
+        """Сбрасывает профиль шума (выполняется в потоке записи)"""
+        self.denoiser.threshold = None
+        self.profile_captured = False
+        self.noise_capture_frames = 0
+        self.noise_samples = []
+
+    def capture_profile(self, audio_data):
+        """Захватывает профиль шума (выполняется в потоке записи)"""
+        # Захват по количеству кадров, а не по времени — поток записи может отставать
+        if self.noise_capture_frames < self.profile_frames:
+            self.noise_samples.append(audio_data.copy())
+            self.noise_capture_frames += len(audio_data)
+            return
+
+        # Захват завершен: спектр шума считается один раз и хранится как порог по бинам
+        try:
+            if len(self.noise_samples) > 0:
+                self.denoiser.fit(np.concatenate(self.noise_samples, axis=0))
+                self.noise_samples = []
+                self.profile_captured = True
+                print("Noise profile captured successfully!")
+        except Exception as e:
+            print(f"Error capturing noise profile: {e}")
+            self.enabled = False
+
+    def process(self, block):
+        """Блок входа -> кадры для записи (с учетом задержки гейта)"""
+        if self.enabled and not self.profile_captured:
+            self.capture_profile(block)
+
+        # Гейт работает с задержкой: при включении выравниваем таймлайн,
+        # при выключении отдаем его хвост
+        tail = None
+        if self.enabled != self.active:
+            if self.active:
+                tail = self._skip(self.denoiser.flush())
+            else:
+                self.denoiser.reset()
+                self.skip_frames = self.denoiser.latency
+            self.active = self.enabled
+
+        if self.active:
+            try:
+                block = self._skip(self.denoiser.process(block))
+            except Exception as e:
+                print(f"Noise reduction error: {e}")
+                # Отключаем шумоподавление при ошибке
+                self.enabled = False
+        return block if tail is None else np.concatenate((tail, block))
+
+    def flush(self):
+        """Конец записи: задержанный гейтом хвост"""
+        if not self.active:
+            return None
+        tail = self._skip(self.denoiser.flush())
+        # После сброса гейт снова начинает с задержки — ее пропускаем
+        self.skip_frames = self.denoiser.latency
+        return tail
+
+    def _skip(self, data):
+        # Первые кадры после включения шумодава — его задержка, их пропускаем
+        if self.skip_frames:
+            skipped = min(self.skip_frames, len(data))
+            data = data[skipped:]
+            self.skip_frames -= skipped
+        return data
+
 
 class AudioLevelMeter:
     def __init__(self):
@@ -29,7 +125,7 @@ class AudioLevelMeter:
 
         # Параметры окна (ширина зависит от количества каналов)
         self.window_width = 70 if self.input_channels == 1 else 120
-        self.window_height = 350
+        self.window_height = 374
 
         # Калибровка уровней
         self.LEVEL_RANGE = 60
@@ -37,11 +133,13 @@ class AudioLevelMeter:
         self.DECAY_RATE = 25
         
         # Состояние уровней
-        self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.last_peak_time = [0] * self.input_channels
-        self.peak_hold_counter = [0] * self.input_channels
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.last_peak_time = np.zeros(self.input_channels)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        self.level_meter = LevelMeter(self.input_channels, rms_floor=10**(-60/20), block_size=1024)
+        self.levels = LevelSnapshot(self.input_channels, floor=-self.LEVEL_RANGE)
         
         # Состояние мониторинга
         self.monitoring = False
@@ -51,27 +149,45 @@ class AudioLevelMeter:
         
         # Состояние записи
         self.recording = False
-        self.audio_file = None
+        self.record_format = DEFAULT_FORMAT
         self.recording_start_time = 0
         self.recorded_data = []
         self.bullet_visible = False
         
-        # Шумоподавление
-        self.noise_reduction = False
-        self.noise_profile = None
-        self.noise_profile_captured = False
-        self.noise_capture_frames = 0
+        # Шумоподавление (NoiseReduction — обработчик рекордера в его потоке)
+        self.noise_reduction = None
         self.NOISE_PROFILE_DURATION = 2.0  # Уменьшим время захвата
-        self.noise_samples = []
-        self.profile_capture_start = None
         self.noise_decrease = 0.6
+        self.nr_button_state = None
+
+        # Обработка вне аудио-callback'а: callback только копирует кадры в кольцевой
+        # буфер рекордера, а шумоподавление и запись делает его поток
+        self.recorder = None
+        # Между записями поток записи держит последние секунды входа (float32 —
+        # формат записи выбирается в меню, пре-ролл не должен быть грубее него):
+        # файл начинается с того, что прозвучало до нажатия Record
+        self.PREROLL_SECONDS = 3
+        # Долгая запись делится на файлы встык; заголовок обновляется каждые 5 с
+        self.ROLLOVER_MINUTES = 15
+        # Журнал блоков: после падения запись восстанавливает recover.py
+        self.JOURNAL_RECORDING = True
+
+        # Запись по уровню (кнопка Trigger): файл-сегмент открывается, когда
+        # уровень достигает ATTACK, и закрывается после HOLD секунд ниже RELEASE.
+        # Триггер и сегменты — у потока записи
+        self.trigger_mode = False
+        self.TRIGGER_ATTACK_DB = -40
+        self.TRIGGER_RELEASE_DB = -50
+        self.TRIGGER_HOLD_SECONDS = 2.0
+        self.input_overflows = 0
         
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
         
-        self.update_interval = 30
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -139,8 +255,20 @@ class AudioLevelMeter:
                 bg='black',
                 highlightthickness=0
             )
+
         self.noise_reduction_button_canvas.pack(pady=2)
         self.setup_noise_reduction_button()
+
+        # Кнопка Trigger (запись по уровню)
+        self.trigger_button_canvas = tk.Canvas(
+            self.buttons_frame,
+            width=self.window_width,
+            height=20,
+            bg='black',
+            highlightthickness=0
+        )
+        self.trigger_button_canvas.pack(pady=2)
+        self.setup_button(self.trigger_button_canvas, "Trigger", self.toggle_trigger)
                 
         # Кнопка Close
         self.close_button_canvas = tk.Canvas(
@@ -197,55 +325,48 @@ class AudioLevelMeter:
     def toggle_noise_reduction(self):
         """Включает/выключает шумоподавление"""
             
-        self.noise_reduction = not self.noise_reduction
+        nr = self.noise_reduction
+        nr.enabled = not nr.enabled
 
-        
-        if self.noise_reduction:
-            # Сбрасываем профиль шума
-            self.noise_profile = None
-            self.noise_profile_captured = False
-            self.noise_capture_frames = 0
-            self.noise_samples = []
-            self.profile_capture_start = time.time()
-            
-            # Обновляем внешний вид кнопки
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.button_text, 
-                text="learning",
-                fill='yellow'
-            )
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.indicator,
-                fill='yellow'
-            )
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.button_bg,
-                fill='#333300'
-            )
+        if nr.enabled:
+            # Сбрасываем профиль шума (в потоке записи, который его накапливает)
+            self.recorder.worker.call(nr.reset_profile)
+            nr.profile_captured = False
             print("Noise reduction enabled - capturing noise profile...")
         else:
-            # Обновляем внешний вид кнопки
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.button_text, 
-                text="NR OFF",
-                fill='#555555'
-            )
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.indicator,
-                fill='#333333'
-            )
-            self.noise_reduction_button_canvas.itemconfig(
-                self.noise_reduction_button_canvas.button_bg,
-                fill='#000000'
-            )
             print("Noise reduction disabled")
+        self.update_noise_button()
+
+    def update_noise_button(self):
+        """Приводит кнопку NR в соответствие с состоянием потока записи"""
+        if not self.noise_reduction.enabled:
+            state = 'off'
+        elif not self.noise_reduction.profile_captured:
+            state = 'learning'
+        else:
+            state = 'on'
+
+        if state == self.nr_button_state:
+            return
+        self.nr_button_state = state
+
+        text, text_color, indicator_color, bg_color = {
+            'off': ("NR OFF", '#555555', '#333333', '#000000'),
+            'learning': ("learning", 'yellow', 'yellow', '#333300'),
+            'on': ("NR ON", 'white', 'green', '#003300'),
+        }[state]
+
+        canvas = self.noise_reduction_button_canvas
+        canvas.itemconfig(canvas.button_text, text=text, fill=text_color)
+        canvas.itemconfig(canvas.indicator, fill=indicator_color)
+        canvas.itemconfig(canvas.button_bg, fill=bg_color)
 
     def on_noise_button_enter(self, event):
         """Обработчик наведения на кнопку шумоподавления"""
             
         canvas = event.widget
-        if self.noise_reduction:
-            if not self.noise_profile_captured:
+        if self.noise_reduction.enabled:
+            if not self.noise_reduction.profile_captured:
                 canvas.itemconfig(canvas.button_bg, fill='#444400')
             else:
                 canvas.itemconfig(canvas.button_bg, fill='#004400')
@@ -257,8 +378,8 @@ class AudioLevelMeter:
         """Обработчик ухода с кнопки шумоподавления"""
             
         canvas = event.widget
-        if self.noise_reduction:
-            if not self.noise_profile_captured:
+        if self.noise_reduction.enabled:
+            if not self.noise_reduction.profile_captured:
                 canvas.itemconfig(canvas.button_bg, fill='#333300')
                 canvas.itemconfig(canvas.button_text, fill='yellow')
             else:
@@ -347,7 +468,7 @@ class AudioLevelMeter:
         
     def on_button_enter(self, event):
         canvas = event.widget
-        if canvas == self.close_button_canvas:
+        if canvas in (self.close_button_canvas, self.trigger_button_canvas):
             color = 'black'
             canvas.itemconfig(canvas.button_text, fill='white')
         elif canvas == self.record_button_canvas and self.recording:
@@ -364,6 +485,8 @@ class AudioLevelMeter:
         canvas.itemconfig(canvas.button_bg, fill='#000000')
         if canvas == self.record_button_canvas and self.recording:
             canvas.itemconfig(canvas.button_text, text="")
+        elif canvas == self.trigger_button_canvas:
+            self.update_trigger_button()
         else:
             canvas.itemconfig(canvas.button_text, fill='#555555')
 
@@ -371,102 +494,13 @@ class AudioLevelMeter:
         """Переключает видимость красного буллета"""
         if self.recording:
             self.bullet_visible = not self.bullet_visible
-            if self.bullet_visible:
+            # По уровню: мигаем только пока пишется сегмент
+            if self.bullet_visible and (not self.trigger_mode or self.recorder.segment_open):
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='normal')
             else:
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='hidden')
             self.root.after(500, self.toggle_bullet)
 
-    def capture_noise_profile(self, audio_data):
-        """Захватывает профиль шума"""
-        if self.noise_profile_captured or not self.noise_reduction:
-            return
-            
-        # Простой захват профиля по времени
-        if self.profile_capture_start is None:
-            self.profile_capture_start = time.time()
-            
-        elapsed = time.time() - self.profile_capture_start
-        
-        if elapsed < self.NOISE_PROFILE_DURATION:
-            # Накопление samples
-            self.noise_samples.append(audio_data.copy())
-        else:
-            # Захват завершен
-            try:
-                if len(self.noise_samples) > 0:
-                    self.noise_profile = np.concatenate(self.noise_samples, axis=0)
-                    self.noise_profile_captured = True
-                    
-                    # Обновляем кнопку
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.button_text, 
-                        text="NR ON",
-                        fill='white'
-                    )
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.indicator,
-                        fill='green'
-                    )
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.button_bg,
-                        fill='#003300'
-                    )
-                    print("Noise profile captured successfully!")
-            except Exception as e:
-                print(f"Error capturing noise profile: {e}")
-                self.noise_reduction = False
-
-    def apply_noise_reduction(self, audio_data):
-        """Применяет шумоподавление к аудиоданным"""
-        if not self.noise_reduction:
-            return audio_data
-            
-        try:
-            # Если профиль еще не захвачен, продолжаем захват
-            if not self.noise_profile_captured:
-                self.capture_noise_profile(audio_data)
-                return audio_data
-            
-            # Проверяем, что у нас есть профиль шума
-            if self.noise_profile is None or len(self.noise_profile) == 0:
-                return audio_data
-            
-            # Упрощенное шумоподавление с проверками
-            if self.input_channels == 1:
-                # Моно аудио
-                audio_clean = nr.reduce_noise(
-                    y=audio_data.flatten(),
-                    sr=self.sample_rate,
-                    y_noise=self.noise_profile.flatten() if len(self.noise_profile.flatten()) > 0 else audio_data.flatten(),
-                    prop_decrease=self.noise_decrease,
-                    stationary=True
-                )
-                return audio_clean.reshape(-1, 1)
-            else:
-                # Стерео аудио - обрабатываем каждый канал
-                processed_channels = []
-                for ch in range(self.input_channels):
-                    # Берем часть профиля шума для этого канала
-                    noise_channel = self.noise_profile[:, ch] if self.noise_profile.shape[1] > ch else self.noise_profile[:, 0]
-                    
-                    audio_clean = nr.reduce_noise(
-                        y=audio_data[:, ch],
-                        sr=self.sample_rate,
-                        y_noise=noise_channel,
-                        prop_decrease=self.noise_decrease,
-                        stationary=True
-                    )
-                    processed_channels.append(audio_clean)
-                
-                return np.column_stack(processed_channels)
-                
-        except Exception as e:
-            print(f"Noise reduction error: {e}")
-            # Отключаем шумоподавление при ошибке
-            self.noise_reduction = False
-            return audio_data
-
     def toggle_record(self):
         """Включает/выключает запись звука"""
         if not self.recording:
@@ -474,45 +508,37 @@ class AudioLevelMeter:
             try:
                 timestamp = time.strftime("%H-%M %d%m%Y")
                 desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
-                filename = os.path.join(desktop_path, f"Record {timestamp}.wav")
-                
-                self.audio_file = wave.open(filename, 'wb')
-                self.audio_file.setnchannels(self.input_channels)
-                self.audio_file.setsampwidth(2)
-                self.audio_file.setframerate(self.sample_rate)
+                filename = os.path.join(desktop_path, f"Record {timestamp}{self.recorder.extension}")
+
+                # Сбрасываем профиль шума при начале записи
+                nr = self.noise_reduction
+                if nr.enabled:
+                    self.recorder.worker.call(nr.reset_profile)
+                    nr.profile_captured = False
+                    self.update_noise_button()
+
+                if self.trigger_mode:
+                    # Файлы-сегменты открывает и закрывает поток записи по уровню
+                    self.recorder.arm(self.create_trigger(), lambda index: os.path.join(
+                        desktop_path, f"Record {time.strftime('%H-%M-%S %d%m%Y')} #{index}{self.recorder.extension}"
+                    ))
+                else:
+                    # Файл начинается с пре-ролла; дальше пишет только поток записи
+                    self.recorder.open(filename)
                 
                 self.recording = True
                 self.recording_start_time = time.time()
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, text="")
                 
-                # Сбрасываем профиль шума при начале записи
-                if self.noise_reduction:
-                    self.noise_profile = None
-                    self.noise_profile_captured = False
-                    self.noise_capture_frames = 0
-                    self.noise_samples = []
-                    self.profile_capture_start = time.time()
-                    
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.button_text, 
-                        text="learning",
-                        fill='yellow'
-                    )
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.indicator,
-                        fill='yellow'
-                    )
-                    self.noise_reduction_button_canvas.itemconfig(
-                        self.noise_reduction_button_canvas.button_bg,
-                        fill='#333300'
-                    )
-                
                 # Запускаем мигание буллета
                 self.bullet_visible = True
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='normal')
                 self.root.after(500, self.toggle_bullet)
                 
-                print(f"Recording started: {filename}")
+                if self.trigger_mode:
+                    print(f"Level trigger armed: segments go to {desktop_path}")
+                else:
+                    print(f"Recording started: {filename} ({self.recorder.preroll_frames / self.sample_rate:.1f} s pre-roll)")
 
             except Exception as e:
                 print(f"Error starting recording: {e}")
@@ -522,17 +548,44 @@ class AudioLevelMeter:
             try:
                 self.recording = False
                 self.record_button_canvas.itemconfig(self.record_button_canvas.bullet, state='hidden')
-                
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
+
+                # Ждем, пока поток записи допишет хвост из буфера и закроет файл
+                if self.recorder.close():
                     print("Recording stopped and file saved")
+                else:
+                    print("Recording stop timed out, file may be incomplete")
+                self.recorder.report()
+                print(f"Input overflows: {self.input_overflows}")
                 
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, text="Record")
                 self.record_button_canvas.itemconfig(self.record_button_canvas.button_text, fill='#555555')
             except Exception as e:
                 print(f"Error stopping recording: {e}")
 
+    def toggle_trigger(self):
+        """Включает/выключает запись по уровню (между записями)"""
+        if self.recording:
+            print("Stop recording to change trigger mode")
+            return
+        self.trigger_mode = not self.trigger_mode
+        self.update_trigger_button()
+        if self.trigger_mode:
+            print(
+                f"Level trigger: start at {self.TRIGGER_ATTACK_DB} dBFS, stop after "
+                f"{self.TRIGGER_HOLD_SECONDS} s below {self.TRIGGER_RELEASE_DB} dBFS"
+            )
+
+    def update_trigger_button(self):
+        canvas = self.trigger_button_canvas
+        canvas.itemconfig(canvas.button_text, fill='#cccc00' if self.trigger_mode else '#555555')
+
+    def create_trigger(self):
+        return LevelTrigger(
+            self.sample_rate, attack_db=self.TRIGGER_ATTACK_DB,
+            release_db=self.TRIGGER_RELEASE_DB, hold_seconds=self.TRIGGER_HOLD_SECONDS,
+            block_frames=1024  # шаг решения — блок входного потока
+        )
+
     def create_meter(self, parent, channel):
         """Создает VU-метр для указанного канала"""
         channel_frame = tk.Frame(parent, bg='black')
@@ -593,6 +646,18 @@ class AudioLevelMeter:
             self.sample_rate = int(device_info['default_samplerate'])
             
             print(f"Using device sample rate: {self.sample_rate} Hz")
+
+            self.noise_reduction = NoiseReduction(
+                self.sample_rate, self.input_channels,
+                prop_decrease=self.noise_decrease, profile_seconds=self.NOISE_PROFILE_DURATION
+            )
+            self.recorder = AudioRecorder(
+                self.sample_rate, self.input_channels, fmt=self.record_format,
+                preroll_seconds=self.PREROLL_SECONDS, preroll_dtype=np.float32,
+                rollover_seconds=self.ROLLOVER_MINUTES * 60,
+                journal=self.JOURNAL_RECORDING, processor=self.noise_reduction
+            )
+            self.recorder.start()
             
             self.audio_stream = sd.InputStream(
                 samplerate=self.sample_rate,
@@ -609,35 +674,32 @@ class AudioLevelMeter:
     def audio_callback(self, indata, frames, time, status):
         if status:
             print(status)
+            if status.input_overflow:
+                self.input_overflows += 1
 
-        # Применяем шумоподавление если включено и доступно
-        processed_data = indata.copy()
-        if self.noise_reduction:
-            processed_data = self.apply_noise_reduction(indata)
-
-        # Записываем данные в файл
-        if self.recording and self.audio_file:
-            try:
-                audio_data_int16 = (processed_data * 32767).astype(np.int16)
-                self.audio_file.writeframes(audio_data_int16.tobytes())
-            except Exception as e:
-                print(f"Error writing to audio file: {e}")
+        # Только копируем кадры — шумоподавление и запись делает поток записи
+        self.recorder.push(indata)
         
-        # Обновляем уровни
-        for channel in range(self.input_channels):
-            channel_data = processed_data[:, channel]
-            rms = np.sqrt(np.mean(channel_data**2))
-            self.rms_level[channel] = 20 * np.log10(max(rms, 10**(-60/20)))
-
-            peak = np.max(np.abs(channel_data))
-            peak_db = 20 * np.log10(max(peak, 1e-6))
-            
-            if peak_db > self.peak_level[channel]:
-                self.peak_level[channel] = peak_db
-                self.last_peak_time[channel] = time.currentTime
-                self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+        # Уровни всех каналов за один проход
+        self.level_meter.process(indata)
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.level_meter.rms_db, self.level_meter.peak_db, stream_time=time.currentTime)
 
     def update_meter(self):
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level[:] = self.levels.rms_db
+            rising = latch_peaks(
+                self.peak_level, self.levels.peak_db, self.peak_hold_left,
+                self.PEAK_HOLD_TIME
+            )
+            self.last_peak_time[rising] = self.levels.time
+
+        # Состояние профиля шума меняется в рабочем потоке
+        self.update_noise_button()
+
         level_exceeded_title = any(level > -3 for level in self.peak_level)
         new_color = 'red' if level_exceeded_title else 'black'
         if new_color != self.title_label.cget('bg'):
@@ -654,16 +716,16 @@ class AudioLevelMeter:
             if self.rms_level[channel] > self.smoothed_level[channel]:
                 self.smoothed_level[channel] = self.rms_level[channel]
             else:
-                decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * dt
                 self.smoothed_level[channel] = max(
                     self.smoothed_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
             
-            if self.peak_hold_counter[channel] > 0:
-                self.peak_hold_counter[channel] -= 1
+            if self.peak_hold_left[channel] > 0:
+                self.peak_hold_left[channel] -= dt
             else:
-                decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * 2 * dt
                 self.peak_level[channel] = max(
                     self.peak_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
@@ -686,7 +748,7 @@ class AudioLevelMeter:
                 color = 'green'
             canvas.itemconfig(canvas.level_bar, fill=color)
         
-        self.root.after(self.update_interval, self.update_meter)
+        self.root.after(self.refresh.next_interval(self.smoothed_level, self.peak_level), self.update_meter)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
@@ -702,15 +764,13 @@ class AudioLevelMeter:
     def close_program(self):
         """Корректно закрывает программу"""
         try:
-            if self.recording:
-                self.recording = False
-                if self.audio_file:
-                    self.audio_file.close()
-                    self.audio_file = None
-            
             if hasattr(self, 'audio_stream') and self.audio_stream:
                 self.audio_stream.stop()
                 self.audio_stream.close()
+
+            if self.recorder:
+                self.recording = False
+                self.recorder.stop()
             if hasattr(self, 'output_stream') and self.output_stream:
                 self.output_stream.stop()
                 self.output_stream.close()
@@ -0,0 +1,109 @@
+"""Восстановление записей, оборванных падением программы, по журналу (.jidx).
+
+Записи с журналом (JournalSink) оставляют рядом с WAV файл <имя>.wav.jidx,
+пока запись не закрыта штатно. Скрипт проходит журнал по порядку, читает
+каждый блок из WAV, проверяет crc32 и переписывает проверенные блоки
+в новый файл "<имя> (recovered).wav". Память — на один блок, а не на файл.
+
+Примеры:
+    python recover.py ~/Records                      # все журналы в папке и подпапках
+    python recover.py "~/Desktop/Record 12-30 01022026.wav.jidx"
+    python recover.py ~/Records --output ~/Recovered --clean
+"""
+import argparse
+import os
+import zlib
+
+from meterlib.journal import JOURNAL_EXTENSION, JournalReader
+from meterlib.sinks import WavSink
+
+
+def find_journals(paths):
+    journals = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                journals += [os.path.join(root, name) for name in sorted(files) if name.endswith(JOURNAL_EXTENSION)]
+        elif path.endswith(JOURNAL_EXTENSION):
+            journals.append(path)
+        elif os.path.exists(path + JOURNAL_EXTENSION):
+            journals.append(path + JOURNAL_EXTENSION)
+        else:
+            print(f"No journal for {path}")
+    return journals
+
+
+def recover(journal, output_dir=None):
+    """Пересобирает запись по журналу. Возвращает (путь, секунд, причина остановки, complete).
+
+    complete — журнал пройден до конца: восстановлены все блоки. Иначе
+    блоки после испорченного потеряны, и исходные файлы еще нужны.
+    """
+    audio_path = journal[:-len(JOURNAL_EXTENSION)]
+    root, ext = os.path.splitext(os.path.basename(audio_path))
+    output = os.path.join(output_dir or os.path.dirname(audio_path), f"{root} (recovered){ext}")
+
+    reader = JournalReader(journal)
+    info = reader.info
+    block_align = info['block_align']
+    sink = WavSink(output, info['sample_rate'], info['channels'], info['subtype'])
+    stopped = "end of journal"
+    try:
+        with open(audio_path, 'rb') as audio:
+            audio.seek(info['data_offset'])
+            expected_seq = expected_offset = 0
+            for seq, offset, frames, timestamp, crc in reader.records():
+                if seq != expected_seq or offset != expected_offset:
+                    stopped = f"journal out of order at block {seq}"
+                    break
+                data = audio.read(frames * block_align)
+                if len(data) < frames * block_align:
+                    stopped = f"audio data ends inside block {seq}"
+                    break
+                if zlib.crc32(data) != crc:
+                    stopped = f"checksum mismatch in block {seq}"
+                    break
+                sink.write_encoded(data)
+                expected_seq += 1
+                expected_offset += frames
+    finally:
+        reader.close()
+        sink.close()
+    return output, sink.frames_written / info['sample_rate'], stopped, stopped == "end of journal"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rebuild recordings interrupted by a crash from their journals")
+    parser.add_argument("paths", nargs="+", help="journal files, recordings or folders to scan")
+    parser.add_argument("--output", help="folder for recovered files (default: next to the recording)")
+    parser.add_argument("--clean", action="store_true",
+                        help="delete the broken recording and its journal after a successful recovery")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    journals = find_journals(args.paths)
+    if not journals:
+        print("No journals found")
+        return
+    if args.output:
+        os.makedirs(os.path.expanduser(args.output), exist_ok=True)
+
+    for journal in journals:
+        try:
+            output, seconds, stopped, complete = recover(journal, args.output and os.path.expanduser(args.output))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Failed to recover {journal}: {e}")
+            continue
+        print(f"Recovered {seconds:.1f} s ({stopped}): {output}")
+        if args.clean and complete and seconds:
+            os.remove(journal[:-len(JOURNAL_EXTENSION)])
+            os.remove(journal)
+        elif args.clean:
+            print(f"Kept {journal} and its recording")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Сводный отчет по архиву записей: RMS, true peak, клиппинг и тишина по каждому файлу.
+
+Обходит папку записей (по умолчанию ~/Records, куда пишут индикаторы:
+~/Records/<день>/Record <время>.wav) и считает файлы в пуле процессов.
+Результаты кешируются в индексе по пути, mtime и размеру — повторный
+запуск считает только новые и измененные файлы.
+
+Примеры:
+    python report.py                                    # весь ~/Records
+    python report.py ~/Records/2026-02-01 --csv day.csv
+    python report.py --jobs 4 --true-peak-limit -2 --silence-limit 0.9
+
+Индекс — "<папка>/.report_index.json" (или --index); пишется атомарно
+и периодически во время обхода, так что прерванный обход не теряет
+посчитанное.
+"""
+import argparse
+import concurrent.futures
+import csv
+import json
+import os
+import time
+
+from meterlib.analysis import file_report
+from meterlib.audiofile import AUDIO_EXTENSIONS
+from meterlib.journal import journal_path
+
+INDEX_NAME = '.report_index.json'
+INDEX_VERSION = 2  # 2: true peak через TruePeakMeter
+# Как часто (в файлах) сбрасывать индекс на диск во время обхода
+INDEX_SAVE_EVERY = 200
+CSV_FIELDS = (
+    'path', 'duration', 'sample_rate', 'channels', 'rms_db', 'sample_peak_db', 'true_peak_db',
+    'clipped_samples', 'silence_ratio', 'error',
+)
+
+
+def find_recordings(root):
+    """Все записи в папке и подпапках, кроме тех, что еще пишутся (рядом журнал)"""
+    recordings = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(folder, name)
+            if name.lower().endswith(AUDIO_EXTENSIONS) and not os.path.exists(journal_path(path)):
+                recordings.append(path)
+    return recordings
+
+
+def load_index(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Index {path} unreadable ({e}), starting over")
+        return {}
+    if index.get('version') != INDEX_VERSION:
+        return {}
+    return index.get('files', {})
+
+
+def save_index(path, files):
+    """Через временный файл и os.replace: оборванная запись не портит индекс.
+
+    Сохраняются только посчитанные файлы — ждущие очереди при перезапуске
+    должны снова оказаться в очереди, а не в кеше.
+    """
+    done = {recording: entry for recording, entry in files.items() if 'report' in entry}
+    temp = path + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'files': done}, f, ensure_ascii=False)
+    os.replace(temp, path)
+
+
+def report_one(path, options):
+    """Задача для пула: (путь, отчет или None, ошибка или None)"""
+    try:
+        return path, file_report(path, **options), None
+    except (OSError, ValueError, RuntimeError) as e:
+        return path, None, str(e)
+
+
+def run_reports(paths, options, jobs):
+    """Отчеты по файлам в пуле процессов (jobs=1 — в этом процессе), по мере готовности"""
+    if jobs <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield report_one(path, options)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        # Крупные порции — меньше пересылок между процессами на десятках тысяч файлов
+        chunksize = max(1, min(16, len(paths) // (jobs * 4)))
+        yield from executor.map(report_one, paths, [options] * len(paths), chunksize=chunksize)
+
+
+def flags(entry, args):
+    """Причины, по которым файл попадает в список на проверку"""
+    report = entry.get('report')
+    if report is None:
+        return [f"error: {entry.get('error')}"]
+    reasons = []
+    if report['clipped_samples']:
+        reasons.append(f"{report['clipped_samples']} clipped samples")
+    if report['true_peak_db'] > args.true_peak_limit:
+        reasons.append(f"true peak {report['true_peak_db']:+.1f} dBTP")
+    if report['silence_ratio'] >= args.silence_limit:
+        reasons.append(f"{report['silence_ratio']:.0%} silence")
+    return reasons
+
+
+def write_csv(path, recordings, files):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for recording in recordings:
+            entry = files[recording]
+            writer.writerow({'path': recording, 'error': entry.get('error'), **(entry.get('report') or {})})
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Loudness/peak report across a recordings archive")
+    parser.add_argument("root", nargs="?", default="~/Records", help="folder to scan (default: ~/Records)")
+    parser.add_argument("--index", help=f"cache file (default: <root>/{INDEX_NAME})")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--csv", help="write the full per-file report to this CSV")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the cache and analyze every file")
+    parser.add_argument("--window", type=float, default=100, help="silence detection window, ms")
+    parser.add_argument("--silence-db", type=float, default=-60, help="windows below this level count as silence")
+    parser.add_argument("--clip-level", type=float, default=0.999, help="sample magnitude counted as clipped")
+    parser.add_argument("--true-peak-limit", type=float, default=-1, help="flag files above this true peak, dBTP")
+    parser.add_argument("--silence-limit", type=float, default=0.95, help="flag files with this share of silence")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    root = os.path.abspath(os.path.expanduser(args.root))
+    if not os.path.isdir(root):
+        print(f"No such folder: {root}")
+        return
+    index_path = os.path.expanduser(args.index) if args.index else os.path.join(root, INDEX_NAME)
+    options = {
+        'window_ms': args.window, 'silence_db': args.silence_db, 'clip_level': args.clip_level,
+    }
+
+    recordings = find_recordings(root)
+    cached = {} if args.rebuild else load_index(index_path)
+    files = {}
+    pending = []
+    for recording in recordings:
+        stat = os.stat(recording)
+        entry = cached.get(recording)
+        # Параметры анализа тоже часть ключа: другие пороги — другие числа
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size \
+                and entry.get('options') == options:
+            files[recording] = entry
+        else:
+            files[recording] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'options': options}
+            pending.append(recording)
+
+    print(f"{len(recordings)} recordings, {len(recordings) - len(pending)} cached, {len(pending)} to analyze")
+    started = time.perf_counter()
+    done = 0
+    audio = 0.0
+    for recording, report, error in run_reports(pending, options, args.jobs):
+        entry = files[recording]
+        entry['report'] = report
+        entry['error'] = error
+        done += 1
+        if report:
+            audio += report['duration']
+        if error:
+            print(f"Failed: {recording}: {error}")
+        if done % INDEX_SAVE_EVERY == 0:
+            save_index(index_path, files)
+            elapsed = time.perf_counter() - started
+            print(f"  {done}/{len(pending)} files, {audio / 3600:.1f} h of audio in {elapsed:.0f} s")
+    # Заодно выпадают записи, которых больше нет на диске
+    save_index(index_path, files)
+    elapsed = time.perf_counter() - started
+    if pending:
+        print(
+            f"Analyzed {done} files, {audio / 3600:.2f} h of audio in {elapsed:.1f} s "
+            f"({audio / max(elapsed, 1e-9):.0f}x real time, {args.jobs} jobs)"
+        )
+
+    reports = [files[r]['report'] for r in recordings if files[r].get('report')]
+    if reports:
+        total = sum(r['duration'] for r in reports)
+        loudest = max(r['true_peak_db'] for r in reports)
+        print(f"Archive: {len(reports)} files, {total / 3600:.1f} h, loudest true peak {loudest:+.1f} dBTP")
+
+    flagged = [(r, flags(files[r], args)) for r in recordings]
+    flagged = [(r, reasons) for r, reasons in flagged if reasons]
+    if flagged:
+        print(f"{len(flagged)} files need a look:")
+        for recording, reasons in flagged:
+            print(f"  {os.path.relpath(recording, root)}: {', '.join(reasons)}")
+
+    if args.csv:
+        write_csv(os.path.expanduser(args.csv), recordings, files)
+        print(f"CSV: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
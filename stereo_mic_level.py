@@ -3,6 +3,10 @@ import numpy as np
 import tkinter as tk
 from tkinter import font as tkfont
 
+from meterlib.levels import LevelMeter, latch_peaks
+from meterlib.scheduler import AdaptiveRefresh
+from meterlib.snapshot import LevelSnapshot
+
 class AudioLevelMeter:
     def __init__(self):
         self.root = tk.Tk()
@@ -24,18 +28,21 @@ class AudioLevelMeter:
         self.DECAY_RATE = 25  # Скорость затухания (dB/сек)
         
         # Состояние уровней
-        self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-        self.last_peak_time = [0] * self.input_channels
-        self.peak_hold_counter = [0] * self.input_channels
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.last_peak_time = np.zeros(self.input_channels)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        self.level_meter = LevelMeter(self.input_channels, rms_floor=1e-6, block_size=1024)
+        self.levels = LevelSnapshot(self.input_channels, floor=-self.LEVEL_RANGE)
         
         self.setup_window()
         self.setup_ui()
         self.setup_audio()
         
-        self.update_interval = 30  # мс
-        self.root.after(self.update_interval, self.update_meter)
+        # Частота кадров: быстро, пока уровни движутся, редко в тишине
+        self.refresh = AdaptiveRefresh()
+        self.root.after(self.refresh.fast_interval, self.update_meter)
         self.root.mainloop()
 
     def setup_window(self):
@@ -152,36 +159,39 @@ class AudioLevelMeter:
         if status:
             print(status)
         
-        for channel in range(self.input_channels):
-            channel_data = indata[:, channel]
-            rms = np.sqrt(np.mean(channel_data**2))
-            self.rms_level[channel] = 20 * np.log10(max(rms, 1e-6))
-            
-            peak = np.max(np.abs(channel_data))
-            peak_db = 20 * np.log10(max(peak, 1e-6))
-            
-            if peak_db > self.peak_level[channel]:
-                self.peak_level[channel] = peak_db
-                self.last_peak_time[channel] = time.currentTime
-                self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
+        # Уровни всех каналов за один проход
+        self.level_meter.process(indata)
+        # Публикуем снимок — удержание и спад считает поток интерфейса
+        self.levels.publish(self.level_meter.rms_db, self.level_meter.peak_db, stream_time=time.currentTime)
 
     def update_meter(self):
+        dt = self.refresh.tick()
+
+        # Свежие уровни из callback'а; пик — максимум всех блоков с прошлого кадра
+        if self.levels.read():
+            self.rms_level[:] = self.levels.rms_db
+            rising = latch_peaks(
+                self.peak_level, self.levels.peak_db, self.peak_hold_left,
+                self.PEAK_HOLD_TIME
+            )
+            self.last_peak_time[rising] = self.levels.time
+
         for channel in range(self.input_channels):
             canvas = self.canvases[channel]
             
             if self.rms_level[channel] > self.smoothed_level[channel]:
                 self.smoothed_level[channel] = self.rms_level[channel]
             else:
-                decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * dt
                 self.smoothed_level[channel] = max(
                     self.smoothed_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
                 )
             
-            if self.peak_hold_counter[channel] > 0:
-                self.peak_hold_counter[channel] -= 1
+            if self.peak_hold_left[channel] > 0:
+                self.peak_hold_left[channel] -= dt
             else:
-                decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                decay_amount = self.DECAY_RATE * 2 * dt
                 self.peak_level[channel] = max(
                     self.peak_level[channel] - decay_amount, 
                     -self.LEVEL_RANGE
@@ -204,7 +214,7 @@ class AudioLevelMeter:
                 color = 'green'
             canvas.itemconfig(canvas.level_bar, fill=color)
         
-        self.root.after(self.update_interval, self.update_meter)
+        self.root.after(self.refresh.next_interval(self.smoothed_level, self.peak_level), self.update_meter)
 
     def start_move(self, event):
         self.drag_data = {"x": event.x, "y": event.y}
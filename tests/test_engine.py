@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from meterlib.engine import FRAME_HEADER, MeterEngine, pack_levels, unpack_levels
+
+SAMPLE_RATE = 48000
+
+
+def _engine(spectrum=False):
+    band_centers = np.logspace(np.log10(50), np.log10(10000), 10) if spectrum else None
+    return MeterEngine(SAMPLE_RATE, 2, block_size=128, band_centers=band_centers, max_freq=10000)
+
+
+def _quiet(frames=128):
+    return np.full((frames, 2), 0.001, dtype=np.float32)
+
+
+def test_frame_round_trip():
+    engine = _engine(spectrum=True)
+    for _ in range(20):
+        engine.process(_quiet())
+    frame = unpack_levels(pack_levels(engine, seq=7, timestamp=123.5))
+    assert frame['seq'] == 7
+    assert frame['timestamp'] == 123.5
+    np.testing.assert_array_equal(frame['rms_db'], engine.rms_db)
+    np.testing.assert_array_equal(frame['peak_hold_db'], engine.peak_hold_db)
+    np.testing.assert_array_equal(frame['band_db'], engine.band_db)
+    np.testing.assert_array_equal(frame['band_peak_db'], engine.band_peak_db)
+
+
+def test_frame_without_spectrum_has_no_bands():
+    engine = _engine()
+    engine.process(_quiet())
+    frame = unpack_levels(pack_levels(engine, seq=1))
+    assert len(frame['rms_db']) == 2
+    assert len(frame['band_db']) == 0
+    assert len(frame['band_peak_db']) == 0
+
+
+def test_frame_peak_covers_all_blocks_since_previous_frame():
+    engine = _engine()
+    pack_levels(engine, seq=0)
+    # Короткий выброс в первом из многих блоков между кадрами
+    spike = _quiet()
+    spike[5, 1] = 0.5
+    engine.process(spike)
+    for _ in range(15):
+        engine.process(_quiet())
+    assert engine.peak_db[1] < -50
+
+    frame = unpack_levels(pack_levels(engine, seq=1))
+    assert frame['peak_db'][1] == pytest.approx(20 * np.log10(0.5), abs=0.01)
+
+    engine.process(_quiet())
+    frame = unpack_levels(pack_levels(engine, seq=2))
+    assert frame['peak_db'][1] < -50
+
+
+def test_unpack_rejects_foreign_and_truncated_frames():
+    engine = _engine()
+    engine.process(_quiet())
+    data = pack_levels(engine, seq=1)
+    with pytest.raises(ValueError):
+        unpack_levels(b'XXXX' + data[4:])
+    with pytest.raises(ValueError):
+        unpack_levels(data[:FRAME_HEADER.size + 4])
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from meterlib.levels import SlidingRMS, TruePeakMeter
+
+
+def _rms_db(x):
+    return 20 * np.log10(np.sqrt(np.mean(np.square(x, dtype=np.float64), axis=0)))
+
+
+@pytest.mark.parametrize("block", [64, 480, 1000, 4096])
+def test_sliding_rms_matches_direct_window(block):
+    rng = np.random.default_rng(1)
+    window = 2400
+    x = (rng.standard_normal((20000, 2)) * [0.1, 0.01]).astype(np.float32)
+    rms = SlidingRMS(window, 2)
+    for start in range(0, len(x), block):
+        rms.process(x[start:start + block])
+        end = min(start + block, len(x))
+        # Пока окно не заполнено — среднее по накопленным кадрам
+        expected = _rms_db(x[max(0, end - window):end])
+        np.testing.assert_allclose(rms.rms_db, expected, atol=1e-3)
+
+
+def test_sliding_rms_of_full_scale_sine_is_minus_3_db():
+    sample_rate = 48000
+    t = np.arange(sample_rate) / sample_rate
+    sine = np.sin(2 * np.pi * 1000 * t).astype(np.float32)[:, None]
+    rms = SlidingRMS(int(0.05 * sample_rate), 1)
+    for start in range(0, len(sine), 1024):
+        rms.process(sine[start:start + 1024])
+    assert rms.rms_db[0] == pytest.approx(-3.01, abs=0.01)
+
+
+def test_sliding_rms_returns_to_floor_on_silence():
+    rms = SlidingRMS(1000, 1, floor=1e-6)
+    rms.process(np.ones((1500, 1), dtype=np.float32))
+    for _ in range(3):
+        rms.process(np.zeros((400, 1), dtype=np.float32))
+    assert rms.rms_db[0] == pytest.approx(-120)
+
+
+def _quarter_rate_sine(frames, channels=1):
+    # Синус fs/4 с фазой 45°: все отсчеты равны ±0.7071, вершины — между ними
+    n = np.arange(frames)
+    sine = np.sin(np.pi / 2 * n + np.pi / 4).astype(np.float32)
+    return np.repeat(sine[:, None], channels, axis=1)
+
+
+def test_true_peak_finds_inter_sample_peak_of_quarter_rate_sine():
+    sine = _quarter_rate_sine(48000)
+    assert 20 * np.log10(np.abs(sine).max()) == pytest.approx(-3.01, abs=0.01)
+    meter = TruePeakMeter(1)
+    peak = max(meter.process(sine[start:start + 1024])[0] for start in range(0, len(sine), 1024))
+    assert 20 * np.log10(peak) == pytest.approx(0.0, abs=0.3)
+
+
+@pytest.mark.parametrize("block", [1, 7, 300, 2048, 5000])
+def test_true_peak_does_not_depend_on_block_split(block):
+    rng = np.random.default_rng(2)
+    x = (rng.standard_normal((6000, 2)) * 0.3).astype(np.float32)
+    whole = TruePeakMeter(2, block_size=512).process(x).copy()
+    meter = TruePeakMeter(2, block_size=512)
+    split = np.zeros(2, dtype=np.float32)
+    for start in range(0, len(x), block):
+        np.maximum(split, meter.process(x[start:start + block]), out=split)
+    np.testing.assert_allclose(split, whole, rtol=1e-5)
+
+
+def test_true_peak_keeps_history_across_blocks():
+    # Вершина синуса приходится на стык блоков: без истории ее не видно
+    sine = _quarter_rate_sine(64)
+    meter = TruePeakMeter(1)
+    meter.process(sine[:32])
+    peak = meter.process(sine[32:33])[0]
+    assert peak > 0.9
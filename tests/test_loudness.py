@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from meterlib.loudness import LoudnessMeter
+
+SAMPLE_RATE = 48000
+
+
+def _feed(meter, segments, block=4410):
+    """Подает стерео-синус 1 кГц кусками: segments — [(уровень dBFS, секунды)]
+
+    Уровень — амплитуда синуса в каждом канале, как в EBU Tech 3341.
+    Фаза синуса непрерывна на стыках сегментов.
+    """
+    start = 0
+    for level_db, seconds in segments:
+        frames = int(round(seconds * SAMPLE_RATE))
+        n = np.arange(start, start + frames)
+        tone = 10 ** (level_db / 20) * np.sin(2 * np.pi * 1000 * n / SAMPLE_RATE)
+        stereo = np.repeat(tone[:, None], 2, axis=1).astype(np.float32)
+        for pos in range(0, frames, block):
+            meter.process(stereo[pos:pos + block])
+        start += frames
+
+
+@pytest.mark.parametrize("level", [-23.0, -33.0])
+def test_ebu_3341_steady_tone(level):
+    # Случаи 1 и 2: momentary, short-term и integrated равны уровню тона
+    meter = LoudnessMeter(SAMPLE_RATE, 2)
+    _feed(meter, [(level, 20)])
+    assert meter.momentary == pytest.approx(level, abs=0.1)
+    assert meter.short_term == pytest.approx(level, abs=0.1)
+    assert meter.integrated == pytest.approx(level, abs=0.1)
+
+
+@pytest.mark.parametrize("segments", [
+    # Случай 3: относительный порог отсекает тихие края
+    [(-36, 10), (-23, 60), (-36, 10)],
+    # Случай 4: абсолютный порог отсекает -72, относительный — -36
+    [(-72, 10), (-36, 10), (-23, 60), (-36, 10), (-72, 10)],
+    # Случай 5: громкая середина уравновешивает тихие края
+    [(-26, 20), (-20, 20.1), (-26, 20)],
+])
+def test_ebu_3341_gated_integrated(segments):
+    meter = LoudnessMeter(SAMPLE_RATE, 2)
+    _feed(meter, segments)
+    assert meter.integrated == pytest.approx(-23.0, abs=0.1)
+
+
+def test_loudness_does_not_depend_on_block_size():
+    results = []
+    for block in (128, 1000, 48000):
+        meter = LoudnessMeter(SAMPLE_RATE, 2)
+        _feed(meter, [(-36, 5), (-23, 10)], block=block)
+        results.append((meter.momentary, meter.short_term, meter.integrated))
+    np.testing.assert_allclose(results[1:], [results[0]] * 2, atol=1e-6)
+
+
+def test_reset_starts_integrated_over():
+    meter = LoudnessMeter(SAMPLE_RATE, 2)
+    _feed(meter, [(-33, 10)])
+    meter.reset()
+    assert meter.integrated == meter.floor
+    _feed(meter, [(-23, 10)])
+    assert meter.integrated == pytest.approx(-23.0, abs=0.1)
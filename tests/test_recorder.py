@@ -0,0 +1,97 @@
+import struct
+
+import numpy as np
+
+from meterlib.recorder import AudioRecorder
+from meterlib.trigger import LevelTrigger
+
+SAMPLE_RATE = 8000
+# Номер кадра в канале 0: точно представим во float32 и тише порогов триггера
+INDEX_SCALE = 2.0 ** -24
+
+
+def _read_float_wav(path, channels):
+    with open(path, 'rb') as f:
+        data = f.read()
+    pos = 12
+    while pos < len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, pos)
+        if chunk_id == b'data':
+            return np.frombuffer(data, dtype='<f4', count=size // 4, offset=pos + 8).reshape(-1, channels)
+        pos += 8 + size + size % 2
+    raise ValueError("no data chunk")
+
+
+class DelayProcessor:
+    """Обработка с задержкой delay кадров, как у спектрального гейта"""
+    def __init__(self, channels, delay):
+        self.channels = channels
+        self.delay = delay
+        self.pending = np.zeros((delay, channels), dtype=np.float32)
+        self.flushes = 0
+
+    def process(self, block):
+        data = np.concatenate((self.pending, block))
+        self.pending = data[-self.delay:].copy()
+        return data[:-self.delay]
+
+    def flush(self):
+        self.flushes += 1
+        tail = self.pending
+        self.pending = np.zeros((self.delay, self.channels), dtype=np.float32)
+        return tail
+
+
+def _signal(sections, first_index=1000):
+    """Канал 0 — номер кадра, канал 1 — уровень: sections = [(амплитуда, секунды)]"""
+    level = np.concatenate([np.full(int(seconds * SAMPLE_RATE), amplitude) for amplitude, seconds in sections])
+    index = np.arange(first_index, first_index + len(level)) * INDEX_SCALE
+    return np.stack((index, level), axis=1).astype(np.float32)
+
+
+def test_delaying_processor_keeps_frame_order_across_segments(tmp_path):
+    processor = DelayProcessor(2, delay=700)
+    recorder = AudioRecorder(
+        SAMPLE_RATE, 2, fmt="WAV 32-bit float", ring_seconds=10, preroll_seconds=0.25,
+        preroll_dtype=np.float32, processor=processor,
+    )
+    trigger = LevelTrigger(SAMPLE_RATE, attack_db=-20, release_db=-30, hold_seconds=0.5, block_frames=256)
+    names = []
+
+    def segment_name(index):
+        names.append(str(tmp_path / f"segment {index}.wav"))
+        return names[-1]
+
+    audio = _signal([(0, 1), (0.5, 1), (0, 2), (0.5, 1)])
+    recorder.start()
+    recorder.arm(trigger, segment_name)
+    # Куски не кратны шагу триггера: STOP приходится на середину куска
+    for start in range(0, len(audio), 1000):
+        recorder.push(audio[start:start + 1000])
+    assert recorder.close()
+    recorder.stop()
+
+    assert len(names) == 2
+    assert processor.flushes == 1
+    for i, name in enumerate(names):
+        index = np.rint(_read_float_wav(name, 2)[:, 0] / INDEX_SCALE).astype(np.int64)
+        # Внутри сегмента (с пре-роллом) кадры идут подряд, без дыр и перестановок
+        assert np.all(np.diff(index) == 1)
+        assert index[0] > 1000
+    # Последний сегмент закрыт close(): задержанный хвост дописан до последнего кадра входа
+    assert index[-1] == 1000 + len(audio) - 1
+
+
+def test_float_preroll_keeps_full_resolution(tmp_path):
+    recorder = AudioRecorder(
+        SAMPLE_RATE, 2, fmt="WAV 32-bit float", preroll_seconds=0.5, preroll_dtype=np.float32,
+    )
+    # Выше 0 dBFS и тише младшего разряда int16 — пре-ролл не должен трогать ни то, ни другое
+    audio = np.stack((np.linspace(-1.5, 1.5, 2000), np.full(2000, 1e-6)), axis=1).astype(np.float32)
+    recorder.start()
+    recorder.push(audio)
+    filename = str(tmp_path / "Record.wav")
+    recorder.open(filename)
+    assert recorder.close()
+    recorder.stop()
+    np.testing.assert_array_equal(_read_float_wav(filename, 2), audio)
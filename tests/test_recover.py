@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+import recover
+from meterlib.journal import JournalReader, journal_path
+from meterlib.sinks import JournalSink
+
+SAMPLE_RATE = 8000
+BLOCK = 800
+
+
+def _crashed_recording(tmp_path, blocks=5):
+    """Запись с журналом, оборванная без close(): WAV и .jidx остаются на диске"""
+    filename = str(tmp_path / "Record.wav")
+    sink = JournalSink(filename, SAMPLE_RATE, 2, 'PCM_16')
+    rng = np.random.default_rng(3)
+    audio = (rng.standard_normal((blocks * BLOCK, 2)) * 0.1).astype(np.float32)
+    for start in range(0, len(audio), BLOCK):
+        sink.write(audio[start:start + BLOCK])
+    sink.file.close()
+    sink.journal.file.close()
+    return filename, sink.data_offset, sink.block_align
+
+
+def _corrupt_block(filename, data_offset, block_align, block):
+    with open(filename, 'r+b') as f:
+        f.seek(data_offset + block * BLOCK * block_align + 10)
+        byte = f.read(1)
+        f.seek(-1, 1)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def _run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['recover.py', *args])
+    recover.main()
+
+
+def test_journal_lists_every_block(tmp_path):
+    filename, _, _ = _crashed_recording(tmp_path)
+    reader = JournalReader(journal_path(filename))
+    records = list(reader.records())
+    reader.close()
+    assert [seq for seq, *_ in records] == list(range(5))
+    assert [offset for _, offset, *_ in records] == [i * BLOCK for i in range(5)]
+
+
+def test_recover_rebuilds_whole_recording(tmp_path):
+    filename, data_offset, _ = _crashed_recording(tmp_path)
+    output, seconds, stopped, complete = recover.recover(journal_path(filename))
+    assert complete and stopped == "end of journal"
+    assert seconds == pytest.approx(5 * BLOCK / SAMPLE_RATE)
+    with open(filename, 'rb') as original, open(output, 'rb') as rebuilt:
+        assert rebuilt.read()[data_offset:] == original.read()[data_offset:]
+
+
+def test_recover_stops_at_corrupted_block(tmp_path):
+    filename, data_offset, block_align = _crashed_recording(tmp_path)
+    _corrupt_block(filename, data_offset, block_align, 2)
+    _, seconds, stopped, complete = recover.recover(journal_path(filename))
+    assert not complete
+    assert stopped == "checksum mismatch in block 2"
+    assert seconds == pytest.approx(2 * BLOCK / SAMPLE_RATE)
+
+
+def test_clean_removes_originals_after_complete_recovery(tmp_path, monkeypatch):
+    filename, _, _ = _crashed_recording(tmp_path)
+    _run(monkeypatch, str(tmp_path), '--clean')
+    assert not os.path.exists(filename)
+    assert not os.path.exists(journal_path(filename))
+
+
+def test_clean_keeps_originals_after_partial_recovery(tmp_path, monkeypatch):
+    filename, data_offset, block_align = _crashed_recording(tmp_path)
+    _corrupt_block(filename, data_offset, block_align, 2)
+    _run(monkeypatch, str(tmp_path), '--clean')
+    assert os.path.exists(filename)
+    assert os.path.exists(journal_path(filename))
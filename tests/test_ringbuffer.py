@@ -0,0 +1,36 @@
+import numpy as np
+
+from meterlib.ringbuffer import AudioRingBuffer
+
+
+def test_wraparound_keeps_frame_order():
+    ring = AudioRingBuffer(10, 2)
+    frames = np.arange(40, dtype=np.float32).reshape(20, 2)
+    read = []
+    # Блоки по 3 кадра, чтение по 4 — позиции чтения и записи обходят кольцо несколько раз
+    for start in range(0, 18, 3):
+        assert ring.write(frames[start:start + 3])
+        read.append(ring.read(4).copy())
+    read.append(ring.read())
+    np.testing.assert_array_equal(np.concatenate(read), frames[:18])
+    assert ring.available() == 0
+
+
+def test_overflow_drops_whole_block_and_counts_it():
+    ring = AudioRingBuffer(8, 1)
+    assert ring.write(np.ones((6, 1), dtype=np.float32))
+    assert not ring.write(np.full((3, 1), 2, dtype=np.float32))
+    assert (ring.overflows, ring.dropped_frames) == (1, 3)
+    # Отброшенный блок не оставляет следов: в буфере только первый
+    np.testing.assert_array_equal(ring.read(), np.ones((6, 1)))
+
+
+def test_read_into_preallocated_output():
+    ring = AudioRingBuffer(4, 1)
+    out = np.zeros((4, 1), dtype=np.float32)
+    ring.write(np.array([[1], [2], [3]], dtype=np.float32))
+    ring.read(2)
+    ring.write(np.array([[4], [5], [6]], dtype=np.float32))
+    block = ring.read(4, out=out)
+    assert np.shares_memory(block, out)
+    np.testing.assert_array_equal(block[:, 0], [3, 4, 5, 6])
@@ -0,0 +1,150 @@
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from meterlib import sinks
+from meterlib.sinks import RollingSink, WavSink, encode_pcm24, part_filename
+
+
+def _chunks(path):
+    """Содержимое файла и {id чанка: (смещение тела, размер из заголовка)}"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    chunks = {}
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, pos)
+        chunks[chunk_id] = (pos + 8, size)
+        if chunk_id == b'data':
+            break
+        pos += 8 + size + size % 2
+    return data, chunks
+
+
+def _decode_pcm24(data):
+    raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+    values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+    return np.where(values >= 1 << 23, values - (1 << 24), values)
+
+
+def _pcm24_ints(block):
+    return (np.clip(block, -1, 1) * 8388607).astype(np.int32).ravel()
+
+
+def test_pcm24_packs_three_little_endian_bytes_and_clips():
+    block = np.array([[0.0, 1.0], [-1.0, 0.5], [2.0, -2.0], [-0.5, 1e-7]], dtype=np.float32)
+    decoded = _decode_pcm24(encode_pcm24(block))
+    np.testing.assert_array_equal(decoded, _pcm24_ints(block))
+    # Кадр [2.0, -2.0] обрезан до полной шкалы, а не завернут
+    assert decoded[4] == 8388607 and decoded[5] == -8388607
+
+
+def test_wav_header_sizes_after_close(tmp_path):
+    path = str(tmp_path / "a.wav")
+    sink = WavSink(path, 48000, 2, 'PCM_24')
+    block = np.random.default_rng(0).uniform(-1, 1, (1001, 2)).astype(np.float32)
+    sink.write(block)
+    sink.close()
+
+    data, chunks = _chunks(path)
+    assert data[:4] == b'RIFF'
+    assert struct.unpack_from('<I', data, 4)[0] == len(data) - 8
+    offset, size = chunks[b'data']
+    assert size == 1001 * 6
+    assert b'JUNK' in chunks
+    np.testing.assert_array_equal(_decode_pcm24(data[offset:offset + size]), _pcm24_ints(block))
+
+
+def test_float_wav_keeps_values_above_full_scale(tmp_path):
+    path = str(tmp_path / "f.wav")
+    sink = WavSink(path, 48000, 1, 'FLOAT')
+    block = np.array([[1.5], [-2.0], [0.25]], dtype=np.float32)
+    sink.write(block)
+    sink.close()
+    data, chunks = _chunks(path)
+    offset, size = chunks[b'data']
+    np.testing.assert_array_equal(np.frombuffer(data, '<f4', count=3, offset=offset), block[:, 0])
+    fact_offset, _ = chunks[b'fact']
+    assert struct.unpack_from('<I', data, fact_offset)[0] == 3
+
+
+def test_large_file_becomes_rf64_with_ds64(tmp_path, monkeypatch):
+    # Порог 32-битных полей понижен, чтобы не писать 4 ГБ
+    monkeypatch.setattr(sinks, 'UINT32_MAX', 1000)
+    path = str(tmp_path / "big.wav")
+    sink = WavSink(path, 48000, 2, 'FLOAT')
+    sink.write(np.zeros((200, 2), dtype=np.float32))
+    sink.close()
+
+    data, chunks = _chunks(path)
+    assert data[:4] == b'RF64'
+    assert struct.unpack_from('<I', data, 4)[0] == 1000
+    assert b'JUNK' not in chunks
+    ds64_offset, ds64_size = chunks[b'ds64']
+    assert ds64_size == sinks.DS64_SIZE
+    riff_size, data_size, sample_count, table = struct.unpack_from('<QQQI', data, ds64_offset)
+    assert riff_size == len(data) - 8
+    assert data_size == 200 * 8
+    assert sample_count == 200
+    assert table == 0
+    assert chunks[b'data'][1] == 1000
+    fact_offset, _ = chunks[b'fact']
+    assert struct.unpack_from('<I', data, fact_offset)[0] == 1000
+
+
+def test_sync_patches_sizes_of_open_file(tmp_path):
+    path = str(tmp_path / "s.wav")
+    sink = WavSink(path, 8000, 1, 'PCM_16')
+    sink.write(np.zeros((100, 1), dtype=np.float32))
+    sink.sync()
+    _, chunks = _chunks(path)
+    assert chunks[b'data'][1] == 200
+    sink.close()
+
+
+def _read_float_frames(path, channels):
+    data, chunks = _chunks(path)
+    offset, size = chunks[b'data']
+    return np.frombuffer(data, '<f4', count=size // 4, offset=offset).reshape(-1, channels)
+
+
+@pytest.mark.parametrize("block", [1, 333, 750, 4000])
+def test_rolling_sink_splits_on_exact_frames(tmp_path, block):
+    filename = str(tmp_path / "Record.wav")
+    rolled = []
+    sink = RollingSink("WAV 32-bit float", filename, 1000, 1, rollover_seconds=0.75,
+                       sync_seconds=None, on_rollover=rolled.append)
+    audio = np.arange(2000, dtype=np.float32)[:, None]
+    for start in range(0, len(audio), block):
+        sink.write(audio[start:start + block])
+    sink.close()
+
+    parts = [part_filename(filename, part) for part in (1, 2, 3)]
+    assert rolled == parts[1:]
+    assert not os.path.exists(part_filename(filename, 4))
+    frames = [_read_float_frames(path, 1) for path in parts]
+    assert [len(f) for f in frames] == [750, 750, 500]
+    # Части встык: без пропусков и повторов кадров
+    np.testing.assert_array_equal(np.concatenate(frames), audio)
+    assert sink.frames_written == 2000
+
+
+def test_rolling_sink_splits_by_size_in_whole_frames(tmp_path):
+    filename = str(tmp_path / "Record.wav")
+    sink = RollingSink("WAV 16-bit", filename, 1000, 2, rollover_bytes=4096, sync_seconds=None)
+    header = WavSink(str(tmp_path / "probe.wav"), 1000, 2, 'PCM_16')
+    header.close()
+    sink.write(np.zeros((3000, 2), dtype=np.float32))
+    sink.close()
+
+    frames_per_part = (4096 - os.path.getsize(str(tmp_path / "probe.wav"))) // 4
+    sizes = []
+    part = 1
+    while os.path.exists(part_filename(filename, part)):
+        sizes.append(_chunks(part_filename(filename, part))[1][b'data'][1] // 4)
+        assert os.path.getsize(part_filename(filename, part)) <= 4096
+        part += 1
+    assert sizes[:-1] == [frames_per_part] * (len(sizes) - 1)
+    assert sum(sizes) == 3000
@@ -0,0 +1,40 @@
+import numpy as np
+
+from meterlib.snapshot import LevelSnapshot
+
+
+def test_read_returns_false_without_new_blocks():
+    levels = LevelSnapshot(2)
+    assert not levels.read()
+    levels.publish([-20, -20], [-10, -10])
+    assert levels.read()
+    assert not levels.read()
+
+
+def test_peaks_accumulate_between_reads_rms_is_latest():
+    levels = LevelSnapshot(2, floor=-60)
+    levels.publish([-30, -40], [-12, -30], stream_time=1.0)
+    # Короткий выброс во втором блоке не теряется, хотя читатель его пропустил
+    levels.publish([-31, -41], [-3, -35], stream_time=2.0)
+    levels.publish([-32, -42], [-20, -25], stream_time=3.0)
+    assert levels.read()
+    np.testing.assert_array_equal(levels.rms_db, [-32, -42])
+    np.testing.assert_array_equal(levels.peak_db, [-3, -25])
+    assert levels.blocks == 3
+    assert levels.time == 3.0
+
+    # После чтения максимум начинается заново
+    levels.publish([-50, -50], [-40, -40])
+    assert levels.read()
+    np.testing.assert_array_equal(levels.peak_db, [-40, -40])
+    assert levels.blocks == 1
+
+
+def test_band_peaks_accumulate_like_channel_peaks():
+    levels = LevelSnapshot(1, bands=3)
+    levels.publish([-20], [-10], band_db=[-30, -5, -40])
+    levels.publish([-20], [-10], band_db=[-10, -25, -45])
+    assert levels.read()
+    np.testing.assert_array_equal(levels.band_db, [-10, -25, -45])
+    np.testing.assert_array_equal(levels.band_peak_db, [-10, -5, -40])
+    assert levels.torn_reads == 0
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from meterlib import spectrum
+from meterlib.spectrum import band_filter_bank, multirate_filter_bank
+
+SAMPLE_RATE = 48000
+CENTERS = np.logspace(np.log10(20), np.log10(20000), 31)
+
+
+def _steady_tone_db(bank, freq, block=1024):
+    """Средняя мощность полос (dB) за третью секунду тона — после установления фильтров"""
+    t = np.arange(3 * SAMPLE_RATE) / SAMPLE_RATE
+    x = np.sin(2 * np.pi * freq * t)
+    for start in range(0, 2 * SAMPLE_RATE, block):
+        bank.process(x[start:start + block])
+    power = [
+        10 ** (bank.process(x[start:start + block]).astype(np.float64) / 10)
+        for start in range(2 * SAMPLE_RATE, 3 * SAMPLE_RATE, block)
+    ]
+    return 10 * np.log10(np.mean(power, axis=0))
+
+
+@pytest.mark.parametrize("band", [3, 10, 20, 28])
+def test_full_scale_tone_reads_minus_3_db_in_its_band(band):
+    levels = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), CENTERS[band])
+    assert levels[band] == pytest.approx(-3.01, abs=0.15)
+    # Соседние полосы 1/3 октавы подавляют тон хотя бы на 20 dB
+    assert levels[band - 1] < -20
+    assert levels[band + 1] < -20
+
+
+@pytest.mark.parametrize("band", [3, 10, 20, 28])
+def test_multirate_bank_matches_single_rate_bank_at_band_center(band):
+    freq = CENTERS[band]
+    multirate = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq)
+    single_rate = _steady_tone_db(band_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq)
+    assert multirate[band] == pytest.approx(single_rate[band], abs=0.03)
+
+
+def test_multirate_bank_accepts_odd_block_sizes():
+    freq = CENTERS[10]
+    even = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq, block=1024)
+    odd = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq, block=333)
+    assert odd[10] == pytest.approx(even[10], abs=0.05)
+
+
+def test_bank_without_private_kernel_gives_same_levels(monkeypatch):
+    freq = CENTERS[20]
+    expected = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq)
+    monkeypatch.setattr(spectrum, "_sosfilt", None)
+    levels = _steady_tone_db(multirate_filter_bank(SAMPLE_RATE, CENTERS, 20000), freq)
+    np.testing.assert_allclose(levels, expected, atol=1e-3)
+
+
+def _raising_kernel(sos, x, zi):
+    raise TypeError("unexpected signature")
+
+
+def _passthrough_kernel(sos, x, zi):
+    pass
+
+
+@pytest.mark.parametrize("kernel", [_raising_kernel, _passthrough_kernel])
+def test_misbehaving_private_kernel_is_rejected(monkeypatch, kernel):
+    sosfilt_module = pytest.importorskip("scipy.signal._sosfilt")
+    monkeypatch.setattr(sosfilt_module, "_sosfilt", kernel)
+    assert spectrum._load_sosfilt_kernel() is None
+
+
+def test_multirate_band_responses_pass_band_centers():
+    responses = spectrum.multirate_band_responses(SAMPLE_RATE, CENTERS, 20000, CENTERS[:-1])
+    np.testing.assert_allclose(10 * np.log10(np.diag(responses[:-1])), 0, atol=0.05)
+
+
+@pytest.mark.parametrize("band", [4, 10, 20, 28])
+def test_fft_engine_matches_iir_engine_at_band_center(band):
+    freq = CENTERS[band]
+    iir = _steady_tone_db(spectrum.IIRSpectrum(SAMPLE_RATE, CENTERS, 20000), freq, block=2048)
+    fft = _steady_tone_db(spectrum.FFTSpectrum(SAMPLE_RATE, CENTERS, 20000), freq, block=2048)
+    assert fft[band] == pytest.approx(iir[band], abs=0.25)
@@ -1,6 +1,6 @@
 # BUILD INSTRUCTIONS:
 #     Build the app:
-#     pyinstaller --noconfirm --windowed --icon "VUmeter.icns" --name "VU Meter" VUmeter3.py
+#     pyinstaller --noconfirm --windowed --paths .. --icon "VUmeter.icns" --name "VU Meter" VUmeter3.py
 #
 #     Add microphone permission to Info.plist:
 #     Open dist/VU Meter.app/Contents/Info.plist and add these lines before </dict>:
@@ -12,63 +12,166 @@
 
 import sys
 import os
-import wave
 import datetime
 import subprocess
+import threading
 import time
 import numpy as np
 import sounddevice as sd
-from scipy import signal
 
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QPushButton, QMenu)
 from PyQt6.QtCore import Qt, QTimer, QRectF
-from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QAction, QShortcut, QKeySequence
+from PyQt6.QtGui import QPainter, QPixmap, QColor, QPen, QFont, QAction, QShortcut, QKeySequence
+
+# Общие модули лежат в корне репозитория (при сборке: pyinstaller --paths ..)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from meterlib.engine import MeterEngine
+from meterlib.hotplug import DeviceChangeListener
+from meterlib.latency import DEFAULT_BLOCK_SIZE, LATENCY_PROFILES, CallbackStats, profile_label
+from meterlib.levels import latch_peaks
+from meterlib.recorder import AudioRecorder
+from meterlib.scheduler import AdaptiveRefresh, rate_alpha
+from meterlib.sinks import DEFAULT_FORMAT, available_formats
+from meterlib.spectrum import SPECTRUM_ENGINES
 
 class MeterCanvas(QWidget):
-    """Кастомный виджет, который рисует шкалы, индикаторы и спектр"""
+    """Кастомный виджет, который рисует шкалы, индикаторы и спектр.
+
+    Статический слой (фон, шкала dB, подписи частот) рисуется один раз
+    в QPixmap и перерисовывается только при смене размера, числа каналов,
+    MIN_FREQ/MAX_FREQ или включении спектра. В каждом кадре поверх
+    готовой картинки рисуются только столбики и пиковые метки.
+    """
+    BAR_TOP = 10
+    BAR_BOTTOM = 215
+    BAND_WIDTH = 10
+    BAND_GAP = 3
+    GROUP_GAP = 8
+    DB_SCALE = [-1, -6, -12, -18, -24, -30, -35, -40, -45, -50, -55, -60]
+
     def __init__(self, main_app):
         super().__init__()
         self.main = main_app
+        self.static_layer = None
+        self.static_key = None
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.fillRect(self.rect(), Qt.GlobalColor.black)
+    def db_to_y(self, db):
+        LEVEL_RANGE = self.main.LEVEL_RANGE
+        db = max(-LEVEL_RANGE, min(0, db))
+        ratio = (db + LEVEL_RANGE) / LEVEL_RANGE
+        return self.BAR_BOTTOM - int((self.BAR_BOTTOM - self.BAR_TOP) * ratio)
+
+    def channel_layout(self):
+        """[(группа, x первого канала)] — главное устройство и дополнительные подряд"""
+        layout = []
+        x = 10
+        for group in self.main.meter_groups():
+            layout.append((group, x))
+            x += group.input_channels * 20 + self.GROUP_GAP
+        return layout
+
+    def scale_x(self):
+        groups = self.main.meter_groups()
+        channels = sum(group.input_channels for group in groups)
+        return 10 + channels * 20 + self.GROUP_GAP * (len(groups) - 1) + 10
+
+    def levels_width(self):
+        """Ширина холста без спектра: каналы всех устройств и шкала"""
+        groups = self.main.meter_groups()
+        if len(groups) == 1 and groups[0].input_channels == 1:
+            return 60
+        return self.scale_x() + 25
+
+    def invalidate_static(self):
+        """Заставляет перерисовать статический слой при следующем кадре"""
+        self.static_key = None
+
+    def static_layer_key(self):
+        main = self.main
+        return (
+            self.width(), self.height(), self.devicePixelRatioF(),
+            tuple(group.input_channels for group in main.meter_groups()),
+            main.show_spectrum, main.LEVEL_RANGE,
+            main.MIN_FREQ, main.MAX_FREQ, main.NUM_BANDS,
+        )
+
+    def render_static_layer(self):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.black)
+
+        painter = QPainter(pixmap)
+        db_to_y = self.db_to_y
+
+        # Разделители между устройствами
+        painter.setPen(QPen(QColor("#444"), 1))
+        for group, x in self.channel_layout()[1:]:
+            divider_x = x - self.GROUP_GAP // 2 - 1
+            painter.drawLine(divider_x, self.BAR_TOP, divider_x, self.BAR_BOTTOM)
+
+        # Шкала dB (правее каналов)
+        scale_x = self.scale_x()
+        painter.setPen(QPen(Qt.GlobalColor.yellow))
+        painter.setFont(QFont("Arial", 8))
+        painter.drawText(scale_x + 5, 10, "dB")
 
-        # Защита от отрисовки до инициализации аудио
-        if not hasattr(self.main, 'input_channels') or not hasattr(self.main, 'rms_level'):
-            return
+        for db in self.DB_SCALE:
+            y = db_to_y(db)
+            color = QColor("red") if db >= -6 else QColor("orange") if db >= -12 else QColor("green")
+            painter.setPen(QPen(color, 1.5))
+            painter.drawLine(scale_x - 6, y, scale_x, y)
+            painter.setPen(QPen(Qt.GlobalColor.white))
+            painter.drawText(scale_x + 5, y + 4, str(db))
 
-        LEVEL_RANGE = self.main.LEVEL_RANGE
-        bar_bottom = 215 
-        bar_top = 10
-        bar_max_h = bar_bottom - bar_top
-
-        def db_to_y(db):
-            db = max(-LEVEL_RANGE, min(0, db))
-            ratio = (db + LEVEL_RANGE) / LEVEL_RANGE
-            return bar_bottom - int(bar_max_h * ratio)
-
-        # 1. Отрисовка каналов (Слева)
-        for ch in range(self.main.input_channels):
-            if ch >= len(self.main.peak_level): break
-            ch_x = 10 + ch * 20
-            label = "M" if self.main.input_channels == 1 else ("L" if ch == 0 else "R")
+        # Подписи частот спектра
+        if self.main.show_spectrum:
+            spectrum_start_x = scale_x + 35
+            painter.setPen(QPen(Qt.GlobalColor.lightGray))
+            painter.setFont(QFont("Arial", 7))
+            for i in range(0, self.main.NUM_BANDS, 2):
+                x1 = spectrum_start_x + i * (self.BAND_WIDTH + self.BAND_GAP)
+                freq = int(self.main.band_centers[i])
+                if freq >= 1000:
+                    text = f"{freq/1000:.1f}k".replace(".0", "")
+                else:
+                    text = str(freq)
+                rect = QRectF(x1 - 15, self.BAR_BOTTOM + 4, self.BAND_WIDTH + 30, 20)
+                painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, text)
+
+        painter.end()
+        return pixmap
+
+    def paint_channels(self, painter, group, group_x):
+        """Столбики одного устройства (главного окна или DeviceMeter)"""
+        db_to_y = self.db_to_y
+        bar_bottom = self.BAR_BOTTOM
+        channels = group.input_channels
+        for ch in range(channels):
+            if ch >= len(group.peak_level): break
+            ch_x = group_x + ch * 20
+            if channels == 1:
+                label = "M"
+            elif channels == 2:
+                label = "L" if ch == 0 else "R"
+            else:
+                label = str(ch + 1)
             
-            if self.main.peak_level[ch] > -6:
+            if group.peak_level[ch] > -6:
                 painter.setPen(QPen(Qt.GlobalColor.red))
             else:
                 painter.setPen(QPen(Qt.GlobalColor.yellow))
             painter.drawText(ch_x, 10, label)
 
             if self.main.display_mode == "RMS":
-                display_level = self.main.smoothed_level[ch]
+                display_level = group.smoothed_level[ch]
             else:
-                display_level = self.main.peak_display_level[ch]
+                display_level = group.peak_display_level[ch]
 
             y_disp = db_to_y(display_level)
-            y_peak = db_to_y(self.main.peak_level[ch])
-            y_rms = db_to_y(self.main.smoothed_level[ch])
+            y_peak = db_to_y(group.peak_level[ch])
+            y_rms = db_to_y(group.smoothed_level[ch])
 
             fill_color = QColor("red") if display_level > -6 else QColor("orange") if display_level > -12 else QColor("green")
             painter.fillRect(ch_x, y_disp, 10, bar_bottom - y_disp, fill_color)
@@ -76,55 +179,177 @@ class MeterCanvas(QWidget):
             painter.setPen(QPen(Qt.GlobalColor.red, 2))
             painter.drawLine(ch_x, y_peak, ch_x + 10, y_peak)
 
-            if self.main.display_mode == "PEAK":
+            # PEAK: черта RMS; LUFS: черта short-term (столбик — momentary)
+            if self.main.display_mode != "RMS":
                 painter.setPen(QPen(Qt.GlobalColor.white, 2))
                 painter.drawLine(ch_x, y_rms, ch_x + 10, y_rms)
 
-        # 2. Отрисовка шкалы dB (Правее каналов)
-        scale_x = 10 + (self.main.input_channels * 20) + 10
-        painter.setPen(QPen(Qt.GlobalColor.yellow))
-        painter.setFont(QFont("Arial", 8))
-        painter.drawText(scale_x + 5, 10, "dB")
+    def paintEvent(self, event):
+        painter = QPainter(self)
 
-        db_scale = [-1, -6, -12, -18, -24, -30, -35, -40, -45, -50, -55, -60]
-        for db in db_scale:
-            y = db_to_y(db)
-            color = QColor("red") if db >= -6 else QColor("orange") if db >= -12 else QColor("green")
-            painter.setPen(QPen(color, 1.5))
-            painter.drawLine(scale_x - 6, y, scale_x, y)
-            painter.setPen(QPen(Qt.GlobalColor.white))
-            painter.drawText(scale_x + 5, y + 4, str(db))
+        # Защита от отрисовки до инициализации аудио
+        if not hasattr(self.main, 'input_channels') or not hasattr(self.main, 'rms_level'):
+            painter.fillRect(self.rect(), Qt.GlobalColor.black)
+            return
+
+        key = self.static_layer_key()
+        if key != self.static_key:
+            self.static_layer = self.render_static_layer()
+            self.static_key = key
+        painter.drawPixmap(0, 0, self.static_layer)
+
+        db_to_y = self.db_to_y
+        bar_bottom = self.BAR_BOTTOM
 
-        # 3. Отрисовка спектра (Если включен)
+        # 1. Каналы всех устройств (слева)
+        for group, group_x in self.channel_layout():
+            self.paint_channels(painter, group, group_x)
+
+        # 2. Полосы спектра (если включен)
         if self.main.show_spectrum:
-            spectrum_start_x = scale_x + 35
-            band_width = 10
-            band_gap = 3
+            spectrum_start_x = self.scale_x() + 35
+            band_width = self.BAND_WIDTH
+            painter.setPen(QPen(Qt.GlobalColor.red, 1))
 
             for i in range(self.main.NUM_BANDS):
-                x1 = spectrum_start_x + i * (band_width + band_gap)
+                x1 = spectrum_start_x + i * (band_width + self.BAND_GAP)
                 
                 y_rms = db_to_y(self.main.smoothed_band_levels[i])
                 y_peak = db_to_y(self.main.peak_band_levels[i])
                 
                 fill_color = QColor("red") if self.main.smoothed_band_levels[i] > -6 else QColor("orange") if self.main.smoothed_band_levels[i] > -15 else QColor("green")
                 painter.fillRect(x1, y_rms, band_width, bar_bottom - y_rms, fill_color)
-                
-                painter.setPen(QPen(Qt.GlobalColor.red, 1))
                 painter.drawLine(x1, y_peak, x1 + band_width, y_peak)
-                
-                if i % 2 == 0:
-                    freq = int(self.main.band_centers[i])
-                    if freq >= 1000:
-                        text = f"{freq/1000:.1f}k".replace(".0", "")
-                    else:
-                        text = str(freq)
-                        
-                    painter.setPen(QPen(Qt.GlobalColor.lightGray))
-                    painter.setFont(QFont("Arial", 7))
-                    
-                    rect = QRectF(x1 - 15, bar_bottom + 4, band_width + 30, 20)
-                    painter.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, text)
+
+
+def find_input_device(name):
+    """Индекс входного устройства по имени (индексы меняются после сброса PortAudio)"""
+    for i, dev in enumerate(sd.query_devices()):
+        if dev['name'] == name and dev.get('max_input_channels', 0) > 0:
+            return i
+    return None
+
+
+class DeviceMeter:
+    """Дополнительное входное устройство: свой поток, свой движок, свое состояние.
+
+    У каждого устройства собственный InputStream (и поток callback'а
+    PortAudio) и собственный MeterEngine со своим снимком уровней, так что
+    медленное или зависшее устройство не задерживает остальные. Поля
+    отрисовки называются так же, как у AudioLevelMeter (rms_level,
+    peak_level, smoothed_level, ...): сглаживание и MeterCanvas работают
+    с ними одинаково.
+
+    Устройство запоминается по имени — после сброса PortAudio индекс
+    ищется заново. Открытие и остановка потока идут в фоновом потоке
+    (start_reopen, connect); готовый движок ставит поток интерфейса (attach).
+    """
+    def __init__(self, name):
+        self.name = name
+        self.engine = None
+        self.input_channels = 0
+        self.reopening = False
+        self.reopen_result = None
+        self.reopen_cancel = None
+
+    def connect(self, main):
+        """Находит устройство и запускает его движок (фоновый поток); None — не открылось"""
+        index = find_input_device(self.name)
+        if index is None:
+            print(f"Device not found: {self.name}")
+            return None
+        info = sd.query_devices(index, 'input')
+        channels = info['max_input_channels']
+        sample_rate = int(info.get('default_samplerate', 44100))
+
+        # Без спектра и записи: только уровни
+        engine = MeterEngine(
+            sample_rate, channels, block_size=main.block_size,
+            rms_window_ms=main.rms_window_size, level_range=main.LEVEL_RANGE,
+            peak_hold_time=main.PEAK_HOLD_TIME, decay_rate=main.DECAY_RATE, true_peak=main.true_peak,
+        )
+        engine.set_loudness(main.display_mode == "LUFS")
+        try:
+            engine.start(index)
+        except Exception as e:
+            print(f"Could not open {self.name}: {e}")
+            return None
+        engine.last_block_time = time.time()
+        return engine
+
+    def attach(self, engine, main):
+        """Ставит открытый движок и массивы отрисовки под его каналы (поток интерфейса)"""
+        channels = engine.channels
+        floor = -main.LEVEL_RANGE
+        self.rms_level = np.full(channels, floor, dtype=np.float32)
+        self.peak_level = np.full(channels, floor, dtype=np.float32)
+        self.smoothed_level = np.full(channels, floor, dtype=np.float32)
+        self.peak_hold_left = np.zeros(channels, dtype=np.float32)
+        self.peak_display_level = np.full(channels, floor, dtype=np.float32)
+        self.rms_display_level = np.full(channels, floor, dtype=np.float32)
+        self.input_channels = channels
+        self.engine = engine
+        self.reopening = False
+
+    def detach(self):
+        """Снимает движок с отрисовки и отменяет переоткрытие; вернет движок для остановки"""
+        if self.reopen_cancel is not None:
+            self.reopen_cancel.set()
+        self.reopening = False
+        engine, self.engine = self.engine, None
+        return engine
+
+    def take_reopened(self):
+        """Забирает движок, открытый фоновым переоткрытием (или None)"""
+        engine, self.reopen_result = self.reopen_result, None
+        return engine
+
+    def start_reopen(self, main):
+        """Закрывает поток и открывает его заново в фоне, с паузами main.RECONNECT_BACKOFF.
+
+        Столбики устройства на это время убираются; готовый движок забирает
+        main.check_stream. PortAudio не сбрасывается — это делает только
+        переподключение главного устройства, а main.portaudio_lock не дает
+        им идти одновременно.
+        """
+        old_engine = self.detach()
+        self.reopening = True
+        self.reopen_result = None
+        self.reopen_cancel = threading.Event()
+        threading.Thread(
+            target=self.reopen_worker, args=(old_engine, main, self.reopen_cancel),
+            name="device-reopen", daemon=True,
+        ).start()
+
+    def reopen_worker(self, old_engine, main, cancel):
+        stop_engine(old_engine)
+        attempt = 0
+        while True:
+            delay = main.RECONNECT_BACKOFF[min(attempt, len(main.RECONNECT_BACKOFF) - 1)]
+            if cancel.wait(delay):
+                return
+            with main.portaudio_lock:
+                # Переподключение главного устройства забрало это устройство себе
+                if cancel.is_set():
+                    return
+                engine = self.connect(main)
+                if engine is not None:
+                    self.reopen_result = engine
+                    return
+            attempt += 1
+
+    def stalled(self, timeout=1.5):
+        return self.engine is not None and time.time() - self.engine.last_block_time > timeout
+
+
+def stop_engine(engine):
+    """Останавливает поток движка; у отвалившегося устройства это может занять секунды"""
+    if engine is None:
+        return
+    try:
+        engine.stop()
+    except Exception:
+        pass
 
 
 class AudioLevelMeter(QWidget):
@@ -140,20 +365,35 @@ class AudioLevelMeter(QWidget):
         self.LEVEL_RANGE = 60
         self.PEAK_HOLD_TIME = 1.5
         self.DECAY_RATE = 25
+        self.SMOOTHING_TICK = 0.015  # коэффициенты сглаживания режима PEAK подобраны под этот шаг (с)
+        self.PREROLL_SECONDS = 3  # Сколько секунд до нажатия Rec попадает в файл
+        self.ROLLOVER_MINUTES = 15  # Долгая запись делится на файлы встык
+        self.JOURNAL_RECORDING = True  # Журнал блоков: после падения запись восстанавливает recover.py
         self.rms_window_size = 50
         self.display_mode = "RMS"
+        self.true_peak = False  # Пик с передискретизацией 4x (dBTP) вместо пика по отсчетам
         self.input_channels = 1
         self.sample_rate = 44100
+        # Профиль задержки: размер блока входного потока (все времена — в секундах)
+        self.block_size = DEFAULT_BLOCK_SIZE
+        # Нагрузка callback'а по каждому опробованному размеру блока
+        self.callback_stats = {}
+        self.stats = None
         self.last_callback_time = time.time()
         
-        self.rms_level = [-self.LEVEL_RANGE]
-        self.peak_level = [-self.LEVEL_RANGE]
-        self.smoothed_level = [-self.LEVEL_RANGE]
-        self.peak_hold_counter = [0]
-        self.peak_display_level = [-self.LEVEL_RANGE]
-        self.rms_display_level = [-self.LEVEL_RANGE]
+        self.rms_level = np.full(1, -self.LEVEL_RANGE, dtype=np.float32)
+        self.peak_level = np.full(1, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(1, -self.LEVEL_RANGE, dtype=np.float32)
+        self.peak_hold_left = np.zeros(1, dtype=np.float32)
+        self.peak_display_level = np.full(1, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_display_level = np.full(1, -self.LEVEL_RANGE, dtype=np.float32)
+        # Все измерения — в движке; окно только рисует и сглаживает его уровни
+        self.engine = None
+        # Дополнительные устройства (DeviceMeter) рядом с главным
+        self.extra_devices = []
 
         self.show_spectrum = False
+        self.spectrum_engine = "IIR"
         self.NUM_BANDS = 31
         self.MIN_FREQ = 20
         self.MAX_FREQ = 16000
@@ -167,13 +407,29 @@ class AudioLevelMeter(QWidget):
         self.peak_band_hold = np.zeros(self.NUM_BANDS)
 
         self.recording = False
-        self.audio_file = None
+        self.recorder = None
+        self.record_format = DEFAULT_FORMAT
         self.recording_start_time = 0
 
         self.setup_ui()
 
-        # Флаг для предотвращения бесконечной рекурсии при отвале USB
+        # Переподключение идет в фоновом потоке (см. start_reconnect)
         self.is_reconnecting = False
+        self.reconnect_result = None
+        self.reconnect_cancel = None
+        self.recovery_pending = False
+        self.first_block_time = None
+        self.last_recovery_ms = None
+
+        # Сброс PortAudio и открытие потоков идут в разных фоновых потоках — по очереди
+        self.portaudio_lock = threading.Lock()
+
+        # Подключение/отключение устройств: CoreAudio сообщает сразу, и только
+        # тогда PortAudio сбрасывается (через start_reconnect) — иначе его
+        # список устройств не обновится
+        self.devices_changed = threading.Event()
+        self.device_listener = DeviceChangeListener(self.devices_changed.set)
+        self.device_listener.start()
         
         # --- ГОРЯЧИЕ КЛАВИШИ ---
         self.shortcut_rec = QShortcut(QKeySequence("Ctrl+R"), self)
@@ -191,10 +447,11 @@ class AudioLevelMeter(QWidget):
         self.setup_audio()
         self.apply_window_size()
 
-        self.update_interval = 15
+        # Частота кадров: ~60 fps, пока уровни движутся, и редкие кадры в тишине
+        self.refresh = AdaptiveRefresh()
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_meter)
-        self.timer.start(self.update_interval)
+        self.timer.start(self.refresh.fast_interval)
         
         self.rec_timer = QTimer()
         self.rec_timer.timeout.connect(self.update_recording_time)
@@ -222,7 +479,7 @@ class AudioLevelMeter(QWidget):
     def apply_window_size(self):
         if not hasattr(self, 'input_channels'): return
         
-        base_width = 60 if self.input_channels == 1 else 85
+        base_width = self.meter_canvas.levels_width()
         
         # --- БЕЗОПАСНАЯ ОЧИСТКА СТАРОГО LAYOUT ---
         old_layout = self.buttons_container.layout()
@@ -241,15 +498,15 @@ class AudioLevelMeter(QWidget):
             target_width = base_width + 450
             target_height = 290 # Уменьшенная высота окна
             self.meter_canvas.setFixedSize(base_width + 420, 240)
-            self.title_label.setText("VU Meter + Spectrum")
             new_layout = QHBoxLayout(self.buttons_container) # Горизонтальный ряд
         else:
             target_width = base_width + 10
             target_height = 340 # Обычная высота окна
             self.meter_canvas.setFixedSize(base_width, 240)
-            self.title_label.setText("VU Meter")
             new_layout = QVBoxLayout(self.buttons_container) # Вертикальный столбик
 
+        self.update_title()
+
         new_layout.setContentsMargins(0, 0, 0, 0)
         new_layout.setSpacing(5)
         new_layout.addWidget(self.btn_record)
@@ -296,39 +553,17 @@ class AudioLevelMeter(QWidget):
             event.accept()
 
     def get_input_devices(self):
-        """Безопасный опрос устройств с полным сбросом PortAudio"""
-        if self.recording:
-            return [(self.current_device_index, "Recording in progress...")]
-
-        try:
-            # 1. Жесткий сброс для очистки 'битых' индексов хаба
-            if hasattr(self, 'audio_stream') and self.audio_stream:
-                try:
-                    self.audio_stream.stop()
-                    self.audio_stream.close()
-                except: pass
-                self.audio_stream = None
+        """Список входов без сброса PortAudio: потоки при открытии меню не трогаются.
 
-            sd._terminate()
-            sd._initialize()
+        Список обновляется при переподключении — его запускает событие
+        подключения/отключения устройства (check_stream).
+        """
+        if self.is_reconnecting:
+            return [(self.current_device_index, "Reconnecting...")]
 
-            # 2. Получаем новый список
+        try:
             devices = sd.query_devices()
-            inputs = []
-            for i, dev in enumerate(devices):
-                if dev.get('max_input_channels', 0) > 0:
-                    inputs.append((i, dev['name']))
-            
-            # 3. Проверка текущего устройства
-            try:
-                if self.current_device_index is not None:
-                    sd.query_devices(self.current_device_index)
-            except:
-                self.current_device_index = sd.default.device[0]
-
-            self.setup_audio()
-            return inputs
-
+            return [(i, dev['name']) for i, dev in enumerate(devices) if dev.get('max_input_channels', 0) > 0]
         except Exception as e:
             print(f"Device update error: {e}")
             return [(0, "Error updating devices")]
@@ -338,12 +573,23 @@ class AudioLevelMeter(QWidget):
         menu = QMenu(self)
         menu.setStyleSheet("QMenu { background-color: #222; color: white; border: 1px solid #555; } QMenu::item:selected { background-color: #444; }")
         
+        inputs = self.get_input_devices()
         device_menu = menu.addMenu("Input Device")
-        for idx, name in self.get_input_devices():
+        for idx, name in inputs:
             act = QAction(name, self, checkable=True)
             act.setChecked(idx == self.current_device_index)
             act.triggered.connect(lambda checked, i=idx: self.change_device(i))
             device_menu.addAction(act)
+
+        extra_menu = menu.addMenu("More Devices")
+        extra_names = {device.name for device in self.extra_devices}
+        for idx, name in inputs:
+            if idx == self.current_device_index:
+                continue
+            act = QAction(name, self, checkable=True)
+            act.setChecked(name in extra_names)
+            act.triggered.connect(lambda checked, n=name: self.toggle_extra_device(n, checked))
+            extra_menu.addAction(act)
         menu.addSeparator()
 
         act_sys = QAction("System Sound Settings", self)
@@ -360,6 +606,13 @@ class AudioLevelMeter(QWidget):
         act_spec.triggered.connect(self.toggle_spectrum)
         menu.addAction(act_spec)
 
+        engine_menu = menu.addMenu("Spectrum Engine")
+        for name in SPECTRUM_ENGINES:
+            act = QAction(name, self, checkable=True)
+            act.setChecked(self.spectrum_engine == name)
+            act.triggered.connect(lambda checked, n=name: self.set_spectrum_engine(n))
+            engine_menu.addAction(act)
+
         min_freq_menu = menu.addMenu("Min Frequency")
         for f in self.available_min_freqs:
             act = QAction(f"{f} Hz", self, checkable=True)
@@ -384,8 +637,23 @@ class AudioLevelMeter(QWidget):
         act_peak.setChecked(self.display_mode == "PEAK")
         act_peak.triggered.connect(lambda: self.set_display_mode("PEAK"))
 
+        act_lufs = QAction("LUFS (EBU R128)", self, checkable=True)
+        act_lufs.setChecked(self.display_mode == "LUFS")
+        act_lufs.triggered.connect(lambda: self.set_display_mode("LUFS"))
+
+        act_reset = QAction("Reset Integrated Loudness", self)
+        act_reset.setEnabled(self.display_mode == "LUFS")
+        act_reset.triggered.connect(self.reset_loudness)
+
         menu.addAction(act_rms)
         menu.addAction(act_peak)
+        menu.addAction(act_lufs)
+        menu.addAction(act_reset)
+
+        act_true_peak = QAction("True Peak (4x)", self, checkable=True)
+        act_true_peak.setChecked(self.true_peak)
+        act_true_peak.triggered.connect(self.set_true_peak)
+        menu.addAction(act_true_peak)
         menu.addSeparator()
 
         time_menu = menu.addMenu("Integration Time")
@@ -395,13 +663,73 @@ class AudioLevelMeter(QWidget):
             act.triggered.connect(lambda checked, s=size: self.set_rms_window_size(s))
             time_menu.addAction(act)
 
+        # Рядом с каждым опробованным профилем — нагрузка callback'а и переполнения
+        latency_menu = menu.addMenu("Latency")
+        for name, size in LATENCY_PROFILES:
+            text = profile_label(size, self.sample_rate)
+            stats = self.callback_stats.get(size)
+            if stats is not None and stats.blocks:
+                text += f" — {stats.summary()}"
+            act = QAction(text, self, checkable=True)
+            act.setChecked(self.block_size == size)
+            act.triggered.connect(lambda checked, s=size: self.set_latency_profile(s))
+            latency_menu.addAction(act)
+
+        format_menu = menu.addMenu("Record Format")
+        for fmt in available_formats():
+            act = QAction(fmt, self, checkable=True)
+            act.setChecked(self.record_format == fmt)
+            act.triggered.connect(lambda checked, f=fmt: self.set_record_format(f))
+            format_menu.addAction(act)
+
         menu.exec(self.mapToGlobal(self.btn_settings.rect().bottomLeft()))
 
     def change_device(self, index):
         if index == self.current_device_index and not self.is_reconnecting:
             return
         self.current_device_index = index
-        self.reconnect_audio()
+        # Устройство не может быть одновременно главным и дополнительным
+        self.remove_extra_device(sd.query_devices(index)['name'])
+        self.start_reconnect("device switched")
+
+    def meter_groups(self):
+        """Устройства в порядке отрисовки: главное (само окно), затем открытые дополнительные"""
+        return [self] + [device for device in self.extra_devices if device.engine is not None]
+
+    def toggle_extra_device(self, name, checked):
+        if checked:
+            # Поток открывается в фоне; столбики появятся, когда check_stream заберет движок
+            device = DeviceMeter(name)
+            self.extra_devices.append(device)
+            device.start_reopen(self)
+        else:
+            self.remove_extra_device(name)
+            self.apply_window_size()
+        self.refresh.wake()
+
+    def remove_extra_device(self, name):
+        removed = [d for d in self.extra_devices if d.name == name]
+        self.extra_devices = [d for d in self.extra_devices if d.name != name]
+        self.stop_in_background(removed)
+
+    def stop_in_background(self, devices=(), engines=()):
+        """Останавливает потоки устройств (и отдельных движков) вне потока интерфейса"""
+        engines = [device.detach() for device in devices] + list(engines)
+
+        def stop():
+            with self.portaudio_lock:
+                for engine in engines:
+                    stop_engine(engine)
+                # Движки, которые успели открыть отмененные переоткрытия
+                for device in devices:
+                    stop_engine(device.take_reopened())
+
+        threading.Thread(target=stop, name="device-close", daemon=True).start()
+
+    def close_extra_devices(self):
+        for device in self.extra_devices:
+            stop_engine(device.detach())
+            stop_engine(device.take_reopened())
 
     def set_frequency(self, freq_type, freq):
         if freq_type == 'min':
@@ -409,13 +737,15 @@ class AudioLevelMeter(QWidget):
         else:
             self.MAX_FREQ = freq
         self.band_centers = np.logspace(np.log10(self.MIN_FREQ), np.log10(self.MAX_FREQ), self.NUM_BANDS)
-        self.filters = self.create_filters()
-        self.filter_states = []
-        for sos in self.filters:
-            if sos is not None:
-                self.filter_states.append(np.zeros((sos.shape[0], 2)))
-            else:
-                self.filter_states.append(None)
+        self.reset_spectrum()
+
+    def set_spectrum_engine(self, name):
+        self.spectrum_engine = name
+        self.reset_spectrum()
+
+    def reset_spectrum(self):
+        if self.engine is not None:
+            self.engine.set_spectrum(self.spectrum_engine, self.band_centers, self.MAX_FREQ)
         self.band_levels.fill(-self.LEVEL_RANGE)
         self.smoothed_band_levels.fill(-self.LEVEL_RANGE)
         self.peak_band_levels.fill(-self.LEVEL_RANGE)
@@ -423,37 +753,86 @@ class AudioLevelMeter(QWidget):
 
     def toggle_spectrum(self, checked):
         self.show_spectrum = checked
+        if self.engine is not None:
+            self.engine.spectrum_enabled = checked
         self.apply_window_size()
+        self.refresh.wake()
+
+    def set_record_format(self, fmt):
+        # Применяется при следующем старте записи
+        self.record_format = fmt
 
     def set_display_mode(self, mode):
         self.display_mode = mode
+        # Громкость считается только в режиме LUFS; integrated — с момента включения
+        for group in self.meter_groups():
+            engine = group.engine
+            if engine is not None and (engine.loudness is not None) != (mode == "LUFS"):
+                engine.set_loudness(mode == "LUFS")
+        self.update_title()
+
+    def set_true_peak(self, checked):
+        self.true_peak = checked
+        for group in self.meter_groups():
+            if group.engine is not None:
+                group.engine.set_true_peak(checked)
+
+    def set_latency_profile(self, block_size):
+        """Новый размер блока: поток переоткрывается в фоне, запись продолжается"""
+        if block_size == self.block_size:
+            return
+        if self.stats is not None and self.stats.blocks:
+            print(f"{profile_label(self.block_size, self.sample_rate)}: {self.stats.summary()}")
+        self.block_size = block_size
+        self.start_reconnect(f"latency profile {profile_label(block_size, self.sample_rate)}")
+
+    def stats_for(self, sample_rate):
+        """Счетчики нагрузки для текущего размера блока (новые, если сменилась частота)"""
+        stats = self.callback_stats.get(self.block_size)
+        if stats is None or stats.sample_rate != sample_rate:
+            stats = self.callback_stats[self.block_size] = CallbackStats(sample_rate, self.block_size)
+        return stats
+
+    def reset_loudness(self):
+        """Integrated заново (например, перед началом программы)"""
+        for group in self.meter_groups():
+            if group.engine is not None and group.engine.loudness is not None:
+                group.engine.set_loudness(True)
+        self.update_title()
+
+    def update_title(self):
+        """Заголовок окна; в режиме LUFS — integrated главного устройства"""
+        text = "VU Meter + Spectrum" if self.show_spectrum else "VU Meter"
+        loudness = self.engine.loudness if self.engine is not None else None
+        if self.display_mode == "LUFS":
+            text = "LUFS"
+            if loudness is not None and loudness.integrated > loudness.floor:
+                text = f"Integrated {loudness.integrated:.1f} LUFS" if self.show_spectrum \
+                    else f"{loudness.integrated:.1f} LUFS"
+        if self.title_label.text() != text:
+            self.title_label.setText(text)
 
     def set_rms_window_size(self, size):
         self.rms_window_size = size
         self.update_rms_buffer()
 
     def update_rms_buffer(self):
-        if hasattr(self, 'sample_rate') and self.sample_rate > 0:
-            self.rms_buffer_size = int(self.rms_window_size * self.sample_rate / 1000)
-            if hasattr(self, 'input_channels'):
-                self.audio_buffer = np.zeros((self.rms_buffer_size, self.input_channels))
-            self.buffer_index = 0
-
-    def create_filters(self):
-        filters = []
-        nyquist = self.sample_rate / 2
-        for i, center_freq in enumerate(self.band_centers):
-            low = center_freq / (2**(1/6))
-            high = center_freq * (2**(1/6))
-            if i == self.NUM_BANDS - 1 and self.MAX_FREQ >= 16000:
-                high = min(self.MAX_FREQ, nyquist - 1)
-            try:
-                order = 2 if center_freq < 200 else 4
-                sos = signal.butter(order, [low, high], btype='bandpass', fs=self.sample_rate, output='sos')
-                filters.append(sos)
-            except:
-                filters.append(None)
-        return filters
+        for group in self.meter_groups():
+            if group.engine is not None:
+                group.engine.set_rms_window(self.rms_window_size)
+
+    def create_engine(self, sample_rate, channels, recorder):
+        """Движок измерений под устройство и текущие настройки окна (можно из фонового потока)"""
+        engine = MeterEngine(
+            sample_rate, channels, block_size=self.block_size,
+            rms_window_ms=self.rms_window_size, level_range=self.LEVEL_RANGE,
+            peak_hold_time=self.PEAK_HOLD_TIME, decay_rate=self.DECAY_RATE,
+            band_centers=self.band_centers, max_freq=self.MAX_FREQ,
+            spectrum_engine=self.spectrum_engine, recorder=recorder, true_peak=self.true_peak,
+        )
+        engine.spectrum_enabled = self.show_spectrum
+        engine.set_loudness(self.display_mode == "LUFS")
+        return engine
 
     def toggle_record(self):
         if not self.recording:
@@ -464,11 +843,10 @@ class AudioLevelMeter(QWidget):
                 base_records_path = os.path.join(os.path.expanduser("~"), "Records")
                 os.makedirs(os.path.join(base_records_path, date_str), exist_ok=True)
                 
-                filename = os.path.join(base_records_path, date_str, f"Record {timestamp}.wav")
-                self.audio_file = wave.open(filename, 'wb')
-                self.audio_file.setnchannels(self.input_channels)
-                self.audio_file.setsampwidth(2)
-                self.audio_file.setframerate(self.sample_rate)
+                self.recorder.fmt = self.record_format
+                filename = os.path.join(base_records_path, date_str, f"Record {timestamp}{self.recorder.extension}")
+                # Файл пишет фоновый поток рекордера
+                self.recorder.open(filename)
                 
                 self.recording = True
                 self.recording_start_time = now
@@ -480,9 +858,10 @@ class AudioLevelMeter(QWidget):
         else:
             self.recording = False
             self.rec_timer.stop()
-            if self.audio_file:
-                self.audio_file.close()
-                self.audio_file = None
+            # Ждем, пока поток записи допишет хвост и закроет файл
+            if not self.recorder.close():
+                print("Recording stop timed out, file may be incomplete")
+            self.recorder.report()
             self.btn_record.setText("Rec")
             self.btn_record.setStyleSheet("background-color: #111; color: #aaa; border: 1px solid #333;")
 
@@ -492,48 +871,194 @@ class AudioLevelMeter(QWidget):
             mins, secs = divmod(elapsed, 60)
             self.btn_record.setText(f"{mins:02d}:{secs:02d}")
 
-    def reconnect_audio(self):
+    # --- Переподключение в фоновом потоке ---
+
+    # Паузы перед попытками (с): первая сразу, дальше экспоненциально до 5 с
+    RECONNECT_BACKOFF = (0.0, 0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 5.0)
+    # После стольких неудач подключаемся к входу по умолчанию (устройство могли унести)
+    RECONNECT_FALLBACK_AFTER = 4
+
+    def start_reconnect(self, reason):
+        """Переоткрывает главное устройство в фоне — интерфейс продолжает работать.
+
+        Остановка старого потока, сброс PortAudio, создание движка (фильтров
+        и буферов) и открытие нового потока идут в потоке audio-reconnect;
+        готовый результат забирает update_meter (finish_reconnect). Если
+        формат устройства не изменился, запись продолжается в тот же файл,
+        а разрыв заполняется тишиной.
+        """
         if self.is_reconnecting:
             return
-            
         self.is_reconnecting = True
-        
-        # Запоминаем, шла ли запись до обрыва
-        was_recording = self.recording
-        
-        if was_recording:
-            print("Обрыв потока: сохраняем текущий файл записи...")
-            self.toggle_record() # Эта команда безопасно закроет текущий файл
-        
-        try:
-            # Остановка старого стрима
-            if hasattr(self, 'audio_stream') and self.audio_stream:
+        self.reconnect_started = time.time()
+        self.stream_lost_at = self.last_callback_time
+        self.reconnect_result = None
+        self.reconnect_attempts = 0
+        self.reconnect_cancel = threading.Event()
+        print(f"Audio stream lost ({reason}), reconnecting in background...")
+
+        # Старый поток и дополнительные устройства закрывает фоновый поток:
+        # остановка отвалившегося устройства может занять секунды. Свои
+        # переоткрытия дополнительные устройства отменяют — их открывает воркер
+        old_stream, self.audio_stream = getattr(self, 'audio_stream', None), None
+        extras = list(self.extra_devices)
+        old_engines = [device.detach() for device in extras]
+        threading.Thread(
+            target=self.reconnect_worker,
+            args=(old_stream, extras, old_engines, self.current_device_index, self.reconnect_cancel),
+            name="audio-reconnect", daemon=True,
+        ).start()
+
+    def reconnect_worker(self, old_stream, extras, old_engines, device_index, cancel):
+        with self.portaudio_lock:
+            for device, engine in zip(extras, old_engines):
+                stop_engine(engine)
+                # Движок, который успело открыть отмененное переоткрытие
+                stop_engine(device.take_reopened())
+            if old_stream is not None:
                 try:
-                    self.audio_stream.stop()
-                    self.audio_stream.close()
-                except Exception: pass
-                self.audio_stream = None
+                    old_stream.stop()
+                    old_stream.close()
+                except Exception:
+                    pass
+
+        attempt = 0
+        while True:
+            delay = self.RECONNECT_BACKOFF[min(attempt, len(self.RECONNECT_BACKOFF) - 1)]
+            if cancel.wait(delay):
+                return
+            candidate = device_index if attempt < self.RECONNECT_FALLBACK_AFTER else None
+            with self.portaudio_lock:
+                try:
+                    # Сброс PortAudio — иначе список устройств не обновится
+                    sd._terminate()
+                    sd._initialize()
+                    result = self.open_input(candidate)
+                except Exception as e:
+                    attempt += 1
+                    self.reconnect_attempts = attempt
+                    print(f"Reconnect attempt {attempt} failed: {e}")
+                    continue
+                # Дополнительные устройства — после сброса; ставит их finish_reconnect
+                extra_engines = [(device, device.connect(self)) for device in extras]
+
+            self.reconnect_attempts = attempt + 1
+            self.reconnect_result = result + (extra_engines,)
+            return
+
+    def open_input(self, device_index):
+        """Открывает устройство и запускает поток (из потока переподключения)"""
+        if device_index is None:
+            device_index = sd.default.device[0]
+        device_info = sd.query_devices(device_index, 'input')
+        channels = device_info.get('max_input_channels', 0)
+        if channels == 0:
+            raise RuntimeError(f"device {device_index} has no input channels")
+        sample_rate = int(device_info.get('default_samplerate', 44100))
+
+        # Формат тот же — рекордер остается, запись идет в тот же файл
+        recorder = self.recorder
+        same_format = recorder is not None and (recorder.channels, recorder.sample_rate) == (channels, sample_rate)
+        engine = self.create_engine(sample_rate, channels, recorder if same_format else None)
+        stream = self.open_stream(device_index, engine)
+
+        if same_format:
+            # Разрыв — тишиной, до первых блоков нового потока: длительность файла
+            # совпадает с реальным временем
+            gap_frames = int((time.time() - self.stream_lost_at) * sample_rate)
+            if not recorder.pad_silence(gap_frames):
+                print("Silence padding timed out")
+
+        self.stats = self.stats_for(sample_rate)
+        self.engine = engine
+        self.first_block_time = None
+        self.recovery_pending = True
+        self.last_callback_time = time.time()
+        stream.start()
+        return device_index, channels, sample_rate, stream
+
+    def finish_reconnect(self):
+        """Применяет результат фонового переподключения (поток интерфейса)"""
+        device_index, channels, sample_rate, stream, extra_engines = self.reconnect_result
+        self.reconnect_result = None
+        self.current_device_index = device_index
+        self.audio_stream = stream
+
+        for device, engine in extra_engines:
+            if device not in self.extra_devices:
+                # Устройство убрали из меню, пока шло переподключение
+                self.stop_in_background(engines=[engine])
+            elif engine is not None:
+                device.attach(engine, self)
+            else:
+                # Устройство пропало — пробуем дальше в его собственном фоновом потоке
+                device.start_reopen(self)
+
+        if (channels, sample_rate) != (self.input_channels, self.sample_rate):
+            self.input_channels = channels
+            self.sample_rate = sample_rate
+            self.reset_level_arrays()
+
+        if self.engine.recorder is None:
+            # Формат устройства изменился: текущий файл закрываем, запись — в новый
+            was_recording = self.recording
+            if was_recording:
+                self.toggle_record()
+            self.setup_recorder()
+            self.engine.recorder = self.recorder
+            if was_recording:
+                print("Device format changed: recording continues in a new file")
+                self.toggle_record()
 
-            # Сброс PortAudio
-            sd._terminate()
-            sd._initialize()
+        self.is_reconnecting = False
+        self.apply_window_size()
+        self.refresh.wake()
 
-            # Пытаемся настроить аудио
-            self.setup_audio()
+    def report_recovery(self):
+        """Печатает время восстановления, когда пришел первый блок нового потока"""
+        if not self.recovery_pending or self.first_block_time is None:
+            return
+        self.recovery_pending = False
+        recovery_ms = 1000 * (self.first_block_time - self.reconnect_started)
+        gap_ms = 1000 * (self.first_block_time - self.stream_lost_at)
+        self.last_recovery_ms = recovery_ms
+        print(f"Audio recovered in {recovery_ms:.0f} ms (gap {gap_ms:.0f} ms, {self.reconnect_attempts} attempt(s))")
+
+    def check_stream(self):
+        """Watchdog главного и дополнительных устройств (поток интерфейса)"""
+        if self.is_reconnecting:
+            return
+        now = time.time()
+        # Подключили или отключили устройство: сбрасываем PortAudio и переоткрываем
+        # потоки в фоне, не дожидаясь тишины в callback'е
+        if self.devices_changed.is_set():
+            self.devices_changed.clear()
+            self.start_reconnect("device list changed")
+            return
+
+        # Не меньше нескольких блоков: на профиле Power Save блок идет ~90 мс
+        timeout = max(1.5, 8 * self.block_size / self.sample_rate)
+        if now - self.last_callback_time > timeout:
+            self.start_reconnect(f"no audio for {1000 * (now - self.last_callback_time):.0f} ms")
+            return
+
+        # Дополнительное устройство, переставшее присылать блоки, переоткрываем
+        # отдельно и в фоне: остальные потоки (и главный) при этом не трогаем
+        layout_changed = False
+        for device in self.extra_devices:
+            engine = device.take_reopened()
+            if engine is not None:
+                device.attach(engine, self)
+                layout_changed = True
+            elif device.stalled(timeout):
+                print(f"Device stalled, reopening: {device.name}")
+                device.start_reopen(self)
+                layout_changed = True
+        if layout_changed:
             self.apply_window_size()
-            
-            # Если стрим успешно создан и до обрыва шла запись
-            if was_recording and hasattr(self, 'audio_stream') and self.audio_stream is not None:
-                print("Связь восстановлена: начинаем запись в новый файл...")
-                self.toggle_record() # Эта команда создаст новый файл и запустит таймер заново
-                
-        except Exception as e:
-            print(f"Reconnect failed: {e}")
-        finally:
-            self.is_reconnecting = False
 
     def setup_audio(self):
-        """Безопасная настройка потока с проверкой каналов"""
+        """Безопасная настройка потока с проверкой каналов (синхронно, при запуске)"""
         try:
             if self.current_device_index is None:
                 try:
@@ -554,151 +1079,176 @@ class AudioLevelMeter(QWidget):
 
             self.input_channels = max_ch
             self.sample_rate = int(device_info.get('default_samplerate', 44100))
+            self.reset_level_arrays()
 
-            # Пересоздаем массивы под актуальное кол-во каналов
-            self.peak_level = [-self.LEVEL_RANGE] * self.input_channels
-            self.rms_level = [-self.LEVEL_RANGE] * self.input_channels
-            self.smoothed_level = [-self.LEVEL_RANGE] * self.input_channels
-            self.peak_hold_counter = [0] * self.input_channels
-            self.peak_display_level = [-self.LEVEL_RANGE] * self.input_channels
-            self.rms_display_level = [-self.LEVEL_RANGE] * self.input_channels
+            self.setup_recorder()
+            self.engine = self.create_engine(self.sample_rate, self.input_channels, self.recorder)
+            self.stats = self.stats_for(self.sample_rate)
             
-            self.update_rms_buffer()
-            self.filters = self.create_filters()
-            self.filter_states = []
-            for sos in self.filters:
-                if sos is not None:
-                    self.filter_states.append(np.zeros((sos.shape[0], 2)))
-                else:
-                    self.filter_states.append(None)
-            
-            self.audio_stream = sd.InputStream(
-                device=self.current_device_index,
-                samplerate=self.sample_rate,
-                channels=self.input_channels,
-                blocksize=2048,
-                callback=self.audio_callback,
-            )
+            self.audio_stream = self.open_stream(self.current_device_index, self.engine)
             self.audio_stream.start()
             self.last_callback_time = time.time() # Фиксируем успешный старт
         except Exception as e:
             print(f"Setup failed: {e}")
             self.audio_stream = None # Больше не вызываем change_device(None), чтобы не было рекурсии
 
+    def open_stream(self, device_index, engine):
+        return sd.InputStream(
+            device=device_index,
+            samplerate=engine.sample_rate,
+            channels=engine.channels,
+            blocksize=engine.block_size,
+            callback=self.audio_callback,
+        )
+
+    def reset_level_arrays(self):
+        """Пересоздает массивы отрисовки под актуальное кол-во каналов"""
+        self.peak_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.smoothed_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.peak_hold_left = np.zeros(self.input_channels, dtype=np.float32)
+        self.peak_display_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+        self.rms_display_level = np.full(self.input_channels, -self.LEVEL_RANGE, dtype=np.float32)
+
+    def setup_recorder(self):
+        """Пересоздает рекордер под формат устройства (только когда запись не идет)"""
+        if self.recorder is not None:
+            if self.recording or (self.recorder.channels, self.recorder.sample_rate) == (self.input_channels, self.sample_rate):
+                return
+            self.recorder.stop()
+        # Пре-ролл во float32: формат (24 бит, float, FLAC) меняется в меню,
+        # а int16 квантовал бы и обрезал по 0 dBFS первые секунды файла
+        self.recorder = AudioRecorder(
+            self.sample_rate, self.input_channels, fmt=self.record_format, preroll_seconds=self.PREROLL_SECONDS,
+            preroll_dtype=np.float32, rollover_seconds=self.ROLLOVER_MINUTES * 60,
+            journal=self.JOURNAL_RECORDING
+        )
+        self.recorder.start()
+
     def audio_callback(self, indata, frames, time_info, status):
+        started = CallbackStats.begin()
         self.last_callback_time = time.time() # Фиксируем, что поток жив
+        if self.first_block_time is None:
+            self.first_block_time = self.last_callback_time
         try:
-            # Защита: количество каналов в данных должно совпадать с массивом уровней
-            if indata.shape[1] != len(self.rms_level):
-                return
-
-            if self.recording and self.audio_file:
-                audio_data_int16 = (indata * 32767).astype(np.int16)
-                self.audio_file.writeframes(audio_data_int16.tobytes())
-            
-            frames_to_copy = min(frames, self.rms_buffer_size - self.buffer_index)
-            self.audio_buffer[self.buffer_index:self.buffer_index + frames_to_copy] = indata[:frames_to_copy]
-            self.buffer_index += frames_to_copy
-            
-            if self.buffer_index >= self.rms_buffer_size:
-                self.buffer_index = 0
-            
-            for channel in range(self.input_channels):
-                valid_data_count = min(self.buffer_index + frames, self.rms_buffer_size)
-                if valid_data_count > 0:
-                    channel_data = self.audio_buffer[:valid_data_count, channel]
-                    rms = np.sqrt(np.mean(channel_data**2))
-                    self.rms_level[channel] = 20 * np.log10(max(rms, 10**(-60/20)))
-                else:
-                    self.rms_level[channel] = -self.LEVEL_RANGE
-
-                peak = np.max(np.abs(indata[:, channel]))
-                peak_db = 20 * np.log10(max(min(peak, 1.0), 1e-6))
-                
-                if peak_db > self.peak_level[channel]:
-                    self.peak_level[channel] = peak_db
-                    self.peak_hold_counter[channel] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
-
-                if self.display_mode == "PEAK":
-                    if peak_db > self.peak_display_level[channel]:
-                        self.peak_display_level[channel] = peak_db
-                    if self.rms_level[channel] > self.rms_display_level[channel]:
-                        self.rms_display_level[channel] = self.rms_level[channel]
-
-            if self.show_spectrum:
-                mono_signal = np.mean(indata, axis=1) if indata.shape[1] >= 2 else indata[:, 0]
-                for i in range(self.NUM_BANDS):
-                    sos = self.filters[i]
-                    if sos is not None:
-                        try:
-                            filtered, self.filter_states[i] = signal.sosfilt(sos, mono_signal, zi=self.filter_states[i])
-                            rms = np.sqrt(np.mean(filtered**2))
-                            db_level = 20 * np.log10(max(rms, 1e-6))
-                            self.band_levels[i] = max(min(db_level, 0), -self.LEVEL_RANGE)
-                            if db_level > self.peak_band_levels[i]:
-                                self.peak_band_levels[i] = db_level
-                                self.peak_band_hold[i] = int(self.PEAK_HOLD_TIME * 1000 / self.update_interval)
-                        except:
-                            self.band_levels[i] = -self.LEVEL_RANGE
+            # Уровни, спектр и копия в рекордер — в движке; интерфейс заберет
+            # их снимком (engine.levels), общих с ним массивов callback не трогает
+            self.engine.process(indata)
         except:
             pass
+        stats = self.stats
+        if stats is not None:
+            stats.end(started, status)
+
+    def read_levels(self, group):
+        """Забирает снимок уровней движка группы (окно или DeviceMeter) в ее состояние отрисовки"""
+        engine = group.engine
+        if engine is None:
+            return
+        levels = engine.levels
+        # Снимок от движка с другим числом каналов (идет переподключение) пропускаем
+        if levels.channels != len(group.rms_level) or not levels.read():
+            return
+
+        group.rms_level[:] = levels.rms_db
+        peak_db = levels.peak_db
+        latch_peaks(
+            group.peak_level, peak_db, group.peak_hold_left,
+            self.PEAK_HOLD_TIME
+        )
+
+        if self.display_mode == "PEAK":
+            np.maximum(group.peak_display_level, peak_db, out=group.peak_display_level)
+            np.maximum(group.rms_display_level, group.rms_level, out=group.rms_display_level)
+
+        # Спектр есть только у главного устройства
+        if group is self and self.show_spectrum and levels.bands == self.NUM_BANDS:
+            self.band_levels[:] = levels.band_db
+            latch_peaks(
+                self.peak_band_levels, levels.band_peak_db, self.peak_band_hold,
+                self.PEAK_HOLD_TIME
+            )
 
     def update_meter(self):
+            dt = self.refresh.tick()
+
             # --- WATCHDOG (Защита от обрывов потока) ---
-            if hasattr(self, 'last_callback_time') and (time.time() - self.last_callback_time > 1.5):
-                # Проверяем, не находимся ли мы уже в процессе восстановления
-                if not getattr(self, 'is_reconnecting', False):
-                    print("Сработал Watchdog (Восстановление аудио)...")
-                    self.last_callback_time = time.time()
-                    self.reconnect_audio()
-                return
+            # Переподключение идет в фоне; здесь только забираем его результат
+            if self.reconnect_result is not None:
+                self.finish_reconnect()
+            self.report_recovery()
+            self.check_stream()
 
             # Защита: если данные еще не готовы или идет переинициализация
             if not hasattr(self, 'rms_level') or len(self.rms_level) != self.input_channels:
                 return
 
-            level_exceeded = any(level > -3 for level in self.peak_level)
-            self.title_label.setStyleSheet("color: red;" if level_exceeded else "color: lightgray;")
+            groups = self.meter_groups()
+            for group in groups:
+                self.read_levels(group)
 
-            for channel in range(self.input_channels):
-                if channel >= len(self.rms_level): break
-                if self.display_mode == "RMS":
-                    if self.rms_level[channel] > self.smoothed_level[channel]:
-                        self.smoothed_level[channel] = self.rms_level[channel]
-                    else:
-                        decay_amount = self.DECAY_RATE * (self.update_interval/1000)
-                        self.smoothed_level[channel] = max(self.smoothed_level[channel] - decay_amount, -self.LEVEL_RANGE)
-                else: 
-                    if self.peak_display_level[channel] > -self.LEVEL_RANGE:
-                        distance = (self.peak_display_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
-                        alpha = 0.005 + 0.01 * distance 
-                        self.peak_display_level[channel] = (1 - alpha) * self.peak_display_level[channel] + alpha * (-self.LEVEL_RANGE)
-                    if self.rms_level[channel] > self.smoothed_level[channel]:
-                        alpha = 0.5
-                    else:
-                        distance = (self.rms_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
-                        alpha = 0.1 + 0.3 * distance
-                    self.smoothed_level[channel] = (1 - alpha) * self.smoothed_level[channel] + alpha * self.rms_level[channel]
+            level_exceeded = any(level > -3 for group in groups for level in group.peak_level)
+            self.title_label.setStyleSheet("color: red;" if level_exceeded else "color: lightgray;")
+            if self.display_mode == "LUFS":
+                self.update_title()
 
-                if self.peak_hold_counter[channel] > 0:
-                    self.peak_hold_counter[channel] -= 1
-                else:
-                    self.peak_level[channel] = (1 - 0.1) * self.peak_level[channel] + 0.1 * (-self.LEVEL_RANGE)
+            for group in groups:
+                self.smooth_levels(group, dt)
 
             if self.show_spectrum:
                 for i in range(self.NUM_BANDS):
                     if self.band_levels[i] > self.smoothed_band_levels[i]:
                         self.smoothed_band_levels[i] = self.band_levels[i]
                     else:
-                        decay_amount = self.DECAY_RATE * (self.update_interval/1000)
+                        decay_amount = self.DECAY_RATE * dt
                         self.smoothed_band_levels[i] = max(self.smoothed_band_levels[i] - decay_amount, -self.LEVEL_RANGE)
                     if self.peak_band_hold[i] > 0:
-                        self.peak_band_hold[i] -= 1
+                        self.peak_band_hold[i] -= dt
                     else:
-                        decay_amount = self.DECAY_RATE * 2 * (self.update_interval/1000)
+                        decay_amount = self.DECAY_RATE * 2 * dt
                         self.peak_band_levels[i] = max(self.peak_band_levels[i] - decay_amount, -self.LEVEL_RANGE)
 
             self.meter_canvas.update()
+            state = [self.smoothed_band_levels, self.peak_band_levels]
+            for group in groups:
+                state += [group.smoothed_level, group.peak_level, group.peak_display_level]
+            self.timer.setInterval(self.refresh.next_interval(*state))
+
+    def smooth_levels(self, group, dt):
+        """Сглаживание, удержание и спад столбиков одного устройства"""
+        loudness = group.engine.loudness if group.engine is not None else None
+        for channel in range(group.input_channels):
+            if channel >= len(group.rms_level): break
+            if self.display_mode == "LUFS":
+                # Окна momentary/short-term уже задают баллистику — без сглаживания;
+                # громкость одна на устройство, столбики всех каналов одинаковые
+                if loudness is not None:
+                    group.peak_display_level[channel] = loudness.momentary
+                    group.smoothed_level[channel] = loudness.short_term
+            elif self.display_mode == "RMS":
+                if group.rms_level[channel] > group.smoothed_level[channel]:
+                    group.smoothed_level[channel] = group.rms_level[channel]
+                else:
+                    decay_amount = self.DECAY_RATE * dt
+                    group.smoothed_level[channel] = max(group.smoothed_level[channel] - decay_amount, -self.LEVEL_RANGE)
+            else: 
+                if group.peak_display_level[channel] > -self.LEVEL_RANGE:
+                    distance = (group.peak_display_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
+                    alpha = rate_alpha(0.005 + 0.01 * distance, dt, self.SMOOTHING_TICK)
+                    group.peak_display_level[channel] = (1 - alpha) * group.peak_display_level[channel] + alpha * (-self.LEVEL_RANGE)
+                if group.rms_level[channel] > group.smoothed_level[channel]:
+                    alpha = 0.5
+                else:
+                    distance = (group.rms_level[channel] + self.LEVEL_RANGE) / self.LEVEL_RANGE
+                    alpha = 0.1 + 0.3 * distance
+                alpha = rate_alpha(alpha, dt, self.SMOOTHING_TICK)
+                group.smoothed_level[channel] = (1 - alpha) * group.smoothed_level[channel] + alpha * group.rms_level[channel]
+
+            if group.peak_hold_left[channel] > 0:
+                group.peak_hold_left[channel] -= dt
+            else:
+                alpha = rate_alpha(0.1, dt, self.SMOOTHING_TICK)
+                group.peak_level[channel] = (1 - alpha) * group.peak_level[channel] + alpha * (-self.LEVEL_RANGE)
 
     def open_sound_settings(self):
         subprocess.run(["open", "x-apple.systempreferences:com.apple.Sound-Settings.extension"])
@@ -707,13 +1257,19 @@ class AudioLevelMeter(QWidget):
         subprocess.run(["open", "-a", "Audio MIDI Setup.app"])
 
     def close_program(self):
+        if self.reconnect_cancel is not None:
+            self.reconnect_cancel.set()
+        self.device_listener.stop()
         if self.recording: self.toggle_record()
+        if self.recorder: self.recorder.stop()
+        self.close_extra_devices()
         try:
             if hasattr(self, 'audio_stream') and self.audio_stream:
                 self.audio_stream.stop()
                 self.audio_stream.close()
         except: pass
         self.timer.stop()
+        self.refresh.report()
         self.close()
 
 if __name__ == "__main__":
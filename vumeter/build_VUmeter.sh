@@ -12,6 +12,7 @@ VOL_NAME="${APP_NAME} preview"
 echo "--- 1. Запуск PyInstaller ---"
 python3 -m PyInstaller --noconfirm --windowed \
     --hidden-import "importlib.resources" \
+    --paths ".." \
     --name "$APP_NAME" \
     --icon "$ICON_NAME" \
     "$SCRIPT_NAME"